@@ -1,5 +1,4 @@
 from flask import Blueprint, request, jsonify, send_file
-import pandas as pd
 import io
 import base64
 from datetime import datetime
@@ -11,6 +10,7 @@ import smtplib
 from email.message import EmailMessage
 
 from admin_auth import require_admin
+from import_utils import cell_to_str, is_blank_text
 
 admin_bp = Blueprint('admin', __name__)
 
@@ -273,9 +273,11 @@ def admin_login():
 def import_excellent_coaches():
     """优秀辅导员导入接口（姓名 + 电话）"""
     try:
-        from models import ExcellentCoach, ImportLog
+        import pandas as pd
+        from models import ImportLog
         from app import db
-        import hashlib
+        from phase_timer import PhaseTimer
+        from coach_import import NAME_COLUMNS, PHONE_COLUMNS, pick_column, upsert_coaches, validate_rows
 
         if 'file' not in request.files:
             return jsonify({
@@ -296,6 +298,8 @@ def import_excellent_coaches():
                 'message': '仅支持Excel文件格式'
             }), 400
 
+        timer = PhaseTimer()
+
         try:
             df = pd.read_excel(file)
         except Exception as e:
@@ -304,79 +308,25 @@ def import_excellent_coaches():
                 'message': f'Excel文件读取失败: {str(e)}'
             }), 400
 
-        def _pick_col(candidates):
-            for c in candidates:
-                if c in df.columns:
-                    return c
-            return None
-
-        name_col = _pick_col(['指导老师姓名', '指导老师', '老师姓名', '姓名', 'teacher_name'])
-        phone_col = _pick_col(['指导老师电话', '指导老师手机号', '老师电话', '电话', '手机号', 'teacher_phone'])
+        name_col = pick_column(df, NAME_COLUMNS)
+        phone_col = pick_column(df, PHONE_COLUMNS)
 
         if not name_col or not phone_col:
             return jsonify({
                 'success': False,
                 'message': 'Excel文件缺少必要的列: 指导老师姓名 / 指导老师电话'
             }), 400
+        timer.mark('read')
 
         total_count = len(df)
-        success_count = 0
-        failed_count = 0
-        error_data = []
 
-        # Excel 内部：电话唯一（同一老师电话不应重复）
-        seen_phone_hash = set()
+        # Excel 内部：电话唯一（同一老师电话不应重复）；整表校验后一次写入
+        valid, error_data = validate_rows(df, name_col, phone_col)
+        timer.mark('validate')
+        upsert_coaches(valid, timer)
 
-        for index, row in df.iterrows():
-            try:
-                teacher_name = str(row.get(name_col, '') or '').strip()
-                teacher_phone = str(row.get(phone_col, '') or '').strip()
-
-                if _is_blank_text(teacher_name) or _is_blank_text(teacher_phone):
-                    error_data.append({
-                        '行号': index + 2,
-                        '指导老师姓名': teacher_name,
-                        '指导老师电话': teacher_phone,
-                        '错误原因': '姓名或电话为空'
-                    })
-                    failed_count += 1
-                    continue
-
-                phone_hash = hashlib.sha256(teacher_phone.encode()).hexdigest()
-                if phone_hash in seen_phone_hash:
-                    error_data.append({
-                        '行号': index + 2,
-                        '指导老师姓名': teacher_name,
-                        '指导老师电话': teacher_phone,
-                        '错误原因': '该电话在本次导入文件中重复'
-                    })
-                    failed_count += 1
-                    continue
-                seen_phone_hash.add(phone_hash)
-
-                existing = ExcellentCoach.query.filter(ExcellentCoach.teacher_phone_hash == phone_hash).first()
-                if existing:
-                    existing.teacher_name = teacher_name
-                    existing.teacher_phone = teacher_phone
-                else:
-                    coach = ExcellentCoach(
-                        teacher_name=teacher_name
-                    )
-                    coach.teacher_phone = teacher_phone
-                    db.session.add(coach)
-
-                success_count += 1
-
-            except Exception as e:
-                error_data.append({
-                    '行号': index + 2,
-                    '指导老师姓名': row.get(name_col, ''),
-                    '指导老师电话': row.get(phone_col, ''),
-                    '错误原因': f'处理异常: {str(e)}'
-                })
-                failed_count += 1
-
-        db.session.commit()
+        success_count = len(valid)
+        failed_count = len(error_data)
 
         error_log_content = None
         if error_data:
@@ -391,6 +341,7 @@ def import_excellent_coaches():
         )
         db.session.add(import_log)
         db.session.commit()
+        timer.mark('log')
 
         return jsonify({
             'success': True,
@@ -400,7 +351,8 @@ def import_excellent_coaches():
                 'success_count': success_count,
                 'failed_count': failed_count,
                 'error_log_available': error_log_content is not None,
-                'import_log_id': import_log.id
+                'import_log_id': import_log.id,
+                'timings': timer.timings
             }
         })
 
@@ -499,17 +451,9 @@ def admin_list_applications():
     """报名列表（管理员）：分页 + 筛选"""
     try:
         from models import Application
-
-        def _school_initial(name: str) -> str:
-            try:
-                from pypinyin import lazy_pinyin, Style
-                s = str(name or '').strip()
-                if not s:
-                    return ''
-                letters = lazy_pinyin(s, style=Style.FIRST_LETTER)
-                return ''.join([str(x or '') for x in letters]).upper()
-            except Exception:
-                return ''
+        from sqlalchemy.orm import selectinload
+        from field_crypto import prefetch
+        from school_search import school_name_filter
 
         page = request.args.get('page', 1, type=int)
         per_page = request.args.get('per_page', 20, type=int)
@@ -530,30 +474,20 @@ def admin_list_applications():
         if education_level:
             query = query.filter(Application.education_level == education_level)
         if school_name:
-            query = query.filter(Application.school_name.like(f"%{school_name}%"))
+            # MySQL 走 ngram 全文索引，其他数据库走 2-gram 倒排表（school_search）
+            query = query.filter(school_name_filter(school_name))
         if match_no:
             query = query.filter(Application.match_no == match_no)
 
         if school_initial:
-            ids = []
-            for row in query.with_entities(Application.id, Application.school_name).yield_per(500):
-                if _school_initial(row.school_name).startswith(school_initial):
-                    ids.append(row.id)
-            if not ids:
-                return jsonify({
-                    'success': True,
-                    'data': {
-                        'applications': [],
-                        'total': 0,
-                        'pages': 0,
-                        'current_page': page
-                    }
-                })
-            query = query.filter(Application.id.in_(ids))
+            # school_initial 列在写入时计算并建有索引，这里是索引前缀查询
+            query = query.filter(Application.school_initial_prefix(school_initial))
 
-        applications = query.order_by(Application.created_at.desc()).paginate(
+        # participants 按页批量加载（selectin），避免 to_dict 每行一次查询
+        applications = query.options(selectinload(Application.participants)).order_by(Application.created_at.desc()).paginate(
             page=page, per_page=per_page, error_out=False
         )
+        prefetch(applications.items)
 
         return jsonify({
             'success': True,
@@ -677,18 +611,11 @@ def admin_reject_application(application_id):
 def admin_export_applications():
     """导出报名列表（管理员）：按筛选导出 Excel"""
     try:
+        import pandas as pd
         from models import Application
-
-        def _school_initial(name: str) -> str:
-            try:
-                from pypinyin import lazy_pinyin, Style
-                s = str(name or '').strip()
-                if not s:
-                    return ''
-                letters = lazy_pinyin(s, style=Style.FIRST_LETTER)
-                return ''.join([str(x or '') for x in letters]).upper()
-            except Exception:
-                return ''
+        from sqlalchemy.orm import selectinload
+        from field_crypto import prefetch
+        from school_search import school_name_filter
 
         status = str(request.args.get('status', '') or '').strip()
         category = str(request.args.get('category', '') or '').strip()
@@ -705,35 +632,23 @@ def admin_export_applications():
         if education_level:
             query = query.filter(Application.education_level == education_level)
         if school_name:
-            query = query.filter(Application.school_name.like(f"%{school_name}%"))
+            # MySQL 走 ngram 全文索引，其他数据库走 2-gram 倒排表（school_search）
+            query = query.filter(school_name_filter(school_name))
         if match_no:
             query = query.filter(Application.match_no == match_no)
 
         if school_initial:
-            ids = []
-            for row in query.with_entities(Application.id, Application.school_name).yield_per(500):
-                if _school_initial(row.school_name).startswith(school_initial):
-                    ids.append(row.id)
-            if not ids:
-                export_df = pd.DataFrame([])
-                excel_file = io.BytesIO()
-                export_df.to_excel(excel_file, index=False)
-                excel_file.seek(0)
-                return send_file(
-                    excel_file,
-                    mimetype='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
-                    as_attachment=True,
-                    download_name='applications.xlsx'
-                )
-            query = query.filter(Application.id.in_(ids))
-
-        items = query.order_by(Application.created_at.desc()).all()
+            # school_initial 列在写入时计算并建有索引，这里是索引前缀查询
+            query = query.filter(Application.school_initial_prefix(school_initial))
+
+        items = query.options(selectinload(Application.participants)).order_by(Application.created_at.desc()).all()
+        prefetch(items)
 
         rows = []
         for a in items:
             d = a.to_dict(include_sensitive=True)
             match_no_val = d.get('match_no')
-            if _is_blank_text(match_no_val):
+            if is_blank_text(match_no_val):
                 match_no_val = ''
             rows.append({
                 '报名ID': d.get('id'),
@@ -783,15 +698,18 @@ def admin_get_applications_by_phone():
     """管理员按手机号查询报名记录（用于 Apifox 调试，避免学生端接口 require_user 限制）"""
     try:
         from models import Application
+        from sqlalchemy.orm import selectinload
+        from field_crypto import prefetch
 
         phone = str(request.args.get('phone', '') or '').strip()
         if not phone:
             return jsonify({'success': False, 'message': '请提供手机号'}), 400
 
         phone_hash = hashlib.sha256(phone.encode()).hexdigest()
-        applications = Application.query.filter(
+        applications = Application.query.options(selectinload(Application.participants)).filter(
             Application.contact_phone_hash == phone_hash
         ).order_by(Application.created_at.desc()).all()
+        prefetch(applications)
 
         return jsonify({'success': True, 'data': [a.to_dict(include_sensitive=True) for a in applications]})
 
@@ -800,6 +718,8 @@ def admin_get_applications_by_phone():
 
 def create_error_excel(error_data):
     """创建包含错误信息的Excel文件"""
+    import pandas as pd
+
     df = pd.DataFrame(error_data)
     
     # 创建Excel文件
@@ -819,27 +739,14 @@ def _safe_filename_part(val: str) -> str:
         s = s.replace(ch, '_')
     return s
 
-def _cell_to_str(value):
-    try:
-        if pd.isna(value):
-            return ''
-    except Exception:
-        pass
-    return str(value).strip() if value is not None else ''
-
-def _is_blank_text(s):
-    txt = str(s or '').strip()
-    if not txt:
-        return True
-    low = txt.lower()
-    return low in ['nan', 'none', 'null', 'undefined']
-
 @admin_bp.route('/api/admin/import-match-no', methods=['POST'])
 @require_admin()
 def import_match_no():
     """参赛号导入接口"""
     try:
-        from models import Application, ApplicationParticipant, ImportLog
+        import pandas as pd
+        from models import ImportLog
+        from match_no_import import ApplicationMatcher, assign_match_nos
         from app import db
         
         if 'file' not in request.files:
@@ -908,17 +815,53 @@ def import_match_no():
         error_data = []
         updated_application_ids = []
 
+        # 先取出每行的匹配键，用几次 IN 查询批量取回全部候选报名（ApplicationMatcher）
+        row_keys = {}
+        for index, row in df.iterrows():
+            application_id = None
+            if id_col is not None:
+                raw_id = row.get(id_col, '')
+                if raw_id is not None and str(raw_id).strip() != '':
+                    try:
+                        application_id = int(raw_id)
+                    except Exception:
+                        application_id = None
+
+            phone_hash = None
+            if has_phone:
+                phone = str(row.get(phone_col, '')).strip() if phone_col else ''
+                if phone:
+                    phone_hash = hashlib.sha256(phone.encode()).hexdigest()
+
+            name_school = None
+            if has_name_school:
+                participant_name = str(row.get(name_col, '')).strip() if name_col else ''
+                school_name = str(row.get(school_col, '')).strip() if school_col else ''
+                if participant_name and school_name:
+                    name_school = (participant_name, school_name)
+
+            row_keys[index] = (application_id, phone_hash, name_school)
+
+        matcher = ApplicationMatcher(
+            ids=[k[0] for k in row_keys.values() if k[0] is not None],
+            phone_hashes=[k[1] for k in row_keys.values() if k[1] is not None],
+            name_school_pairs=[k[2] for k in row_keys.values() if k[2] is not None]
+        )
+
         # 同一批次导入：参赛号唯一性（Excel 内部不能重复）
         seen_match_no = set()
+        # 待写入的 (参赛号, 报名ID) 及其所在行（用于冲突时生成错误行）
+        staged = []
+        staged_rows = {}
         
         # 逐行处理
         for index, row in df.iterrows():
             try:
                 raw_id = row.get(id_col, '') if id_col is not None else ''
 
-                match_no = _cell_to_str(row.get(match_no_col, ''))
+                match_no = cell_to_str(row.get(match_no_col, ''))
 
-                if _is_blank_text(match_no):
+                if is_blank_text(match_no):
                     error_data.append({
                         '行号': index + 2,  # Excel行号从2开始
                         '报名ID': raw_id,
@@ -946,35 +889,18 @@ def import_match_no():
 
                 seen_match_no.add(match_no)
 
+                # 匹配优先级：报名ID；手机号（填写时覆盖报名ID的结果）；仍未匹配时按 (姓名, 学校)
+                application_id, phone_hash, name_school = row_keys[index]
                 application = None
 
-                if id_col is not None:
-                    if raw_id is not None and str(raw_id).strip() != '':
-                        try:
-                            application_id = int(raw_id)
-                            application = Application.query.get(application_id)
-                        except Exception:
-                            application = None
-
-                if has_phone:
-                    phone = str(row.get(phone_col, '')).strip() if phone_col else ''
-                    if phone:
-                        phone_hash = hashlib.sha256(phone.encode()).hexdigest()
-                        application = Application.query.filter(
-                            Application.contact_phone_hash == phone_hash
-                        ).order_by(Application.created_at.desc()).first()
-
-                if (application is None) and has_name_school:
-                    participant_name = str(row.get(name_col, '')).strip() if name_col else ''
-                    school_name = str(row.get(school_col, '')).strip() if school_col else ''
-
-                    if participant_name and school_name:
-                        participant = ApplicationParticipant.query.join(Application).filter(
-                            ApplicationParticipant.participant_name == participant_name,
-                            Application.school_name == school_name
-                        ).order_by(Application.created_at.desc()).first()
-                        if participant:
-                            application = participant.application
+                if application_id is not None:
+                    application = matcher.by_id(application_id)
+
+                if phone_hash is not None:
+                    application = matcher.by_phone_hash(phone_hash)
+
+                if (application is None) and name_school is not None:
+                    application = matcher.by_name_school(*name_school)
 
                 if application is None:
                     error_data.append({
@@ -1000,23 +926,15 @@ def import_match_no():
                     failed_count += 1
                     continue
 
-                # 数据库唯一性：同一个参赛号不能分配给不同报名
-                existing = Application.query.filter(Application.match_no == match_no).first()
-                if existing and getattr(existing, 'id', None) != getattr(application, 'id', None):
-                    error_data.append({
-                        '行号': index + 2,
-                        '姓名': row.get(name_col, '') if name_col else row.get('姓名', ''),
-                        '学校': row.get(school_col, '') if school_col else row.get('学校', ''),
-                        '手机号': row.get(phone_col, '') if phone_col else row.get('手机号', ''),
-                        '参赛号': match_no,
-                        '错误原因': f'参赛号已被其他报名占用(报名ID={existing.id})'
-                    })
-                    failed_count += 1
-                    continue
-
-                # 更新参赛号
-                application.match_no = match_no
-                success_count += 1
+                # 暂存，全部行处理完后统一检测占用并批量写入（唯一性由 uq_applications_match_no 保证）
+                staged.append((match_no, application.id))
+                staged_rows[match_no] = {
+                    '行号': index + 2,
+                    '姓名': row.get(name_col, '') if name_col else row.get('姓名', ''),
+                    '学校': row.get(school_col, '') if school_col else row.get('学校', ''),
+                    '手机号': row.get(phone_col, '') if phone_col else row.get('手机号', ''),
+                    '参赛号': match_no
+                }
                 
             except Exception as e:
                 error_data.append({
@@ -1028,8 +946,14 @@ def import_match_no():
                 })
                 failed_count += 1
         
-        # 提交事务
-        db.session.commit()
+        # 一次查询检测占用，批量写入并提交
+        conflicts = assign_match_nos(staged)
+        for match_no, holder_id in conflicts.items():
+            reason = f'参赛号已被其他报名占用(报名ID={holder_id})' if holder_id is not None else '参赛号已被其他报名占用(并发导入冲突)，请重试'
+            error_data.append({**staged_rows[match_no], '错误原因': reason})
+        success_count = len(staged) - len(conflicts)
+        failed_count += len(conflicts)
+        error_data.sort(key=lambda r: r.get('行号', 0))
         
         # 创建导入日志
         error_log_content = None
@@ -1070,7 +994,10 @@ def import_match_no():
 def import_awards():
     """获奖信息导入接口"""
     try:
+        import pandas as pd
         from models import Application, ImportLog
+        from award_import import apply_award_levels, lookup_match_nos, validate_rows
+        from phase_timer import PhaseTimer
         from app import db
         from config import AWARD_LEVELS
         import os
@@ -1094,6 +1021,8 @@ def import_awards():
                 'message': '仅支持Excel文件格式'
             }), 400
         
+        timer = PhaseTimer()
+
         # 读取Excel文件
         try:
             df = pd.read_excel(file)
@@ -1111,70 +1040,41 @@ def import_awards():
                 'success': False,
                 'message': f'Excel文件缺少必要的列: {", ".join(missing_columns)}'
             }), 400
+        timer.mark('read')
         
         total_count = len(df)
-        success_count = 0
-        failed_count = 0
-        error_data = []
-        updated_application_ids = []
-        
-        # 逐行处理
-        for index, row in df.iterrows():
-            try:
-                match_no = _cell_to_str(row['参赛号'])
-                award_level = _cell_to_str(row['获奖等级'])
 
-                if _is_blank_text(match_no) or _is_blank_text(award_level):
-                    error_data.append({
-                        '行号': index + 2,
-                        '参赛号': match_no,
-                        '获奖等级': award_level,
-                        '错误原因': '参赛号或获奖等级为空'
-                    })
-                    failed_count += 1
-                    continue
+        # 整表校验（不访问数据库）
+        valid_rows, error_data = validate_rows(df, AWARD_LEVELS)
+        timer.mark('validate')
 
-                if AWARD_LEVELS and award_level not in AWARD_LEVELS:
-                    error_data.append({
-                        '行号': index + 2,
-                        '参赛号': match_no,
-                        '获奖等级': award_level,
-                        '错误原因': f'获奖等级不合法（允许：{",".join(AWARD_LEVELS)}）'
-                    })
-                    failed_count += 1
-                    continue
-                
-                # 优先使用参赛号匹配
-                application = Application.query.filter(
-                    Application.match_no == match_no
-                ).first()
-                
-                if not application:
-                    error_data.append({
-                        '行号': index + 2,
-                        '参赛号': match_no,
-                        '获奖等级': award_level,
-                        '错误原因': '未找到匹配的参赛号'
-                    })
-                    failed_count += 1
-                    continue
-                
-                # 更新获奖信息
-                application.award_level = award_level
-                success_count += 1
-                updated_application_ids.append(application.id)
-                
-            except Exception as e:
+        # 参赛号按批 IN 查询解析为报名ID
+        application_ids = lookup_match_nos(match_no for _, match_no, _ in valid_rows)
+        timer.mark('lookup')
+
+        # 同一报名在表中出现多次时以最后一行为准（与逐行写入一致）
+        final = {}
+        updated_application_ids = []
+        for row_no, match_no, award_level in valid_rows:
+            application_id = application_ids.get(match_no)
+            if application_id is None:
                 error_data.append({
-                    '行号': index + 2,
-                    '参赛号': row.get('参赛号', ''),
-                    '获奖等级': row.get('获奖等级', ''),
-                    '错误原因': f'处理异常: {str(e)}'
+                    '行号': row_no,
+                    '参赛号': match_no,
+                    '获奖等级': award_level,
+                    '错误原因': '未找到匹配的参赛号'
                 })
-                failed_count += 1
-        
-        # 提交事务
+                continue
+            final[application_id] = award_level
+            updated_application_ids.append(application_id)
+        success_count = len(updated_application_ids)
+        failed_count = len(error_data)
+        error_data.sort(key=lambda r: r.get('行号', 0))
+
+        # 按获奖等级分组批量 UPDATE，同一事务提交
+        apply_award_levels(final)
         db.session.commit()
+        timer.mark('update')
         
         # 创建导入日志
         error_log_content = None
@@ -1190,106 +1090,84 @@ def import_awards():
         )
         db.session.add(import_log)
         db.session.commit()
+        timer.mark('log')
 
         auto_generate = str(request.args.get('auto_generate', '') or '').strip() in ['1', 'true', 'True', 'yes', 'on']
         if auto_generate and updated_application_ids:
             try:
                 from models import CertificateTemplate
-                from certificate_generator import CertificateGenerator
-                from certificate_routes import _pick_template_config
+                from certificate_generator import get_certificate_generator
+                from certificate_routes import _plan_application_certificates
+                from certificate_batch import OUTPUT_MODE_MERGED, iter_batch_files, parse_output_options
+                from sqlalchemy.orm import selectinload
 
-                applications = Application.query.filter(
+                output_mode, pages_per_file = parse_output_options(request.args)
+
+                applications = Application.query.options(selectinload(Application.participants)).filter(
                     Application.id.in_(updated_application_ids),
                     Application.award_level.isnot(None)
                 ).all()
 
-                generator = CertificateGenerator()
-                generated = []
+                generator = get_certificate_generator()
                 gen_errors = []
+                page_index = []
+                planned = []
 
                 for application in applications:
                     try:
-                        match_no = _safe_filename_part(application.match_no)
-                        participants = sorted(application.participants, key=lambda p: p.seq_no)
-                        name_part = "、".join([p.participant_name for p in participants]) if participants else ''
-
-                        # 学生证书
-                        template_config, err = _pick_template_config(
-                            CertificateTemplate,
-                            generator,
-                            category=application.category,
-                            award_level=application.award_level,
-                            fallback_award_level='一等奖'
-                        )
-                        if err:
-                            raise ValueError(err)
-                        pdf_content = generator.generate_certificate(application, template_config)
-                        player_filename = (
-                            f"{match_no}_"
-                            f"{_safe_filename_part(name_part)}_"
-                            f"{_safe_filename_part(application.category)}_"
-                            f"{_safe_filename_part(application.education_level)}_"
-                            f"{_safe_filename_part(application.award_level)}.pdf"
-                        )
-                        generated.append({'filename': player_filename, 'content': pdf_content})
-
-                        # 辅导员证书
-                        coach_award_level = f"{application.award_level}-辅导员"
-                        coach_config, coach_err = _pick_template_config(
-                            CertificateTemplate,
-                            generator,
-                            category=application.category,
-                            award_level=coach_award_level,
-                            fallback_award_level='一等奖-辅导员'
-                        )
-                        if coach_err:
-                            raise ValueError(coach_err)
-                        coach_pdf = generator.generate_certificate(application, coach_config)
-                        teacher_name = getattr(application, 'teacher_name', '') or ''
-                        coach_filename = (
-                            f"{match_no}_"
-                            f"{_safe_filename_part(teacher_name)}_"
-                            f"{_safe_filename_part(application.category)}_"
-                            f"{_safe_filename_part(coach_award_level)}.pdf"
-                        )
-                        generated.append({'filename': coach_filename, 'content': coach_pdf})
-
+                        plan = _plan_application_certificates(CertificateTemplate, generator, application)
                     except Exception as e:
-                        gen_errors.append({'application_id': application.id, 'error': str(e)})
+                        planned.append((application, None, str(e)))
+                        continue
+                    planned.append((application, plan, None))
 
-                if not generated:
+                # 小程序端 uploadFile 无法稳定处理二进制响应，改为落盘 + 返回下载地址
+                # 证书逐个写入临时 zip，完成后再替换正式文件，不在内存中拼整包
+                folder = os.path.join(os.getcwd(), 'generated_zips')
+                os.makedirs(folder, exist_ok=True)
+                zip_path = os.path.join(folder, f"award_import_{import_log.id}.zip")
+                tmp_path = f"{zip_path}.tmp"
+                generated_count = 0
+                try:
+                    with zipfile.ZipFile(tmp_path, 'w', compression=zipfile.ZIP_DEFLATED) as zf:
+                        for filename, content in iter_batch_files(
+                            generator, planned, output_mode, gen_errors, page_index, pages_per_file=pages_per_file
+                        ):
+                            zf.writestr(filename, content)
+                            generated_count += 1
+                        timer.mark('generate')
+                        manifest = {
+                            'import_log_id': import_log.id,
+                            'total_rows': total_count,
+                            'import_success_count': success_count,
+                            'import_failed_count': failed_count,
+                            'generated_count': generated_count,
+                            'generate_error_count': len(gen_errors),
+                            'generate_errors': gen_errors,
+                            'output_mode': output_mode,
+                            'timings': timer.timings
+                        }
+                        if output_mode == OUTPUT_MODE_MERGED:
+                            manifest['page_count'] = sum(len(f['pages']) for f in page_index)
+                            manifest['files'] = page_index
+                        zf.writestr('manifest.json', json.dumps(manifest, ensure_ascii=False, indent=2))
+                    if generated_count:
+                        os.replace(tmp_path, zip_path)
+                finally:
+                    if os.path.exists(tmp_path):
+                        os.remove(tmp_path)
+
+                if not generated_count:
                     return jsonify({
                         'success': False,
                         'message': f'导入成功，但证书批量生成失败：全部生成失败（失败 {len(gen_errors)} 个）',
                         'data': {
                             'import_log_id': import_log.id,
-                            'errors': gen_errors
+                            'errors': gen_errors,
+                            'timings': timer.timings
                         }
                     }), 500
 
-                zip_buffer = io.BytesIO()
-                with zipfile.ZipFile(zip_buffer, 'w', compression=zipfile.ZIP_DEFLATED) as zf:
-                    for item in generated:
-                        zf.writestr(item['filename'], item['content'])
-                    manifest = {
-                        'import_log_id': import_log.id,
-                        'total_rows': total_count,
-                        'import_success_count': success_count,
-                        'import_failed_count': failed_count,
-                        'generated_count': len(generated),
-                        'generate_error_count': len(gen_errors),
-                        'generate_errors': gen_errors
-                    }
-                    zf.writestr('manifest.json', json.dumps(manifest, ensure_ascii=False, indent=2))
-
-                zip_buffer.seek(0)
-                # 小程序端 uploadFile 无法稳定处理二进制响应，改为落盘 + 返回下载地址
-                folder = os.path.join(os.getcwd(), 'generated_zips')
-                os.makedirs(folder, exist_ok=True)
-                zip_path = os.path.join(folder, f"award_import_{import_log.id}.zip")
-                with open(zip_path, 'wb') as f:
-                    f.write(zip_buffer.getvalue())
-
                 return jsonify({
                     'success': True,
                     'message': f'导入完成，成功 {success_count} 条，失败 {failed_count} 条；证书压缩包已生成',
@@ -1300,7 +1178,8 @@ def import_awards():
                         'error_log_available': error_log_content is not None,
                         'import_log_id': import_log.id,
                         'zip_available': True,
-                        'zip_download_url': f'/api/admin/download-awards-zip/{import_log.id}'
+                        'zip_download_url': f'/api/admin/download-awards-zip/{import_log.id}',
+                        'timings': timer.timings
                     }
                 })
 
@@ -1309,7 +1188,8 @@ def import_awards():
                     'success': False,
                     'message': f'导入成功，但证书批量生成失败: {str(e)}',
                     'data': {
-                        'import_log_id': import_log.id
+                        'import_log_id': import_log.id,
+                        'timings': timer.timings
                     }
                 }), 500
 
@@ -1321,7 +1201,8 @@ def import_awards():
                 'success_count': success_count,
                 'failed_count': failed_count,
                 'error_log_available': error_log_content is not None,
-                'import_log_id': import_log.id
+                'import_log_id': import_log.id,
+                'timings': timer.timings
             }
         })
         
@@ -7,12 +7,6 @@ import base64
 import os
 from datetime import datetime
 import re
-import pandas as pd
-import io
-from reportlab.pdfgen import canvas
-from reportlab.lib.pagesizes import A4
-from reportlab.pdfbase import pdfmetrics
-from reportlab.pdfbase.ttfonts import TTFont
 import json
 import sys
 
@@ -0,0 +1,98 @@
+"""获奖信息导入：整表校验 + 批量写入
+
+原实现逐行 Application.query.filter(match_no == ...) 并逐个修改 ORM 对象，几千行的成绩表
+就是几千次查询。这里分阶段处理：
+
+1. validate：整表规范化、校验（空值、获奖等级），不访问数据库；
+2. lookup：参赛号按批 IN 查询一次解析为报名ID（match_no 有唯一索引）；
+3. update：按获奖等级分组，按批 UPDATE ... WHERE id IN (...)，同一事务提交；
+   获奖等级没有变化的报名不更新（与 ORM 只写入变更字段一致，updated_at 不变）。
+
+phase_timer.PhaseTimer 记录每个阶段的耗时，随接口响应返回。错误行的内容与顺序与逐行处理一致。
+"""
+from import_utils import cell_to_str, is_blank_text
+
+
+LOOKUP_BATCH_SIZE = 1000
+UPDATE_BATCH_SIZE = 500
+
+
+def _batches(values, size):
+    values = list(values)
+    for start in range(0, len(values), size):
+        yield values[start:start + size]
+
+
+def validate_rows(df, award_levels):
+    """返回 ([(行号, 参赛号, 获奖等级)], 错误行)"""
+    valid = []
+    errors = []
+    for index, row in df.iterrows():
+        try:
+            match_no = cell_to_str(row['参赛号'])
+            award_level = cell_to_str(row['获奖等级'])
+
+            if is_blank_text(match_no) or is_blank_text(award_level):
+                errors.append({
+                    '行号': index + 2,
+                    '参赛号': match_no,
+                    '获奖等级': award_level,
+                    '错误原因': '参赛号或获奖等级为空'
+                })
+                continue
+
+            if award_levels and award_level not in award_levels:
+                errors.append({
+                    '行号': index + 2,
+                    '参赛号': match_no,
+                    '获奖等级': award_level,
+                    '错误原因': f'获奖等级不合法（允许：{",".join(award_levels)}）'
+                })
+                continue
+
+            valid.append((index + 2, match_no, award_level))
+        except Exception as e:
+            errors.append({
+                '行号': index + 2,
+                '参赛号': row.get('参赛号', ''),
+                '获奖等级': row.get('获奖等级', ''),
+                '错误原因': f'处理异常: {str(e)}'
+            })
+    return valid, errors
+
+
+def lookup_match_nos(match_nos):
+    """{参赛号: 报名ID}"""
+    from models import Application
+
+    found = {}
+    for batch in _batches(set(match_nos), LOOKUP_BATCH_SIZE):
+        rows = Application.query.with_entities(Application.id, Application.match_no).filter(
+            Application.match_no.in_(batch)
+        ).all()
+        found.update((row.match_no, row.id) for row in rows)
+    return found
+
+
+def apply_award_levels(final):
+    """final: {报名ID: 获奖等级}；按等级分组批量 UPDATE（调用方提交）。返回执行的 UPDATE 语句数"""
+    from sqlalchemy import or_, update
+    from app import db
+    from models import Application
+
+    by_level = {}
+    for application_id, award_level in final.items():
+        by_level.setdefault(award_level, []).append(application_id)
+
+    statements = 0
+    for award_level, ids in sorted(by_level.items()):
+        for batch in _batches(sorted(ids), UPDATE_BATCH_SIZE):
+            db.session.execute(
+                update(Application).where(
+                    Application.id.in_(batch),
+                    or_(Application.award_level.is_(None), Application.award_level != award_level)
+                ).values(award_level=award_level),
+                execution_options={'synchronize_session': False}
+            )
+            statements += 1
+    return statements
@@ -0,0 +1,276 @@
+"""证书渲染基准测试
+
+用合成的报名记录（1/3/5 名选手、超长姓名）在真实背景图/字体上渲染各类模板，输出 JSON：
+单张证书耗时分位数、PDF 大小、N 个进程并行时的吞吐量、峰值 RSS。
+
+    python benchmark_certificate_render.py
+    python benchmark_certificate_render.py --iterations 50 --workers 1,2,4 --output bench.json
+
+多次运行的 JSON 可以直接 diff / 汇总，对比优化前后的变化。
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import platform
+import resource
+import statistics
+import subprocess
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from datetime import datetime
+
+from certificate_generator import CertificateGenerator
+
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+@dataclass
+class _Participant:
+    seq_no: int
+    participant_name: str
+
+
+class _Application:
+    def __init__(self, participant_names: list[str]):
+        self.participant_count = len(participant_names)
+        self.participants = [
+            _Participant(seq_no=i + 1, participant_name=name) for i, name in enumerate(participant_names)
+        ]
+        self.match_no = "BENCH-0001"
+        self.category = "无人机足球"
+        self.task = "机器人任务"
+        self.education_level = "初中组"
+        self.award_level = "一等奖"
+        self.school_name = "北京市海淀区中关村第三小学教育集团万柳校区"
+        self.teacher_name = "王老师"
+        self.contact_name = "李老师"
+
+
+_SHORT_NAMES = ["张三", "李四", "王五", "赵六", "钱七"]
+_LONG_NAMES = ["欧阳娜娜娜娜", "司马相如相如", "诸葛孔明明明", "上官婉儿婉儿", "慕容复复复复"]
+
+APPLICATIONS = {
+    "1p": _Application(_SHORT_NAMES[:1]),
+    "3p": _Application(_SHORT_NAMES[:3]),
+    "5p": _Application(_SHORT_NAMES[:5]),
+    "5p_long": _Application(_LONG_NAMES[:5]),
+}
+
+
+def _load_json_template(filename: str) -> dict:
+    with open(os.path.join(BASE_DIR, filename), "r", encoding="utf-8") as f:
+        data = json.load(f)
+    return data.get("config", data)
+
+
+def _stamp_image() -> str:
+    # 仓库中未附带 stamp.png 时用另一张真实背景图代替，保证印章叠加路径被测到
+    for rel in ["assets/cert/stamp.png", "assets/cert/player1.png"]:
+        if os.path.exists(os.path.join(BASE_DIR, rel)):
+            return rel
+    return "assets/cert/stamp.png"
+
+
+def template_shapes(gen: CertificateGenerator) -> dict:
+    """各类模板写法：旧版 block、texts 折行、自适应字号、印章叠加、按背景图尺寸出页"""
+    background_size = {
+        "background_image": "assets/cert/player.png",
+        "use_background_size": True,
+        "coord_unit": "px",
+        "y_origin": "top",
+        "global_y_offset": 0,
+        "texts": [
+            {"field": "participants_names", "font": "宋体", "font_size": 24, "align": "center", "width": 1262, "x": 0, "y": 400},
+            {"field": "category", "font": "宋体", "font_size": 24, "align": "center", "width": 180, "x": 680, "y": 470},
+            {"field": "education_level", "font": "宋体", "font_size": 24, "align": "center", "width": 140, "x": 920, "y": 470},
+            {"field": "award_level", "font": "华文楷体", "font_size": 84, "align": "center", "width": 1262, "x": 0, "y": 590},
+        ],
+    }
+    auto_size = {
+        "background_image": "assets/cert/player.png",
+        "texts": [
+            {"field": "participants_names", "auto_size": True, "max_font_size": 32, "min_font_size": 12, "font": "宋体", "x": 30, "y": 128, "width": 60},
+            {"field": "school_name", "auto_size": True, "max_font_size": 24, "min_font_size": 10, "font": "宋体", "x": 30, "y": 110, "width": 80},
+            {"field": "award_level", "auto_size": True, "max_font_size": 84, "min_font_size": 40, "font": "华文楷体", "x": 30, "y": 74, "width": 150},
+        ],
+    }
+    stamp_overlay = dict(background_size)
+    stamp_overlay.update({
+        "stamp_image": _stamp_image(),
+        "stamp_center_x": True,
+        "stamp_y": 750,
+        "stamp_y_anchor": "center",
+        "stamp_width": 200,
+        "stamp_height": 200,
+    })
+    return {
+        "legacy_blocks": gen.create_default_template("无人机足球", "一等奖"),
+        "texts_wrap_player": _load_json_template("player_template_debug.json"),
+        "texts_wrap_coach": _load_json_template("coach_template_final.json"),
+        "auto_size": auto_size,
+        "stamp_overlay": stamp_overlay,
+        "background_size": background_size,
+    }
+
+
+def _percentile(sorted_values: list[float], pct: float) -> float:
+    if not sorted_values:
+        return 0.0
+    k = (len(sorted_values) - 1) * pct / 100.0
+    lo = int(k)
+    hi = min(lo + 1, len(sorted_values) - 1)
+    return sorted_values[lo] + (sorted_values[hi] - sorted_values[lo]) * (k - lo)
+
+
+def _latency_summary(samples_ms: list[float]) -> dict:
+    values = sorted(samples_ms)
+    return {
+        "count": len(values),
+        "mean_ms": round(statistics.fmean(values), 3) if values else 0.0,
+        "p50_ms": round(_percentile(values, 50), 3),
+        "p90_ms": round(_percentile(values, 90), 3),
+        "p99_ms": round(_percentile(values, 99), 3),
+        "max_ms": round(values[-1], 3) if values else 0.0,
+    }
+
+
+def _peak_rss_kb(who=resource.RUSAGE_SELF) -> int:
+    # Linux 上 ru_maxrss 单位为 KB，macOS 为字节
+    rss = resource.getrusage(who).ru_maxrss
+    return int(rss / 1024) if sys.platform == "darwin" else int(rss)
+
+
+def bench_latency(gen: CertificateGenerator, shapes: dict, iterations: int, warmup: int) -> dict:
+    results = {}
+    for shape_name, config in shapes.items():
+        for app_name, application in APPLICATIONS.items():
+            t0 = time.perf_counter()
+            first = gen.generate_certificate(application, config)
+            cold_ms = (time.perf_counter() - t0) * 1000.0
+            for _ in range(max(0, warmup - 1)):
+                gen.generate_certificate(application, config)
+
+            samples = []
+            sizes = []
+            for _ in range(iterations):
+                t0 = time.perf_counter()
+                pdf = gen.generate_certificate(application, config)
+                samples.append((time.perf_counter() - t0) * 1000.0)
+                sizes.append(len(pdf))
+
+            results[f"{shape_name}/{app_name}"] = {
+                "first_render_ms": round(cold_ms, 3),
+                "latency": _latency_summary(samples),
+                "pdf_bytes": {
+                    "first": len(first),
+                    "mean": int(statistics.fmean(sizes)) if sizes else 0,
+                    "max": max(sizes) if sizes else 0,
+                },
+            }
+    return results
+
+
+_WORKER_GENERATOR = None
+_WORKER_SHAPES = None
+
+
+def _init_worker() -> None:
+    global _WORKER_GENERATOR, _WORKER_SHAPES
+    _WORKER_GENERATOR = CertificateGenerator()
+    _WORKER_SHAPES = template_shapes(_WORKER_GENERATOR)
+
+
+def _render_task(task: tuple[str, str]) -> int:
+    shape_name, app_name = task
+    return len(_WORKER_GENERATOR.generate_certificate(APPLICATIONS[app_name], _WORKER_SHAPES[shape_name]))
+
+
+def bench_throughput(shapes: dict, workers: int, certificates: int) -> dict:
+    """用 workers 个进程渲染 certificates 张证书（轮流使用各模板/记录），返回每秒张数"""
+    combos = [(s, a) for s in shapes for a in APPLICATIONS]
+    tasks = [combos[i % len(combos)] for i in range(certificates)]
+
+    import multiprocessing
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"), initializer=_init_worker) as pool:
+        # 先让每个进程完成初始化与一次渲染，不计入计时
+        list(pool.map(_render_task, combos[:1] * workers))
+        t0 = time.perf_counter()
+        total_bytes = sum(pool.map(_render_task, tasks, chunksize=max(1, len(tasks) // (workers * 4))))
+        elapsed = time.perf_counter() - t0
+
+    return {
+        "workers": workers,
+        "certificates": certificates,
+        "elapsed_s": round(elapsed, 3),
+        "certificates_per_s": round(certificates / elapsed, 2) if elapsed > 0 else None,
+        "total_pdf_bytes": total_bytes,
+    }
+
+
+def _git_commit() -> str | None:
+    try:
+        out = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=BASE_DIR, capture_output=True, text=True, timeout=5)
+        return out.stdout.strip() or None
+    except Exception:
+        return None
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="证书渲染基准测试")
+    parser.add_argument("--iterations", type=int, default=20, help="每个 模板×记录 组合的计时次数")
+    parser.add_argument("--warmup", type=int, default=2, help="计时前的预热次数")
+    parser.add_argument("--shapes", default="", help="只测指定模板，逗号分隔")
+    parser.add_argument("--workers", default="1,2,4", help="吞吐量测试的进程数，逗号分隔；空字符串跳过")
+    parser.add_argument("--throughput-certificates", type=int, default=200, help="吞吐量测试每轮渲染的证书数")
+    parser.add_argument("--output", default="", help="结果 JSON 写入路径（默认输出到 stdout）")
+    args = parser.parse_args()
+
+    gen = CertificateGenerator()
+    shapes = template_shapes(gen)
+    if args.shapes:
+        wanted = [s.strip() for s in args.shapes.split(",") if s.strip()]
+        unknown = [s for s in wanted if s not in shapes]
+        if unknown:
+            parser.error(f"未知模板: {', '.join(unknown)}（可选: {', '.join(shapes)}）")
+        shapes = {s: shapes[s] for s in wanted}
+
+    result = {
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "git_commit": _git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "fonts": gen.font_registry.report(),
+        "params": {
+            "iterations": args.iterations,
+            "warmup": args.warmup,
+            "shapes": list(shapes),
+            "applications": list(APPLICATIONS),
+        },
+    }
+
+    result["latency"] = bench_latency(gen, shapes, args.iterations, args.warmup)
+    result["peak_rss_kb"] = _peak_rss_kb()
+
+    workers_list = [int(w) for w in str(args.workers).split(",") if w.strip()]
+    result["throughput"] = [bench_throughput(shapes, w, args.throughput_certificates) for w in workers_list]
+    if workers_list:
+        result["peak_rss_kb_children"] = _peak_rss_kb(resource.RUSAGE_CHILDREN)
+
+    payload = json.dumps(result, ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(payload)
+        print(f"Saved: {args.output}")
+    else:
+        print(payload)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
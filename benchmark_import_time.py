@@ -0,0 +1,124 @@
+"""应用冷启动导入耗时基准
+
+在全新的解释器里用 ``python -X importtime -c "import app"`` 多次导入应用，取累计耗时的中位数，
+与 import_time_budget.json 中记录的预算比较；同时检查 pandas / openpyxl / reportlab / pypinyin
+等重量级库没有在导入阶段被加载（它们只在导入导出、生成证书时按需加载）。
+
+    python benchmark_import_time.py               # 超出预算或提前加载了重量级库时退出码为 1
+    python benchmark_import_time.py --record      # 以本机测量值 ×(1+headroom) 重新记录预算
+
+预算与机器相关，换了部署/CI 机器后用 --record 重新记录一次。
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_BUDGET_FILE = os.path.join(BASE_DIR, "import_time_budget.json")
+DEFAULT_LAZY_MODULES = ["pandas", "numpy", "openpyxl", "reportlab", "PIL", "pypinyin"]
+
+
+def _parse_importtime(stderr: str) -> dict[str, int]:
+    """-X importtime 输出 -> {模块名: 累计微秒}"""
+    cumulative = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        parts = line[len("import time:"):].split("|")
+        if len(parts) != 3:
+            continue
+        try:
+            cumulative[parts[2].strip()] = int(parts[1].strip())
+        except ValueError:
+            continue
+    return cumulative
+
+
+def measure_once(module: str) -> dict[str, int]:
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=BASE_DIR,
+        capture_output=True,
+        text=True,
+    )
+    if proc.returncode != 0:
+        raise RuntimeError(f"import {module} 失败:\n{proc.stderr[-2000:]}")
+    timings = _parse_importtime(proc.stderr)
+    if module not in timings:
+        raise RuntimeError(f"importtime 输出中没有 {module}")
+    return timings
+
+
+def load_budget(path: str) -> dict:
+    if not os.path.exists(path):
+        return {}
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="应用冷启动导入耗时基准")
+    parser.add_argument("--module", default="", help="要导入的模块（默认取预算文件中的值，否则为 app）")
+    parser.add_argument("--runs", type=int, default=5, help="导入次数，取中位数")
+    parser.add_argument("--budget-file", default=DEFAULT_BUDGET_FILE, help="预算文件路径")
+    parser.add_argument("--record", action="store_true", help="用本次测量结果重新记录预算")
+    parser.add_argument("--headroom", type=float, default=0.5, help="--record 时在测量值上预留的比例")
+    args = parser.parse_args()
+
+    budget = load_budget(args.budget_file)
+    module = args.module or budget.get("module") or "app"
+    lazy_modules = budget.get("lazy_modules") or DEFAULT_LAZY_MODULES
+
+    samples_ms = []
+    loaded = set()
+    for _ in range(max(1, args.runs)):
+        timings = measure_once(module)
+        samples_ms.append(timings[module] / 1000.0)
+        loaded.update(name.split(".")[0] for name in timings)
+    median_ms = statistics.median(samples_ms)
+    eager = sorted(m for m in lazy_modules if m in loaded)
+
+    result = {
+        "module": module,
+        "runs": len(samples_ms),
+        "median_ms": round(median_ms, 1),
+        "min_ms": round(min(samples_ms), 1),
+        "max_ms": round(max(samples_ms), 1),
+        "eagerly_loaded": eager,
+    }
+
+    if args.record:
+        budget = {
+            "module": module,
+            "budget_ms": round(median_ms * (1.0 + args.headroom)),
+            "measured_ms": round(median_ms, 1),
+            "lazy_modules": lazy_modules,
+        }
+        with open(args.budget_file, "w", encoding="utf-8") as f:
+            json.dump(budget, f, ensure_ascii=False, indent=2)
+            f.write("\n")
+        result["recorded_budget_ms"] = budget["budget_ms"]
+        print(json.dumps(result, ensure_ascii=False, indent=2))
+        return 1 if eager else 0
+
+    budget_ms = budget.get("budget_ms")
+    result["budget_ms"] = budget_ms
+    failures = []
+    if budget_ms is not None and median_ms > float(budget_ms):
+        failures.append(f"导入耗时 {median_ms:.1f}ms 超出预算 {budget_ms}ms")
+    if eager:
+        failures.append(f"导入阶段加载了重量级库: {', '.join(eager)}")
+    result["failures"] = failures
+
+    print(json.dumps(result, ensure_ascii=False, indent=2))
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -35,6 +35,142 @@ def _seed_default_templates():
     db.session.commit()
 
 
+def _ensure_school_initial_column():
+    """旧库没有 applications.school_initial：补列（create_all 不会修改已有表，索引由 _ensure_indexes 补建），可重复执行"""
+    from sqlalchemy import inspect, text
+    from app import db
+
+    inspector = inspect(db.engine)
+    columns = {c['name'] for c in inspector.get_columns('applications')}
+    if 'school_initial' not in columns:
+        db.session.execute(text('ALTER TABLE applications ADD COLUMN school_initial VARCHAR(100)'))
+        db.session.commit()
+
+
+# 已被替换、需要从已有库删除的索引：{表名: {旧索引名: 取代它的索引名}}，取代的索引建好后才删除。
+# 已部署的库中 excellent_coaches.teacher_phone_hash 是 index=True 建的普通索引，现由唯一索引取代
+_OBSOLETE_INDEXES = {
+    'excellent_coaches': {'ix_excellent_coaches_teacher_phone_hash': 'uq_excellent_coaches_phone_hash'},
+}
+
+
+def _report_duplicates(table, index):
+    """唯一索引建不起来时列出重复值，便于人工清理"""
+    from sqlalchemy import func, select
+    from app import db
+
+    cols = [table.c[c.name] for c in index.columns]
+    rows = db.session.execute(
+        select(*cols, func.count().label('n')).where(*[c.isnot(None) for c in cols])
+        .group_by(*cols).having(func.count() > 1).limit(20)
+    ).all()
+    for row in rows:
+        print(f"  重复值 {tuple(row)[:-1]}: {row.n} 条")
+
+
+def _ensure_indexes():
+    """补建模型中声明、但已有表上还没有的索引（create_all 只为新建的表建索引），删除已被替换的旧索引，
+    可重复执行。返回新建的索引名；某个索引建不起来（如唯一索引遇到重复数据）时打印原因并跳过"""
+    from sqlalchemy import inspect, text
+    from app import db
+
+    inspector = inspect(db.engine)
+    tables = set(inspector.get_table_names())
+    created = []
+    for table in db.metadata.sorted_tables:
+        if table.name not in tables:
+            continue
+        existing = {i['name'] for i in inspector.get_indexes(table.name)}
+        existing.update(c['name'] for c in inspector.get_unique_constraints(table.name))
+        for index in sorted(table.indexes, key=lambda i: i.name):
+            if index.name in existing:
+                continue
+            try:
+                index.create(bind=db.engine)
+                created.append(index.name)
+            except Exception as e:
+                print(f"创建索引 {index.name} 失败: {e}")
+                if index.unique:
+                    _report_duplicates(table, index)
+        for name, replacement in _OBSOLETE_INDEXES.get(table.name, {}).items():
+            if name in existing and (replacement in existing or replacement in created):
+                on_table = f' ON {table.name}' if db.engine.dialect.name == 'mysql' else ''
+                db.session.execute(text(f'DROP INDEX {name}{on_table}'))
+                db.session.commit()
+    return created
+
+
+def _backfill_school_initial(batch_size=500):
+    """为 school_initial 为空的记录计算拼音首字母；按主键分批提交，已回填的记录不会重复处理"""
+    from sqlalchemy import update
+    from app import db
+    from models import Application, compute_school_initial
+
+    last_id = 0
+    updated = 0
+    while True:
+        rows = Application.query.with_entities(Application.id, Application.school_name).filter(
+            Application.school_initial.is_(None),
+            Application.id > last_id
+        ).order_by(Application.id).limit(batch_size).all()
+        if not rows:
+            break
+        last_id = rows[-1].id
+
+        values = []
+        for row in rows:
+            initial = compute_school_initial(row.school_name)
+            if initial is not None:
+                values.append({'id': row.id, 'school_initial': initial})
+        if values:
+            db.session.execute(update(Application), values)
+            db.session.commit()
+            updated += len(values)
+    return updated
+
+
+def _ensure_school_name_index(batch_size=500):
+    """学校名称模糊搜索的索引（见 school_search），可重复执行：MySQL 建 ngram FULLTEXT 索引，
+    其他数据库为还没有登记的学校名称回填 2-gram 倒排表。返回回填的学校名称数"""
+    from sqlalchemy import inspect, select, text
+    from app import db
+    from models import Application, SchoolNameToken
+    from school_search import FULLTEXT_INDEX_NAME, school_name_ngrams
+
+    if db.engine.dialect.name == 'mysql':
+        indexes = {i['name'] for i in inspect(db.engine).get_indexes('applications')}
+        if FULLTEXT_INDEX_NAME in indexes:
+            return 0
+        try:
+            db.session.execute(text(
+                f'ALTER TABLE applications ADD FULLTEXT INDEX {FULLTEXT_INDEX_NAME} (school_name) WITH PARSER ngram'
+            ))
+            db.session.commit()
+        except Exception as e:
+            # 不支持 ngram 解析器时学校名称搜索继续使用 LIKE
+            db.session.rollback()
+            print(f"创建学校名称全文索引失败，继续使用 LIKE 搜索: {e}")
+        return 0
+
+    table = SchoolNameToken.__table__
+    registered = select(table.c.school_name).where(table.c.school_name == Application.school_name).exists()
+    names = [
+        row.school_name for row in Application.query.with_entities(Application.school_name).filter(~registered).distinct()
+    ]
+    backfilled = 0
+    for i in range(0, len(names), batch_size):
+        values = [
+            {'token': gram, 'school_name': name}
+            for name in names[i:i + batch_size]
+            for gram in sorted(school_name_ngrams(name))
+        ]
+        if values:
+            db.session.execute(table.insert(), values)
+            db.session.commit()
+            backfilled += len({v['school_name'] for v in values})
+    return backfilled
+
+
 def main():
     from app import app, db
     import models  # noqa: F401
@@ -42,6 +178,15 @@ def main():
     with app.app_context():
         db.create_all()
         try:
+            _ensure_school_initial_column()
+            for name in _ensure_indexes():
+                print(f"已创建索引 {name}")
+            updated = _backfill_school_initial()
+            if updated:
+                print(f"school_initial 回填 {updated} 条")
+            backfilled = _ensure_school_name_index()
+            if backfilled:
+                print(f"学校名称搜索索引回填 {backfilled} 个学校名称")
             _seed_default_templates()
         except Exception:
             db.session.rollback()
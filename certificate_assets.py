@@ -0,0 +1,283 @@
+"""证书渲染共享资源（进程级）
+
+字体只在每个 worker 进程内加载一次，所有 CertificateGenerator 实例共享，
+避免每次请求都重新探测 assets/fonts 并解析体积很大的中文 TTF/TTC 文件。
+背景图/印章图解码后按 路径 + mtime + 文件大小 缓存，同样在进程内共享。
+"""
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+
+from reportlab.pdfbase import pdfmetrics
+from reportlab.pdfbase.ttfonts import TTFont
+from reportlab.pdfbase.cidfonts import UnicodeCIDFont
+from reportlab.lib.utils import ImageReader
+
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+FONTS_DIR = os.path.join(BASE_DIR, 'assets', 'fonts')
+
+FONT_ALIASES = {
+    '黑体': 'SimHei',
+    '宋体': 'SimSun',
+    '幼圆': 'YouYuan',
+    '华文楷体': 'STKaiti',
+    'CJK': 'STSong',
+    'SimHei': 'SimHei',
+    'SimSun': 'SimSun',
+    'YouYuan': 'YouYuan',
+    'STKaiti': 'STKaiti',
+    'STSong': 'STSong',
+    'Helvetica': 'Helvetica'
+}
+
+FONT_CANDIDATES = [
+    ('SimHei', ['simhei.ttf', 'SimHei.ttf', 'SimHei.TTF']),
+    ('SimSun', ['simsun.ttc', 'SimSun.ttc', 'simsun.ttf', 'SimSun.ttf', 'simsunb.ttf', 'SimSunB.ttf', 'SIMSUNB.TTF']),
+    ('YouYuan', ['youyuan.ttf', 'YouYuan.ttf', 'youyuan.ttc', 'YouYuan.ttc', 'SIMYOU.TTF', 'SimYou.ttf', 'simyou.ttf']),
+    ('STKaiti', ['stkaiti.ttf', 'STKaiti.ttf', 'stkaiti.ttc', 'STKaiti.ttc', 'STKAITI.TTF', 'stkaiti.ttf']),
+]
+
+CID_FALLBACK_FONT = 'STSong-Light'
+
+
+class FontRegistry:
+    """进程级字体注册表：首次访问时加载，之后只读。"""
+
+    def __init__(self, fonts_dir=FONTS_DIR):
+        self.fonts_dir = fonts_dir
+        self._lock = threading.Lock()
+        self._loaded = False
+        self.registered_fonts = frozenset(['Helvetica'])
+        self.font_files = {}
+        self.missing_fonts = []
+        self.default_font = 'Helvetica'
+        self.cjk_fallback_font = 'Helvetica'
+
+    @property
+    def loaded(self):
+        return self._loaded
+
+    def load(self):
+        if self._loaded:
+            return self
+        with self._lock:
+            if self._loaded:
+                return self
+
+            registered = set(['Helvetica'])
+            font_files = {}
+            missing = []
+
+            try:
+                pdfmetrics.registerFont(UnicodeCIDFont(CID_FALLBACK_FONT))
+                registered.add(CID_FALLBACK_FONT)
+            except Exception:
+                pass
+
+            for font_name, filenames in FONT_CANDIDATES:
+                for fn in filenames:
+                    fp = os.path.join(self.fonts_dir, fn)
+                    if not os.path.exists(fp):
+                        continue
+                    try:
+                        if fp.lower().endswith('.ttc'):
+                            pdfmetrics.registerFont(TTFont(font_name, fp, subfontIndex=0))
+                        else:
+                            pdfmetrics.registerFont(TTFont(font_name, fp))
+                        registered.add(font_name)
+                        font_files[font_name] = fp
+                        break
+                    except Exception:
+                        continue
+                if font_name not in registered:
+                    missing.append(font_name)
+
+            self.registered_fonts = frozenset(registered)
+            self.font_files = font_files
+            self.missing_fonts = missing
+            self.default_font = 'SimHei' if 'SimHei' in registered else 'Helvetica'
+            self.cjk_fallback_font = CID_FALLBACK_FONT if CID_FALLBACK_FONT in registered else self.default_font
+            self._loaded = True
+        return self
+
+    def resolve(self, font_name):
+        if not font_name:
+            return self.default_font
+        resolved = FONT_ALIASES.get(font_name, font_name)
+        if resolved in self.registered_fonts:
+            return resolved
+        if self.cjk_fallback_font in self.registered_fonts:
+            return self.cjk_fallback_font
+        return self.default_font
+
+    def report(self):
+        """返回字体解析结果，便于排查线上缺字体导致的“错版”。"""
+        return {
+            'loaded': self._loaded,
+            'fonts_dir': self.fonts_dir,
+            'registered': sorted(self.registered_fonts),
+            'files': dict(self.font_files),
+            'missing': list(self.missing_fonts),
+            'default_font': self.default_font,
+            'cjk_fallback_font': self.cjk_fallback_font
+        }
+
+
+_FONT_REGISTRY = None
+_FONT_REGISTRY_LOCK = threading.Lock()
+
+
+def get_font_registry():
+    """获取（并按需加载）当前进程的字体注册表"""
+    global _FONT_REGISTRY
+    registry = _FONT_REGISTRY
+    if registry is None:
+        with _FONT_REGISTRY_LOCK:
+            if _FONT_REGISTRY is None:
+                _FONT_REGISTRY = FontRegistry()
+            registry = _FONT_REGISTRY
+    return registry.load()
+
+
+def resolve_asset_path(path):
+    """模板中的相对路径（如 assets/cert/player.png）按项目根目录解析"""
+    if not path:
+        return None
+    path = str(path)
+    return path if os.path.isabs(path) else os.path.join(BASE_DIR, path)
+
+
+_ASSET_DIGESTS = {}
+_ASSET_DIGESTS_LOCK = threading.Lock()
+
+
+def asset_digest(path):
+    """资源文件内容的 sha256（按 路径 + mtime + 大小 记忆），文件不存在时返回 None"""
+    path = resolve_asset_path(path)
+    if not path:
+        return None
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    key = (os.path.abspath(path), st.st_mtime_ns, st.st_size)
+    with _ASSET_DIGESTS_LOCK:
+        digest = _ASSET_DIGESTS.get(key)
+    if digest:
+        return digest
+
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            h.update(chunk)
+    digest = h.hexdigest()
+    with _ASSET_DIGESTS_LOCK:
+        for old_key in [k for k in _ASSET_DIGESTS if k[0] == key[0]]:
+            del _ASSET_DIGESTS[old_key]
+        _ASSET_DIGESTS[key] = digest
+    return digest
+
+
+class CachedImage:
+    """已解码的图片：ImageReader（含 RGB/alpha 数据）+ 像素尺寸"""
+
+    __slots__ = ('path', 'key', 'reader', 'width', 'height')
+
+    def __init__(self, path, key, reader, width, height):
+        self.path = path
+        self.key = key
+        self.reader = reader
+        self.width = width
+        self.height = height
+
+    @property
+    def size(self):
+        return self.width, self.height
+
+
+class ImageCache:
+    """有界 LRU：缓存解码后的证书背景/印章图片"""
+
+    def __init__(self, max_entries=8):
+        self.max_entries = max(1, int(max_entries))
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _load(self, path, key):
+        reader = ImageReader(path)
+        # 预先完成解码与 alpha 通道拆分，之后 drawImage(mask='auto') 只读取缓存结果，
+        # 多线程共享同一个 ImageReader 也不会重复解码
+        reader.getRGBData()
+        alpha = getattr(reader, '_dataA', None)
+        if alpha is not None:
+            alpha.getRGBData()
+        width, height = reader.getSize()
+        return CachedImage(path, key, reader, width, height)
+
+    def get(self, path):
+        """返回 CachedImage；文件不存在时返回 None"""
+        path = resolve_asset_path(path)
+        if not path:
+            return None
+        try:
+            st = os.stat(path)
+        except OSError:
+            return None
+        key = (os.path.abspath(path), st.st_mtime_ns, st.st_size)
+
+        with self._lock:
+            cached = self._entries.get(key)
+            if cached is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return cached
+            self.misses += 1
+
+        cached = self._load(path, key)
+        with self._lock:
+            # 文件被替换后旧版本不会再命中，顺手清掉同一路径的旧条目
+            for old_key in [k for k in self._entries if k[0] == key[0] and k != key]:
+                del self._entries[old_key]
+            self._entries[key] = cached
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return cached
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'max_entries': self.max_entries,
+                'hits': self.hits,
+                'misses': self.misses,
+                'paths': [k[0] for k in self._entries]
+            }
+
+
+_IMAGE_CACHE = None
+_IMAGE_CACHE_LOCK = threading.Lock()
+
+
+def get_image_cache():
+    """获取当前进程的图片缓存（容量由 CERT_IMAGE_CACHE_SIZE 控制，默认 8）"""
+    global _IMAGE_CACHE
+    cache = _IMAGE_CACHE
+    if cache is None:
+        with _IMAGE_CACHE_LOCK:
+            if _IMAGE_CACHE is None:
+                try:
+                    max_entries = int(str(os.environ.get('CERT_IMAGE_CACHE_SIZE', '') or '8').strip() or 8)
+                except Exception:
+                    max_entries = 8
+                _IMAGE_CACHE = ImageCache(max_entries=max_entries)
+            cache = _IMAGE_CACHE
+    return cache
@@ -0,0 +1,369 @@
+"""证书批量渲染
+
+模板解析（需要数据库）在路由中完成，得到每条获奖记录的 plan：
+    {
+        'application_id': int,
+        'player_config': dict, 'player_filename': str,
+        'coach_config': dict | None, 'coach_filename': str | None,
+        'coach_error': str | None,
+    }
+这里只负责把 plan 渲染成 PDF。
+
+设置 CERT_RENDER_WORKERS=N（N > 1）后，批量渲染分发到 N 个进程的进程池；
+子进程启动时预加载字体与证书背景图，ORM 对象先转换为可 pickle 的 ApplicationRecord。
+未设置时在当前进程内顺序渲染。进程池中同时排队/渲染的任务最多 2×N 个：调用方取走最早的结果后
+才提交下一个，下游（流式响应）慢时已渲染的 PDF 不会在父进程中堆积；生成器被关闭（客户端断开）时
+取消尚未开始的任务。
+"""
+import atexit
+import multiprocessing
+import os
+import threading
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+OUTPUT_MODE_ZIP = 'zip'
+OUTPUT_MODE_MERGED = 'merged'
+OUTPUT_MODES = [OUTPUT_MODE_ZIP, OUTPUT_MODE_MERGED]
+
+
+class ParticipantRecord:
+    """ApplicationParticipant 的纯数据副本"""
+
+    __slots__ = ('seq_no', 'participant_name')
+
+    def __init__(self, seq_no, participant_name):
+        self.seq_no = seq_no
+        self.participant_name = participant_name
+
+
+class ApplicationRecord:
+    """Application 的纯数据副本（不含加密字段），可跨进程传递"""
+
+    def __init__(self, participants=None, **fields):
+        self.__dict__.update(fields)
+        self.participants = list(participants or [])
+
+
+def application_record(application):
+    """ORM Application -> ApplicationRecord"""
+    if isinstance(application, ApplicationRecord):
+        return application
+    fields = {}
+    for column in application.__table__.columns:
+        if column.key.endswith('_encrypted'):
+            continue
+        fields[column.key] = getattr(application, column.key, None)
+    participants = [ParticipantRecord(p.seq_no, p.participant_name) for p in application.participants]
+    return ApplicationRecord(participants=participants, **fields)
+
+
+def parse_output_options(source):
+    """从请求参数/JSON 中读取 output_mode 与 pages_per_file"""
+    source = source or {}
+    output_mode = str(source.get('output_mode', '') or '').strip().lower() or OUTPUT_MODE_ZIP
+    if output_mode not in OUTPUT_MODES:
+        raise ValueError(f"output_mode 仅支持: {', '.join(OUTPUT_MODES)}")
+    try:
+        pages_per_file = int(source.get('pages_per_file', 0) or 0)
+    except Exception:
+        raise ValueError('pages_per_file 必须为整数')
+    if pages_per_file < 0:
+        raise ValueError('pages_per_file 不能为负数')
+    return output_mode, pages_per_file
+
+
+def render_application(generator, application, plan):
+    """渲染一条记录的选手证书 + 辅导员证书，返回 (items, error)
+
+    与逐条生成时一致：选手证书成功后辅导员证书失败，选手证书仍保留。
+    """
+    items = []
+    try:
+        items.append({
+            'application_id': plan['application_id'],
+            'kind': 'player',
+            'filename': plan['player_filename'],
+            'content': generator.generate_certificate(application, plan['player_config'])
+        })
+        if plan.get('coach_error'):
+            raise ValueError(plan['coach_error'])
+        items.append({
+            'application_id': plan['application_id'],
+            'kind': 'coach',
+            'filename': plan['coach_filename'],
+            'content': generator.generate_certificate(application, plan['coach_config'])
+        })
+    except Exception as e:
+        return items, str(e)
+    return items, None
+
+
+def iter_render_applications(generator, entries):
+    """按顺序逐条产出 (items, error)，渲染完一条即可交给调用方（用于流式输出）
+
+    :param entries: [(application, plan), ...]
+    """
+    entries = list(entries)
+    pool = get_render_pool() if len(entries) > 1 else None
+    if pool is None:
+        for application, plan in entries:
+            yield render_application(generator, application, plan)
+        return
+
+    records = [(application_record(application), plan) for application, plan in entries]
+    done = 0
+    futures = _iter_bounded(pool, _render_application_task, records)
+    try:
+        for future in futures:
+            result = future.result()
+            yield result
+            done += 1
+    except Exception:
+        # 进程池异常（如子进程被杀）时丢弃进程池，剩余记录退回当前进程渲染
+        futures.close()
+        _reset_render_pool()
+        for record, plan in records[done:]:
+            yield render_application(generator, record, plan)
+    finally:
+        futures.close()
+
+
+def render_applications(generator, entries):
+    """按顺序渲染多条记录，返回 [(items, error), ...]
+
+    :param entries: [(application, plan), ...]
+    """
+    return list(iter_render_applications(generator, entries))
+
+
+def merged_page_chunks(entries, errors, pages_per_file=0):
+    """把整批证书按页排好并切分为分卷，返回 [[(application, template_config, meta), ...], ...]
+
+    :param errors: 辅导员模板缺失等无法出页的记录追加到该列表
+    """
+    pages = []
+    for application, plan in entries:
+        pages.append((application, plan['player_config'], {
+            'application_id': plan['application_id'],
+            'kind': 'player',
+            'filename': plan['player_filename']
+        }))
+        if plan.get('coach_error'):
+            errors.append({'application_id': plan['application_id'], 'error': plan['coach_error']})
+            continue
+        pages.append((application, plan['coach_config'], {
+            'application_id': plan['application_id'],
+            'kind': 'coach',
+            'filename': plan['coach_filename']
+        }))
+
+    chunk_size = pages_per_file if pages_per_file and pages_per_file > 0 else max(1, len(pages))
+    return [pages[start:start + chunk_size] for start in range(0, len(pages), chunk_size)]
+
+
+def merged_file_entry(chunk, filename, content):
+    return {
+        'filename': filename,
+        'content': content,
+        'pages': [dict(meta, page=i + 1) for i, (_, _, meta) in enumerate(chunk)]
+    }
+
+
+def merged_chunk_errors(chunk, filename, exc):
+    return [
+        {'application_id': app_id, 'error': f'{filename} 生成失败: {str(exc)}'}
+        for app_id in sorted(set(meta['application_id'] for _, _, meta in chunk))
+    ]
+
+
+def iter_render_merged(generator, entries, errors, pages_per_file=0, filename_prefix='证书合集'):
+    """逐个产出合并后的多页 PDF（每 pages_per_file 页一个文件，0 表示不拆分）
+
+    :param entries: [(application, plan), ...]
+    :param errors: 失败明细追加到该列表
+    :return: 生成器，每项含 filename/content/pages（页码 -> 记录对照）
+    """
+    chunks = merged_page_chunks(entries, errors, pages_per_file=pages_per_file)
+
+    # 多个分卷时各分卷并行渲染，按顺序取结果
+    pool = get_render_pool() if len(chunks) > 1 else None
+    if pool is not None:
+        docs = ([(application_record(a), c) for a, c, _ in chunk] for chunk in chunks)
+
+        def _results():
+            futures = _iter_bounded(pool, _render_document_task, docs)
+            try:
+                for future in futures:
+                    try:
+                        yield future.result(), None
+                    except Exception as e:
+                        yield None, e
+            finally:
+                futures.close()
+    else:
+        def _results():
+            for chunk in chunks:
+                try:
+                    yield generator.generate_certificates_document([(a, c) for a, c, _ in chunk]), None
+                except Exception as e:
+                    yield None, e
+
+    results = _results()
+    try:
+        file_no = 0
+        for chunk, (content, exc) in zip(chunks, results):
+            filename = f"{filename_prefix}_{file_no + 1:03d}.pdf"
+            if exc is not None:
+                errors.extend(merged_chunk_errors(chunk, filename, exc))
+                continue
+            file_no += 1
+            yield merged_file_entry(chunk, filename, content)
+    finally:
+        results.close()
+
+
+def render_merged(generator, entries, pages_per_file=0, filename_prefix='证书合集'):
+    """把整批证书渲染为多页 PDF，返回 (files, errors)，见 iter_render_merged"""
+    errors = []
+    files = list(iter_render_merged(generator, entries, errors, pages_per_file=pages_per_file, filename_prefix=filename_prefix))
+    return files, errors
+
+
+def iter_batch_files(generator, planned, output_mode, errors, page_index, pages_per_file=0):
+    """按输出模式逐个产出 (filename, content)，供打包 zip 时边渲染边写入
+
+    :param planned: [(application, plan, plan_error), ...]，plan 为空表示模板解析失败
+    :param errors: 失败明细追加到该列表（与记录顺序一致）
+    :param page_index: merged 模式下每个文件的页码对照追加到该列表
+    """
+    entries = [(application, plan) for application, plan, _ in planned if plan]
+    if output_mode == OUTPUT_MODE_MERGED:
+        errors.extend({'application_id': a.id, 'error': e} for a, _, e in planned if e)
+        merged = iter_render_merged(generator, entries, errors, pages_per_file=pages_per_file)
+        try:
+            for f in merged:
+                page_index.append({'filename': f['filename'], 'pages': f['pages']})
+                yield f['filename'], f['content']
+        finally:
+            merged.close()
+        return
+
+    results = iter_render_applications(generator, entries)
+    try:
+        for application, plan, plan_err in planned:
+            err = plan_err
+            if plan:
+                items, err = next(results)
+                for item in items:
+                    yield item['filename'], item['content']
+            if err:
+                errors.append({'application_id': application.id, 'error': err})
+    finally:
+        results.close()
+
+
+# ---------------------------------------------------------------------------
+# 进程池
+# ---------------------------------------------------------------------------
+
+_RENDER_POOL = None
+_RENDER_POOL_LOCK = threading.Lock()
+_WORKER_GENERATOR = None
+
+# 子进程启动时预先解码的证书背景/印章
+WARM_ASSETS = ['assets/cert/player.png', 'assets/cert/coach.png', 'assets/cert/stamp.png']
+
+
+def _pool_workers():
+    try:
+        return int(str(os.environ.get('CERT_RENDER_WORKERS', '') or '0').strip() or 0)
+    except Exception:
+        return 0
+
+
+def _init_render_worker(warm_assets):
+    global _WORKER_GENERATOR
+    from certificate_generator import CertificateGenerator
+    from certificate_assets import get_image_cache
+
+    _WORKER_GENERATOR = CertificateGenerator()
+    cache = get_image_cache()
+    for path in warm_assets or []:
+        try:
+            cache.get(path)
+        except Exception:
+            continue
+    try:
+        from certificate_layouts import get_layout_registry
+        get_layout_registry().warm()
+    except Exception:
+        pass
+
+
+def _render_window():
+    return max(1, _pool_workers()) * 2
+
+
+def _iter_bounded(pool, task, args_iter, window=None):
+    """按提交顺序逐个产出 future，在途任务不超过 window 个（默认 2×进程数）；
+    取走最早的 future 后才提交下一个任务，生成器关闭时取消尚未开始的任务"""
+    window = window or _render_window()
+    args_iter = iter(args_iter)
+    pending = deque()
+    try:
+        while True:
+            while len(pending) < window:
+                try:
+                    args = next(args_iter)
+                except StopIteration:
+                    break
+                pending.append(pool.submit(task, args))
+            if not pending:
+                return
+            yield pending.popleft()
+    finally:
+        for future in pending:
+            future.cancel()
+
+
+def _render_application_task(args):
+    record, plan = args
+    return render_application(_WORKER_GENERATOR, record, plan)
+
+
+def _render_document_task(pages):
+    return _WORKER_GENERATOR.generate_certificates_document(pages)
+
+
+def get_render_pool():
+    """返回当前 worker 的渲染进程池；未开启（CERT_RENDER_WORKERS <= 1）时返回 None"""
+    global _RENDER_POOL
+    workers = _pool_workers()
+    if workers <= 1:
+        return None
+    if _RENDER_POOL is None:
+        with _RENDER_POOL_LOCK:
+            if _RENDER_POOL is None:
+                # spawn：子进程不继承 gunicorn worker 的数据库连接与线程
+                _RENDER_POOL = ProcessPoolExecutor(
+                    max_workers=workers,
+                    mp_context=multiprocessing.get_context('spawn'),
+                    initializer=_init_render_worker,
+                    initargs=(WARM_ASSETS,)
+                )
+    return _RENDER_POOL
+
+
+def _reset_render_pool():
+    global _RENDER_POOL
+    with _RENDER_POOL_LOCK:
+        pool, _RENDER_POOL = _RENDER_POOL, None
+    if pool is not None:
+        try:
+            pool.shutdown(wait=False, cancel_futures=True)
+        except Exception:
+            pass
+
+
+atexit.register(_reset_render_pool)
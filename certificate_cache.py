@@ -0,0 +1,254 @@
+"""已生成证书 PDF 的磁盘缓存
+
+缓存键是“渲染输入”的哈希：模板中用到的字段值（与 get_field_text 读取的一致）、
+解析后的模板配置、实际渲染所用 RenderPlan 的 config_key、背景/印章等资源文件内容哈希、可用字体。
+获奖等级、选手、模板或图片任意一项变化都会得到新的键，旧文件不再命中，随 LRU 淘汰。
+RenderPlan 的 config_key 与当前配置对不上时（计划缓存里是旧配置编译的计划）只渲染、不读写缓存，
+避免旧计划渲染出的 PDF 存到新配置的键下。
+
+环境变量：
+- CERT_CACHE_DIR：缓存目录，默认 <cwd>/generated_certificates
+- CERT_CACHE_MAX_MB：缓存总大小上限（MB），默认 512；设为 0 关闭缓存
+- CERT_CACHE_SCAN_SECONDS：淘汰时全量扫描缓存目录的最短间隔（秒），默认 60
+"""
+import hashlib
+import json
+import os
+import threading
+import time
+import uuid
+
+from certificate_assets import asset_digest, get_font_registry
+
+
+# 渲染逻辑有改动、导致同样输入产出不同 PDF 时递增
+CACHE_VERSION = 1
+
+# 旧版 block 模板（title/name/school/project/award）读取的字段
+_LEGACY_BLOCK_FIELDS = {
+    'name': 'participants_names',
+    'school': 'school_name',
+    'project': 'category_task',
+    'award': 'award_level',
+}
+
+
+def _template_fields(template_config):
+    fields = []
+    for item in (template_config or {}).get('texts') or []:
+        try:
+            field = item.get('field')
+        except Exception:
+            field = None
+        if field:
+            fields.append(str(field).strip())
+    if not (template_config or {}).get('texts'):
+        for block, field in _LEGACY_BLOCK_FIELDS.items():
+            if block in (template_config or {}):
+                fields.append(field)
+    return sorted(set(fields))
+
+
+def render_inputs(generator, application, template_config, plan_key=None):
+    """收集决定证书内容的全部输入（可 JSON 序列化）；plan_key 为渲染所用 RenderPlan 的 config_key"""
+    template_config = template_config or {}
+    fields = {}
+    for field in _template_fields(template_config):
+        fields[field] = generator.get_field_text(application, field)
+
+    assets = {}
+    for key in ['background_image', 'stamp_image']:
+        path = template_config.get(key)
+        if path:
+            assets[key] = [str(path), asset_digest(path)]
+
+    return {
+        'version': CACHE_VERSION,
+        'fields': fields,
+        'template': template_config,
+        'plan': plan_key,
+        'assets': assets,
+        'fonts': sorted(get_font_registry().registered_fonts),
+    }
+
+
+def cache_key(generator, application, template_config, plan_key=None):
+    payload = json.dumps(
+        render_inputs(generator, application, template_config, plan_key),
+        ensure_ascii=False,
+        sort_keys=True,
+        default=str
+    )
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+class CertificateCache:
+    """按内容寻址的 PDF 文件缓存，超出容量时按最近访问时间（mtime）淘汰"""
+
+    def __init__(self, folder, max_bytes, scan_interval=60):
+        self.folder = folder
+        self.max_bytes = int(max_bytes or 0)
+        self.scan_interval = scan_interval
+        self._lock = threading.Lock()
+        # 本进程估算的缓存总大小；None 表示尚未扫描过
+        self._estimated_bytes = None
+        self._last_scan = 0.0
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def enabled(self):
+        return self.max_bytes > 0
+
+    def _path(self, key):
+        return os.path.join(self.folder, key[:2], f"{key}.pdf")
+
+    def get(self, key):
+        """命中时返回已打开的文件对象（调用方负责关闭），未命中返回 None。
+
+        在这里打开文件：之后即使被其他 worker 的 evict 删除，已打开的句柄仍可读完"""
+        path = self._path(key)
+        try:
+            f = open(path, 'rb')
+        except OSError:
+            with self._lock:
+                self.misses += 1
+            return None
+        try:
+            # 命中即刷新 mtime，作为 LRU 的访问时间
+            os.utime(path, None)
+        except OSError:
+            pass
+        with self._lock:
+            self.hits += 1
+        return f
+
+    def put(self, key, content):
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(content)
+        existed = os.path.exists(path)
+        os.replace(tmp_path, path)
+        with self._lock:
+            if not existed and self._estimated_bytes is not None:
+                self._estimated_bytes += len(content)
+            due = (
+                self._estimated_bytes is None
+                or self._estimated_bytes > self.max_bytes
+                or time.monotonic() - self._last_scan >= self.scan_interval
+            )
+        if due:
+            self.evict()
+        return path
+
+    def get_or_render(self, generator, application, template_config):
+        """返回 (file, content)：命中时 file 为已打开的缓存文件；否则 file 为 None，content 为渲染结果。
+
+        写入缓存后仍返回内存中的 content：刚写入的文件可能马上被淘汰"""
+        if not self.enabled:
+            return None, generator.generate_certificate(application, template_config)
+
+        from certificate_plan import config_key
+
+        key = None
+        plan = None
+        try:
+            # 先取计划再算键：键里的 plan_key 就是下面实际渲染所用计划的 config_key
+            plan = generator.compile_template(template_config)
+            if plan.config_key == config_key(template_config):
+                key = cache_key(generator, application, template_config, plan.config_key)
+                f = self.get(key)
+                if f is not None:
+                    return f, None
+        except Exception:
+            key = None
+
+        content = generator.generate_certificate(application, plan if plan is not None else template_config)
+        if key:
+            try:
+                self.put(key, content)
+            except Exception:
+                pass
+        return None, content
+
+    def evict(self):
+        """扫描缓存目录，超出容量时删除最久未访问的文件。
+
+        put 只在本进程估算的总大小超限，或距上次扫描超过 scan_interval 秒时才调用
+        （其他 worker 写入的文件只能靠定期扫描计入）"""
+        entries = []
+        total = 0
+        try:
+            for sub in os.scandir(self.folder):
+                if not sub.is_dir():
+                    continue
+                for entry in os.scandir(sub.path):
+                    if not entry.name.endswith('.pdf'):
+                        continue
+                    try:
+                        st = entry.stat()
+                    except OSError:
+                        continue
+                    entries.append((st.st_mtime, st.st_size, entry.path))
+                    total += st.st_size
+        except OSError:
+            return 0
+
+        if total <= self.max_bytes:
+            self._scanned(total)
+            return 0
+
+        removed = 0
+        entries.sort()
+        for _, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+                total -= size
+                removed += 1
+            except OSError:
+                continue
+        self._scanned(total)
+        return removed
+
+    def _scanned(self, total):
+        with self._lock:
+            self._estimated_bytes = total
+            self._last_scan = time.monotonic()
+
+    def stats(self):
+        with self._lock:
+            return {
+                'enabled': self.enabled,
+                'folder': self.folder,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses
+            }
+
+
+_CERTIFICATE_CACHE = None
+_CERTIFICATE_CACHE_LOCK = threading.Lock()
+
+
+def get_certificate_cache():
+    global _CERTIFICATE_CACHE
+    cache = _CERTIFICATE_CACHE
+    if cache is None:
+        with _CERTIFICATE_CACHE_LOCK:
+            if _CERTIFICATE_CACHE is None:
+                folder = str(os.environ.get('CERT_CACHE_DIR', '') or '').strip() or os.path.join(os.getcwd(), 'generated_certificates')
+                try:
+                    max_mb = float(str(os.environ.get('CERT_CACHE_MAX_MB', '') or '512').strip() or 512)
+                except Exception:
+                    max_mb = 512
+                try:
+                    scan_interval = float(str(os.environ.get('CERT_CACHE_SCAN_SECONDS', '') or '60').strip() or 60)
+                except Exception:
+                    scan_interval = 60
+                _CERTIFICATE_CACHE = CertificateCache(folder, int(max_mb * 1024 * 1024), scan_interval)
+            cache = _CERTIFICATE_CACHE
+    return cache
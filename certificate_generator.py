@@ -2,79 +2,52 @@ from reportlab.pdfgen import canvas
 from reportlab.lib.pagesizes import A4
 from reportlab.lib.colors import black, white
 from reportlab.lib.colors import Color
-from reportlab.pdfbase import pdfmetrics
-from reportlab.pdfbase.ttfonts import TTFont
-from reportlab.pdfbase.cidfonts import UnicodeCIDFont
-from reportlab.lib.units import mm
-from reportlab.lib.utils import ImageReader
 import io
-import json
 import math
-import os
+import sys
+import threading
+
+from certificate_assets import FONT_ALIASES, get_font_registry
+from certificate_plan import RenderPlan, get_render_plans
+from text_metrics import get_text_metrics
+
+class RenderContext:
+    """一页证书的渲染状态：canvas、编译后的计划、页面尺寸、合并模式下已定义的背景 Form"""
+
+    __slots__ = ('canvas', 'plan', 'page_width', 'page_height', 'static_forms')
+
+    def __init__(self, canvas_obj, plan, static_forms=None):
+        self.canvas = canvas_obj
+        self.plan = plan
+        self.page_width, self.page_height = plan.page_size
+        self.static_forms = static_forms
+
 
 class CertificateGenerator:
+    """证书 PDF 生成器
+
+    线程安全：实例本身不保存逐次渲染的状态（页面尺寸、canvas、已定义的 Form 都放在
+    RenderContext 里），字体注册表与 RenderPlan/图片/字宽缓存是进程级的并自带锁，
+    因此一个实例可以被多个线程同时调用（如 gunicorn gthread worker），输出与串行渲染一致，
+    见 get_certificate_generator 与 stress_certificate_generator.py。
+    page_width/page_height 只是 A4 默认值，渲染时不会修改。
+    """
+
     def __init__(self):
         self.page_width, self.page_height = A4
         self.register_fonts()
     
     def register_fonts(self):
-        """注册中文字体"""
-        self.font_aliases = {
-            '黑体': 'SimHei',
-            '宋体': 'SimSun',
-            '幼圆': 'YouYuan',
-            '华文楷体': 'STKaiti',
-            'CJK': 'STSong',
-            'SimHei': 'SimHei',
-            'SimSun': 'SimSun',
-            'YouYuan': 'YouYuan',
-            'STKaiti': 'STKaiti',
-            'STSong': 'STSong',
-            'Helvetica': 'Helvetica'
-        }
-
-        self.registered_fonts = set(['Helvetica'])
-        try:
-            pdfmetrics.registerFont(UnicodeCIDFont('STSong-Light'))
-            self.registered_fonts.add('STSong-Light')
-        except Exception:
-            pass
-
-        base_dir = os.path.dirname(os.path.abspath(__file__))
-        fonts_dir = os.path.join(base_dir, 'assets', 'fonts')
-        candidates = [
-            ('SimHei', ['simhei.ttf', 'SimHei.ttf', 'SimHei.TTF']),
-            ('SimSun', ['simsun.ttc', 'SimSun.ttc', 'simsun.ttf', 'SimSun.ttf', 'simsunb.ttf', 'SimSunB.ttf', 'SIMSUNB.TTF']),
-            ('YouYuan', ['youyuan.ttf', 'YouYuan.ttf', 'youyuan.ttc', 'YouYuan.ttc', 'SIMYOU.TTF', 'SimYou.ttf', 'simyou.ttf']),
-            ('STKaiti', ['stkaiti.ttf', 'STKaiti.ttf', 'stkaiti.ttc', 'STKaiti.ttc', 'STKAITI.TTF', 'stkaiti.ttf']),
-        ]
-
-        for font_name, filenames in candidates:
-            for fn in filenames:
-                fp = os.path.join(fonts_dir, fn)
-                if os.path.exists(fp):
-                    try:
-                        if fp.lower().endswith('.ttc'):
-                            pdfmetrics.registerFont(TTFont(font_name, fp, subfontIndex=0))
-                        else:
-                            pdfmetrics.registerFont(TTFont(font_name, fp))
-                        self.registered_fonts.add(font_name)
-                        break
-                    except Exception:
-                        continue
-
-        self.font_name = 'SimHei' if 'SimHei' in self.registered_fonts else 'Helvetica'
-        self.cjk_fallback_font = 'STSong-Light' if 'STSong-Light' in self.registered_fonts else self.font_name
+        """注册中文字体（进程内只加载一次，见 certificate_assets.get_font_registry）"""
+        registry = get_font_registry()
+        self.font_registry = registry
+        self.font_aliases = FONT_ALIASES
+        self.registered_fonts = registry.registered_fonts
+        self.font_name = registry.default_font
+        self.cjk_fallback_font = registry.cjk_fallback_font
 
     def resolve_font_name(self, font_name):
-        if not font_name:
-            return self.font_name
-        resolved = self.font_aliases.get(font_name, font_name)
-        if resolved in self.registered_fonts:
-            return resolved
-        if self.cjk_fallback_font in self.registered_fonts:
-            return self.cjk_fallback_font
-        return self.font_name
+        return self.font_registry.resolve(font_name)
 
     def px_to_pt(self, px):
         try:
@@ -85,10 +58,12 @@ class CertificateGenerator:
     def _px_top_to_pt_bottom(self, y_from_top_px: float, page_height_pt: float) -> float:
         return float(page_height_pt) - self.px_to_pt(y_from_top_px)
 
-    def draw_debug_grid(self, canvas_obj, step_px=100, color=None, line_width=0.5, label=True, label_font_size=7):
+    def draw_debug_grid(self, canvas_obj, step_px=100, color=None, line_width=0.5, label=True, label_font_size=7,
+                        page_size=None):
         step_pt = self.px_to_pt(step_px)
         if not step_pt or step_pt <= 0:
             return
+        page_width, page_height = page_size or (self.page_width, self.page_height)
 
         if color is None:
             color = Color(1, 0, 0, alpha=0.25)
@@ -101,18 +76,18 @@ class CertificateGenerator:
 
             # vertical lines
             x = 0.0
-            while x <= self.page_width + 0.01:
-                canvas_obj.line(x, 0, x, self.page_height)
+            while x <= page_width + 0.01:
+                canvas_obj.line(x, 0, x, page_height)
                 if label:
                     canvas_obj.setFont('Helvetica', label_font_size)
                     px_val = int(round(x / 0.75))
-                    canvas_obj.drawString(x + 2, self.page_height - 10, f"x={px_val}px")
+                    canvas_obj.drawString(x + 2, page_height - 10, f"x={px_val}px")
                 x += step_pt
 
             # horizontal lines
             y = 0.0
-            while y <= self.page_height + 0.01:
-                canvas_obj.line(0, y, self.page_width, y)
+            while y <= page_height + 0.01:
+                canvas_obj.line(0, y, page_width, y)
                 if label:
                     canvas_obj.setFont('Helvetica', label_font_size)
                     px_val = int(round(y / 0.75))
@@ -165,9 +140,10 @@ class CertificateGenerator:
                     return ""
             except Exception:
                 pass
+            # 只有数据来自 DataFrame 时才可能是 pandas 的缺失值；未加载 pandas 时不为此导入它
+            pd = sys.modules.get('pandas')
             try:
-                import pandas as pd
-                if pd.isna(v):
+                if pd is not None and pd.isna(v):
                     return ""
             except Exception:
                 pass
@@ -227,11 +203,11 @@ class CertificateGenerator:
             canvas_obj.drawString(x, y, text)
             return
         if align == 'right':
-            text_width = canvas_obj.stringWidth(text, font_name, font_size)
+            text_width = get_text_metrics().string_width(text, font_name, font_size)
             canvas_obj.drawString(x + width - text_width, y, text)
             return
 
-        text_width = canvas_obj.stringWidth(text, font_name, font_size)
+        text_width = get_text_metrics().string_width(text, font_name, font_size)
         centered_x = x + (width - text_width) / 2
         canvas_obj.drawString(centered_x, y, text)
 
@@ -250,11 +226,12 @@ class CertificateGenerator:
         if not tokens:
             return
 
+        metrics = get_text_metrics()
         lines = []
         current = ''
         for token in tokens:
             candidate = token if not current else f"{current}{joiner}{token}"
-            if canvas_obj.stringWidth(candidate, font_name, font_size) <= width:
+            if metrics.string_width(candidate, font_name, font_size) <= width:
                 current = candidate
             else:
                 if current:
@@ -295,24 +272,9 @@ class CertificateGenerator:
         """
         if not text:
             return max_font_size
-        
-        # 从最大字号开始测试
+
         font_name = self.resolve_font_name(font_name)
-        max_font_size = int(max_font_size)
-        min_font_size = int(min_font_size)
-        for font_size in range(max_font_size, min_font_size - 1, -1):
-            # 设置字体并计算文字宽度
-            canvas_obj = canvas.Canvas(io.BytesIO(), pagesize=A4)
-            canvas_obj.setFont(font_name, font_size)
-            text_width = canvas_obj.stringWidth(text, font_name, font_size)
-            canvas_obj.save()
-            
-            # 如果文字宽度不超过最大宽度，返回当前字号
-            if text_width <= max_width:
-                return font_size
-        
-        # 如果最小字号仍然放不下，返回最小字号
-        return min_font_size
+        return get_text_metrics().fit_font_size(text, max_width, max_font_size, min_font_size, font_name=font_name)
 
     def draw_centered_text(self, canvas_obj, text, x, y, width, max_font_size=24, min_font_size=8, font_name=None):
         """
@@ -330,7 +292,7 @@ class CertificateGenerator:
         canvas_obj.setFont(font_name, font_size)
         
         # 计算文字宽度
-        text_width = canvas_obj.stringWidth(text, font_name, font_size)
+        text_width = get_text_metrics().string_width(text, font_name, font_size)
         
         # 计算居中位置
         centered_x = x + (width - text_width) / 2
@@ -338,309 +300,156 @@ class CertificateGenerator:
         # 绘制文字
         canvas_obj.drawString(centered_x, y, text)
 
+    def compile_template(self, template_config):
+        """模板配置 -> RenderPlan（按模板ID+updated_at 或配置内容缓存，见 certificate_plan）"""
+        return get_render_plans().get(template_config)
+
     def generate_certificate(self, application, template_config):
         """
         生成证书PDF
         :param application: Application对象
-        :param template_config: 证书模板配置（字典格式）
+        :param template_config: 证书模板配置（字典格式）或已编译的 RenderPlan
         """
         # 创建PDF文件
         buffer = io.BytesIO()
 
-        # Optional: use background PNG native size as PDF pagesize to avoid distortion.
-        page_size = A4
-        background_image = template_config.get('background_image')
-        use_background_size = bool(template_config.get('use_background_size'))
-        bg_path = None
-        if background_image:
-            base_dir = os.path.dirname(os.path.abspath(__file__))
-            bg_path = os.path.join(base_dir, background_image) if not os.path.isabs(background_image) else background_image
-            if use_background_size and bg_path and os.path.exists(bg_path):
-                try:
-                    img_probe = ImageReader(bg_path)
-                    iw_px, ih_px = img_probe.getSize()
-                    page_size = (self.px_to_pt(iw_px), self.px_to_pt(ih_px))
-                except Exception:
-                    page_size = A4
-
-        canvas_obj = canvas.Canvas(buffer, pagesize=page_size)
-        old_page_w, old_page_h = self.page_width, self.page_height
-        try:
-            self.page_width, self.page_height = page_size
+        plan = template_config if isinstance(template_config, RenderPlan) else self.compile_template(template_config)
+        canvas_obj = canvas.Canvas(buffer, pagesize=plan.page_size)
+        self._draw_certificate_page(canvas_obj, application, plan)
 
-            # 绘制背景图（可选）
-            if bg_path and os.path.exists(bg_path):
-                try:
-                    img = ImageReader(bg_path)
-                    canvas_obj.drawImage(img, 0, 0, width=self.page_width, height=self.page_height, mask='auto')
-                except Exception:
-                    pass
+        # 完成PDF绘制
+        canvas_obj.save()
+        buffer.seek(0)
+        return buffer.getvalue()
 
-            # Optional stamp overlay
+    def generate_certificates_document(self, pages):
+        """
+        将多张证书合并为一个多页PDF
+        :param pages: [(application, template_config), ...]，每项一页
+        背景图/印章只作为 Form XObject 写入一次、逐页引用；字体子集也只嵌入一次。
+        """
+        buffer = io.BytesIO()
+        canvas_obj = canvas.Canvas(buffer, pagesize=A4)
+        static_forms = set()
+        for application, template_config in pages:
+            plan = template_config if isinstance(template_config, RenderPlan) else self.compile_template(template_config)
+            canvas_obj.setPageSize(plan.page_size)
+            self._draw_certificate_page(canvas_obj, application, plan, static_forms=static_forms)
+            canvas_obj.showPage()
+        canvas_obj.save()
+        buffer.seek(0)
+        return buffer.getvalue()
+
+    def _draw_static_layer(self, canvas_obj, plan):
+        """绘制与选手无关的部分：背景图 + 印章"""
+        # 绘制背景图（可选）
+        if plan.background:
             try:
-                stamp_image = template_config.get('stamp_image')
-                if stamp_image:
-                    base_dir = os.path.dirname(os.path.abspath(__file__))
-                    stamp_path = os.path.join(base_dir, stamp_image) if not os.path.isabs(str(stamp_image)) else str(stamp_image)
-                    if os.path.exists(stamp_path):
-                        coord_unit = str(template_config.get('coord_unit', 'mm') or 'mm').lower()
-                        y_origin = str(template_config.get('y_origin', 'bottom') or 'bottom').lower()
-
-                        def _to_pt(v):
-                            if v is None:
-                                return 0.0
-                            if coord_unit == 'px':
-                                return float(self.px_to_pt(v))
-                            return float(v) * mm
-
-                        sw = template_config.get('stamp_width')
-                        sh = template_config.get('stamp_height')
-                        stamp_img = ImageReader(stamp_path)
-                        sw_pt = _to_pt(sw) if sw is not None else None
-                        sh_pt = _to_pt(sh) if sh is not None else None
-                        if sw_pt is None or sh_pt is None:
-                            iw_px, ih_px = stamp_img.getSize()
-                            sw_pt = sw_pt if sw_pt is not None else self.px_to_pt(iw_px)
-                            sh_pt = sh_pt if sh_pt is not None else self.px_to_pt(ih_px)
-
-                        # X position
-                        stamp_center_x = bool(template_config.get('stamp_center_x'))
-                        if stamp_center_x:
-                            sx = (float(self.page_width) - float(sw_pt)) / 2.0
-                        else:
-                            sx = _to_pt(template_config.get('stamp_x', 0))
-
-                        # Y position
-                        sy_raw = float(template_config.get('stamp_y', 0) or 0)
-                        sy_anchor = str(template_config.get('stamp_y_anchor', 'bottom') or 'bottom').lower()
-                        if coord_unit == 'px' and y_origin == 'top':
-                            sy = self._px_top_to_pt_bottom(sy_raw, self.page_height)
-                        else:
-                            sy = _to_pt(sy_raw)
-
-                        # If stamp_y is a centerline, shift down by half height
-                        if sy_anchor == 'center':
-                            sy = float(sy) - float(sh_pt) / 2.0
-
-                        canvas_obj.drawImage(stamp_img, sx, sy, width=sw_pt, height=sh_pt, mask='auto')
+                canvas_obj.drawImage(plan.background.reader, 0, 0, width=plan.page_width, height=plan.page_height, mask='auto')
             except Exception:
                 pass
 
-            debug_grid = template_config.get('debug_grid')
-            if debug_grid:
-                try:
-                    step_px = float(debug_grid.get('step_px', 100))
-                    alpha = float(debug_grid.get('alpha', 0.25))
-                    lw = float(debug_grid.get('line_width', 0.5))
-                    label = bool(debug_grid.get('label', True))
-                    label_font_size = float(debug_grid.get('label_font_size', 7))
-                    self.draw_debug_grid(
-                        canvas_obj,
-                        step_px=step_px,
-                        color=Color(1, 0, 0, alpha=alpha),
-                        line_width=lw,
-                        label=label,
-                        label_font_size=label_font_size,
-                    )
-                except Exception:
-                    pass
-
-            debug_canvas_grid = template_config.get('debug_canvas_grid')
-            if debug_canvas_grid:
-                try:
-                    step = float(debug_canvas_grid.get('step', 50)) * mm
-                    xs = [i for i in self._frange(0, self.page_width, step)]
-                    ys = [i for i in self._frange(0, self.page_height, step)]
-                    canvas_obj.saveState()
-                    canvas_obj.setStrokeColor(Color(1, 0, 0, alpha=float(debug_canvas_grid.get('alpha', 0.15))))
-                    canvas_obj.setLineWidth(float(debug_canvas_grid.get('line_width', 0.3)))
-                    canvas_obj.grid(xs, ys)
-                    canvas_obj.restoreState()
-                except Exception:
-                    pass
-
-            # 设置背景色（可选）
-            if template_config.get('background_color'):
-                canvas_obj.setFillColor(template_config['background_color'])
-                canvas_obj.rect(0, 0, self.page_width, self.page_height, fill=1)
-
-            # 设置文字颜色
-            text_color = template_config.get('text_color', black)
-            canvas_obj.setFillColor(text_color)
-
-            # 新版：按texts渲染（支持固定文本/动态字段/对齐/字号）
-            if template_config.get('texts'):
-                coord_unit = str(template_config.get('coord_unit', 'mm') or 'mm').lower()
-                y_origin = str(template_config.get('y_origin', 'bottom') or 'bottom').lower()
-                global_y_offset = float(template_config.get('global_y_offset', 0)) * mm if coord_unit == 'mm' else self.px_to_pt(float(template_config.get('global_y_offset', 0) or 0))
-
-                def _to_pt(v):
-                    if v is None:
-                        return 0.0
-                    if coord_unit == 'px':
-                        return float(self.px_to_pt(v))
-                    return float(v) * mm
-
-                debug_points = template_config.get('debug_points')
-                for item in template_config.get('texts', []):
-                    try:
-                        width = _to_pt(item.get('width', 0))
-                        x = _to_pt(item.get('x', 0))
-
-                        raw_y = float(item.get('y', 0) or 0)
-                        if coord_unit == 'px' and y_origin == 'top':
-                            y = self._px_top_to_pt_bottom(raw_y, self.page_height)
-                        else:
-                            y = _to_pt(raw_y)
-
-                        x_anchor = (item.get('x_anchor') or item.get('anchor') or 'left').lower()
-                        if x_anchor == 'center':
-                            x = x - (width / 2.0)
-                        elif x_anchor == 'right':
-                            x = x - width
-
-                        y_offset_raw = float(item.get('y_offset', 0) or 0)
-                        if coord_unit == 'px' and y_origin == 'top':
-                            y = y + float(self.px_to_pt(y_offset_raw)) + global_y_offset
-                        else:
-                            y = y + _to_pt(y_offset_raw) + global_y_offset
-
-                        align = item.get('align', 'center')
-                        font = item.get('font')
-
-                        if debug_points or item.get('debug_point'):
-                            box_h = float(item.get('debug_box_height', 10))
-                            box_shift = float(item.get('debug_box_y_shift', 0)) * mm
-                            self.draw_debug_box(canvas_obj, x, y, width, height=box_h, y_shift=box_shift)
-
-                        if item.get('field'):
-                            txt = self.get_field_text(application, item.get('field'))
-                        else:
-                            txt = item.get('text', '')
-
-                        if item.get('auto_size'):
-                            max_size = self.px_to_pt(item.get('max_font_size', 16))
-                            min_size = self.px_to_pt(item.get('min_font_size', 12))
-                            self.draw_centered_text(canvas_obj, txt, x, y, width, max_size, min_size, font_name=font)
-                        else:
-                            size = self.px_to_pt(item.get('font_size', item.get('max_font_size', 16)))
-                            if item.get('wrap'):
-                                line_height = self.px_to_pt(item.get('line_height', None))
-                                self.draw_wrapped_text(
-                                    canvas_obj,
-                                    txt,
-                                    x,
-                                    y,
-                                    width,
-                                    font_name=font,
-                                    font_size=size,
-                                    align=align,
-                                    line_height=line_height,
-                                    max_lines=item.get('max_lines', None),
-                                    direction=item.get('direction', 'up')
-                                )
-                            else:
-                                self.draw_text(canvas_obj, txt, x, y, width, font_name=font, font_size=size, align=align)
-                    except Exception:
-                        continue
-
-                canvas_obj.save()
-                buffer.seek(0)
-                return buffer.getvalue()
-
-            # Legacy blocks (mm-based). Used only when template_config does not use 'texts'.
-            # 绘制证书标题
-            if 'title' in template_config:
-                title_config = template_config['title']
-                title_font = title_config.get('font')
-                self.draw_centered_text(
-                    canvas_obj,
-                    title_config['text'],
-                    title_config['x'] * mm,
-                    title_config['y'] * mm,
-                    title_config['width'] * mm,
-                    self.px_to_pt(title_config.get('max_font_size', 32)),
-                    self.px_to_pt(title_config.get('min_font_size', 16)),
-                    font_name=title_font
-                )
-
-            # 绘制获奖者姓名
-            if 'name' in template_config:
-                name_config = template_config['name']
-                name_font = name_config.get('font')
-
-                # 处理多人项目的姓名显示
-                if application.participant_count > 1:
-                    participants = sorted(application.participants, key=lambda p: p.seq_no)
-                    names = [p.participant_name for p in participants]
-                    name_text = "、".join(names)
-                else:
-                    name_text = application.participants[0].participant_name if application.participants else ""
+        # Optional stamp overlay
+        stamp = plan.stamp
+        if stamp:
+            try:
+                canvas_obj.drawImage(stamp.image.reader, stamp.x, stamp.y, width=stamp.width, height=stamp.height, mask='auto')
+            except Exception:
+                pass
 
-                self.draw_centered_text(
+    def _draw_certificate_page(self, canvas_obj, application, plan, static_forms=None):
+        """
+        在 canvas_obj 的当前页上绘制一张证书（不调用 save/showPage）
+        :param plan: compile_template 得到的 RenderPlan
+        :param static_forms: 合并模式下已定义的背景 Form 名称集合；None 表示直接绘制背景
+        """
+        self._render_page(RenderContext(canvas_obj, plan, static_forms), application)
+
+    def _render_page(self, ctx, application):
+        """按 RenderContext 绘制；只读 ctx 与共享的只读资源，不修改 self"""
+        canvas_obj = ctx.canvas
+        plan = ctx.plan
+        static_forms = ctx.static_forms
+
+        if static_forms is None:
+            self._draw_static_layer(canvas_obj, plan)
+        else:
+            form_name = plan.static_form_name
+            if form_name not in static_forms:
+                canvas_obj.beginForm(form_name)
+                self._draw_static_layer(canvas_obj, plan)
+                canvas_obj.endForm()
+                static_forms.add(form_name)
+            canvas_obj.doForm(form_name)
+
+        debug_grid = plan.debug_grid
+        if debug_grid:
+            try:
+                self.draw_debug_grid(
                     canvas_obj,
-                    name_text,
-                    name_config['x'] * mm,
-                    name_config['y'] * mm,
-                    name_config['width'] * mm,
-                    self.px_to_pt(name_config.get('max_font_size', 24)),
-                    self.px_to_pt(name_config.get('min_font_size', 12)),
-                    font_name=name_font
+                    step_px=debug_grid['step_px'],
+                    color=Color(1, 0, 0, alpha=debug_grid['alpha']),
+                    line_width=debug_grid['line_width'],
+                    label=debug_grid['label'],
+                    label_font_size=debug_grid['label_font_size'],
+                    page_size=(ctx.page_width, ctx.page_height),
                 )
+            except Exception:
+                pass
 
-            # 绘制学校名称
-            if 'school' in template_config:
-                school_config = template_config['school']
-                school_font = school_config.get('font')
-                self.draw_centered_text(
-                    canvas_obj,
-                    application.school_name,
-                    school_config['x'] * mm,
-                    school_config['y'] * mm,
-                    school_config['width'] * mm,
-                    self.px_to_pt(school_config.get('max_font_size', 20)),
-                    self.px_to_pt(school_config.get('min_font_size', 10)),
-                    font_name=school_font
-                )
+        debug_canvas_grid = plan.debug_canvas_grid
+        if debug_canvas_grid:
+            try:
+                xs = [i for i in self._frange(0, ctx.page_width, debug_canvas_grid['step'])]
+                ys = [i for i in self._frange(0, ctx.page_height, debug_canvas_grid['step'])]
+                canvas_obj.saveState()
+                canvas_obj.setStrokeColor(Color(1, 0, 0, alpha=debug_canvas_grid['alpha']))
+                canvas_obj.setLineWidth(debug_canvas_grid['line_width'])
+                canvas_obj.grid(xs, ys)
+                canvas_obj.restoreState()
+            except Exception:
+                pass
 
-            # 绘制项目名称
-            if 'project' in template_config:
-                project_config = template_config['project']
-                project_font = project_config.get('font')
-                project_text = f"{application.category} - {application.task}"
-                self.draw_centered_text(
-                    canvas_obj,
-                    project_text,
-                    project_config['x'] * mm,
-                    project_config['y'] * mm,
-                    project_config['width'] * mm,
-                    self.px_to_pt(project_config.get('max_font_size', 18)),
-                    self.px_to_pt(project_config.get('min_font_size', 10)),
-                    font_name=project_font
-                )
+        # 设置背景色（可选）
+        if plan.background_color:
+            canvas_obj.setFillColor(plan.background_color)
+            canvas_obj.rect(0, 0, ctx.page_width, ctx.page_height, fill=1)
 
-            # 绘制获奖等级
-            if 'award' in template_config:
-                award_config = template_config['award']
-                award_font = award_config.get('font')
-                self.draw_centered_text(
-                    canvas_obj,
-                    application.award_level or "",
-                    award_config['x'] * mm,
-                    award_config['y'] * mm,
-                    award_config['width'] * mm,
-                    self.px_to_pt(award_config.get('max_font_size', 22)),
-                    self.px_to_pt(award_config.get('min_font_size', 12)),
-                    font_name=award_font
-                )
+        # 设置文字颜色
+        canvas_obj.setFillColor(plan.text_color)
+
+        # 坐标/字体/字号已在编译时确定，这里只取字段值并绘制
+        for op in plan.texts:
+            try:
+                if op.debug_box:
+                    box_h, box_shift = op.debug_box
+                    self.draw_debug_box(canvas_obj, op.x, op.y, op.width, height=box_h, y_shift=box_shift)
+                if op.kind == 'invalid':
+                    continue
+
+                txt = self.get_field_text(application, op.field) if op.field else op.text
+
+                if op.kind == 'auto':
+                    self.draw_centered_text(canvas_obj, txt, op.x, op.y, op.width, op.max_font_size, op.min_font_size, font_name=op.font)
+                elif op.kind == 'wrap':
+                    self.draw_wrapped_text(
+                        canvas_obj,
+                        txt,
+                        op.x,
+                        op.y,
+                        op.width,
+                        font_name=op.font,
+                        font_size=op.font_size,
+                        align=op.align,
+                        line_height=op.line_height,
+                        max_lines=op.max_lines,
+                        direction=op.direction
+                    )
+                else:
+                    self.draw_text(canvas_obj, txt, op.x, op.y, op.width, font_name=op.font, font_size=op.font_size, align=op.align)
+            except Exception:
+                continue
 
-            # 完成PDF绘制
-            canvas_obj.save()
-            buffer.seek(0)
-            return buffer.getvalue()
-        finally:
-            self.page_width, self.page_height = old_page_w, old_page_h
-    
     def create_default_template(self, category, award_level):
         """
         创建默认的证书模板配置
@@ -701,3 +510,19 @@ class CertificateGenerator:
         while x <= stop + 1e-9:
             yield x
             x += step
+
+
+_GENERATOR = None
+_GENERATOR_LOCK = threading.Lock()
+
+
+def get_certificate_generator():
+    """进程内共享的 CertificateGenerator（无逐次渲染状态，可跨线程使用）"""
+    global _GENERATOR
+    generator = _GENERATOR
+    if generator is None:
+        with _GENERATOR_LOCK:
+            if _GENERATOR is None:
+                _GENERATOR = CertificateGenerator()
+            generator = _GENERATOR
+    return generator
@@ -0,0 +1,162 @@
+"""命名证书版式
+
+选手证书（横版 player.png）与优秀辅导员证书的坐标、印章、文字项是固定的，
+原来每个请求都重新构造一遍大 dict 再合并进数据库模板配置。这里在导入时定义一次，
+请求里按名字引用：
+
+    template_config = apply_layout('player-landscape', template_config)
+
+合并结果按 (模板身份 template_key, 版式名) 缓存并带上 template_key，
+编译后的 RenderPlan 因而与数据库模板一样走 certificate_plan 的进程内缓存。
+返回的配置是共享对象，调用方不要原地修改。
+"""
+import copy
+import threading
+from collections import OrderedDict
+
+from certificate_plan import TemplateConfig
+
+
+PLAYER_BACKGROUND = 'assets/cert/player.png'
+STAMP_IMAGE = 'assets/cert/stamp.png'
+
+# 横版 player.png 的像素坐标（左上角为原点），与背景图原始尺寸一致，避免拉伸到 A4
+_LANDSCAPE_BASE = {
+    'use_background_size': True,
+    'coord_unit': 'px',
+    'y_origin': 'top',
+    'global_y_offset': 0,
+    'stamp_image': STAMP_IMAGE,
+    'stamp_center_x': True,
+    'stamp_y': 750,
+    'stamp_y_anchor': 'center',
+}
+
+
+def _text(font, font_size, width, x, y, *, field=None, text=None):
+    item = {'field': field} if field else {'text': text}
+    item.update({
+        'font': font,
+        'font_size': font_size,
+        'align': 'center',
+        'width': width,
+        'x': x,
+        'x_anchor': 'left',
+        'y': y,
+    })
+    return item
+
+
+def _landscape_texts(name_field, award_field=None, award_text=None):
+    return [
+        _text('宋体', 24, 1262, 0, 400, field=name_field),
+        _text('宋体', 24, 180, 680, 470, field='category'),
+        _text('宋体', 24, 140, 920, 470, field='education_level'),
+        _text('华文楷体', 84, 1262, 0, 590, field=award_field, text=award_text),
+    ]
+
+
+LAYOUTS = {
+    # 选手证书：仅在模板背景为 player.png 时套用
+    'player-landscape': dict(
+        _LANDSCAPE_BASE,
+        texts=_landscape_texts('participants_names', award_field='award_level'),
+    ),
+    # 优秀辅导员证书：与选手证书同一张背景，奖项固定为“优秀辅导员”；
+    # 姓名取获奖记录的 teacher_name（查找记录时已按辅导员姓名精确匹配）
+    'excellent-coach': dict(
+        _LANDSCAPE_BASE,
+        background_image=PLAYER_BACKGROUND,
+        texts=_landscape_texts('teacher_name', award_text='优秀辅导员'),
+    ),
+}
+
+
+class LayoutRegistry:
+    """版式名 -> 覆盖项；按 (模板身份, 版式名) 缓存合并后的配置"""
+
+    def __init__(self, layouts, max_entries=256):
+        self._layouts = copy.deepcopy(dict(layouts))
+        self.max_entries = max(1, int(max_entries))
+        self._merged = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def names(self):
+        return sorted(self._layouts)
+
+    def _layout(self, name):
+        layout = self._layouts.get(name)
+        if layout is None:
+            raise ValueError(f"未知证书版式: {name}")
+        return layout
+
+    def apply(self, name, template_config):
+        """返回 template_config 叠加版式 name 后的配置（TemplateConfig）"""
+        layout = self._layout(name)
+        base_key = getattr(template_config, 'template_key', None)
+        if base_key is None:
+            # 非数据库模板（或已被原地修改）：不缓存，计划缓存按内容哈希
+            merged = TemplateConfig(template_config)
+            dict.update(merged, layout)
+            return merged
+
+        key = tuple(base_key) + ('layout', name)
+        with self._lock:
+            merged = self._merged.get(key)
+            if merged is not None:
+                self._merged.move_to_end(key)
+                self.hits += 1
+                return merged
+            self.misses += 1
+
+        merged = TemplateConfig(template_config, template_key=key)
+        dict.update(merged, layout)
+        with self._lock:
+            self._merged[key] = merged
+            self._merged.move_to_end(key)
+            while len(self._merged) > self.max_entries:
+                self._merged.popitem(last=False)
+        return merged
+
+    def warm(self):
+        """编译每个版式一次：尽早发现坐标/字号写错，并预热背景图、印章与字体"""
+        from certificate_plan import get_render_plans
+
+        plans = get_render_plans()
+        for name in self.names():
+            plans.get(TemplateConfig(self._layouts[name], template_key=('layout', name)))
+
+    def clear(self):
+        with self._lock:
+            self._merged.clear()
+
+    def stats(self):
+        with self._lock:
+            return {
+                'layouts': self.names(),
+                'entries': len(self._merged),
+                'max_entries': self.max_entries,
+                'hits': self.hits,
+                'misses': self.misses
+            }
+
+
+_LAYOUT_REGISTRY = None
+_LAYOUT_REGISTRY_LOCK = threading.Lock()
+
+
+def get_layout_registry():
+    global _LAYOUT_REGISTRY
+    registry = _LAYOUT_REGISTRY
+    if registry is None:
+        with _LAYOUT_REGISTRY_LOCK:
+            if _LAYOUT_REGISTRY is None:
+                _LAYOUT_REGISTRY = LayoutRegistry(LAYOUTS)
+            registry = _LAYOUT_REGISTRY
+    return registry
+
+
+def apply_layout(name, template_config):
+    return get_layout_registry().apply(name, template_config)
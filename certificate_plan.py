@@ -0,0 +1,446 @@
+"""证书模板编译
+
+模板配置（coord_unit / y_origin / anchor / y_offset / 字体别名 ...）与具体选手无关，
+编译一次得到不可变的 RenderPlan：坐标已换算为绝对 pt、字体已解析为注册名、
+折行/自适应字号参数已就绪。渲染每张证书时只剩字段取值与绘制调用。
+
+缓存键：
+- 从数据库选出的模板（TemplateConfig）使用 (模板ID, updated_at, 配置 JSON 原文哈希)：
+  MySQL 的 DATETIME 只精确到秒，同一秒内两次修改 updated_at 相同，只靠原文哈希区分；
+- 其它配置（路由中复制后叠加了坐标的 dict 等）使用配置内容的哈希；
+另外加上背景/印章图片的文件标识，图片被替换后自动重新编译。
+"""
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+
+from reportlab.lib.colors import black
+from reportlab.lib.pagesizes import A4
+from reportlab.lib.units import mm
+
+from certificate_assets import get_font_registry, get_image_cache
+
+
+def config_digest(raw_config):
+    """模板配置 JSON 原文的哈希"""
+    return hashlib.sha256((raw_config or '').encode('utf-8')).hexdigest()
+
+
+def px_to_pt(px):
+    try:
+        return float(px) * 0.75
+    except Exception:
+        return px
+
+
+class TemplateConfig(dict):
+    """带模板身份 (id, updated_at, 配置原文哈希) 的配置 dict；原地修改后身份失效，退回按内容缓存"""
+
+    def __init__(self, config=None, template_key=None):
+        super().__init__(config or {})
+        self.template_key = template_key
+
+    @classmethod
+    def from_template(cls, template):
+        """template: CertificateTemplate 或模板索引中的 TemplateEntry（已算好 config_digest）"""
+        updated_at = template.updated_at.isoformat() if template.updated_at else None
+        digest = getattr(template, 'config_digest', None) or config_digest(template.template_config)
+        return cls(template.get_config(), template_key=(template.id, updated_at, digest))
+
+    def _modified(self):
+        self.template_key = None
+
+    def __setitem__(self, key, value):
+        self._modified()
+        super().__setitem__(key, value)
+
+    def __delitem__(self, key):
+        self._modified()
+        super().__delitem__(key)
+
+    def update(self, *args, **kwargs):
+        self._modified()
+        super().update(*args, **kwargs)
+
+    def pop(self, *args):
+        self._modified()
+        return super().pop(*args)
+
+    def setdefault(self, key, default=None):
+        if key not in self:
+            self._modified()
+        return super().setdefault(key, default)
+
+
+class TextOp:
+    """一个文字项：field 非空时渲染时取字段值，否则绘制固定文本 text"""
+
+    __slots__ = (
+        'kind', 'x', 'y', 'width', 'font', 'field', 'text', 'align',
+        'font_size', 'max_font_size', 'min_font_size',
+        'line_height', 'max_lines', 'direction', 'debug_box'
+    )
+
+    def __init__(self, kind, x, y, width, font, field=None, text='', align='center',
+                 font_size=None, max_font_size=None, min_font_size=None,
+                 line_height=None, max_lines=None, direction='up', debug_box=None):
+        self.kind = kind  # auto / wrap / text / invalid（只画调试框）
+        self.x = x
+        self.y = y
+        self.width = width
+        self.font = font
+        self.field = field
+        self.text = text
+        self.align = align
+        self.font_size = font_size
+        self.max_font_size = max_font_size
+        self.min_font_size = min_font_size
+        self.line_height = line_height
+        self.max_lines = max_lines
+        self.direction = direction
+        self.debug_box = debug_box  # (height, y_shift) 或 None
+
+
+class StampOp:
+    __slots__ = ('image', 'x', 'y', 'width', 'height')
+
+    def __init__(self, image, x, y, width, height):
+        self.image = image
+        self.x = x
+        self.y = y
+        self.width = width
+        self.height = height
+
+
+class RenderPlan:
+    """编译后的模板；只读，可在线程/请求间共享"""
+
+    __slots__ = (
+        'page_size', 'background', 'stamp', 'static_form_name',
+        'debug_grid', 'debug_canvas_grid', 'background_color', 'text_color', 'texts', 'config_key'
+    )
+
+    def __init__(self, page_size, background, stamp, static_form_name,
+                 debug_grid, debug_canvas_grid, background_color, text_color, texts, config_key=None):
+        self.page_size = page_size
+        self.background = background
+        self.stamp = stamp
+        self.static_form_name = static_form_name
+        self.debug_grid = debug_grid
+        self.debug_canvas_grid = debug_canvas_grid
+        self.background_color = background_color
+        self.text_color = text_color
+        self.texts = tuple(texts)
+        # 编译所用配置的 config_key；证书磁盘缓存把它计入缓存键，保证键与实际渲染所用的计划一致
+        self.config_key = config_key
+
+    @property
+    def page_width(self):
+        return self.page_size[0]
+
+    @property
+    def page_height(self):
+        return self.page_size[1]
+
+
+# 旧版 block 模板（mm 坐标，居中自适应字号）：block -> (字段, 默认最大字号, 默认最小字号)
+_LEGACY_BLOCKS = [
+    ('title', None, 32, 16),
+    ('name', 'participants_names', 24, 12),
+    ('school', 'school_name', 20, 10),
+    ('project', 'category_task', 18, 10),
+    ('award', 'award_level', 22, 12),
+]
+
+_STAMP_KEYS = ['stamp_image', 'stamp_width', 'stamp_height', 'stamp_center_x', 'stamp_x', 'stamp_y', 'stamp_y_anchor', 'coord_unit', 'y_origin']
+
+
+def _load_image(path):
+    if not path:
+        return None
+    try:
+        return get_image_cache().get(path)
+    except Exception:
+        return None
+
+
+def _coord_converter(template_config):
+    coord_unit = str(template_config.get('coord_unit', 'mm') or 'mm').lower()
+    y_origin = str(template_config.get('y_origin', 'bottom') or 'bottom').lower()
+
+    def _to_pt(v):
+        if v is None:
+            return 0.0
+        if coord_unit == 'px':
+            return float(px_to_pt(v))
+        return float(v) * mm
+
+    return coord_unit, y_origin, _to_pt
+
+
+def _compile_stamp(template_config, stamp, page_size):
+    if stamp is None:
+        return None
+    try:
+        page_width, page_height = page_size
+        coord_unit, y_origin, _to_pt = _coord_converter(template_config)
+
+        sw = template_config.get('stamp_width')
+        sh = template_config.get('stamp_height')
+        sw_pt = _to_pt(sw) if sw is not None else None
+        sh_pt = _to_pt(sh) if sh is not None else None
+        if sw_pt is None or sh_pt is None:
+            iw_px, ih_px = stamp.size
+            sw_pt = sw_pt if sw_pt is not None else px_to_pt(iw_px)
+            sh_pt = sh_pt if sh_pt is not None else px_to_pt(ih_px)
+
+        if bool(template_config.get('stamp_center_x')):
+            sx = (float(page_width) - float(sw_pt)) / 2.0
+        else:
+            sx = _to_pt(template_config.get('stamp_x', 0))
+
+        sy_raw = float(template_config.get('stamp_y', 0) or 0)
+        sy_anchor = str(template_config.get('stamp_y_anchor', 'bottom') or 'bottom').lower()
+        if coord_unit == 'px' and y_origin == 'top':
+            sy = float(page_height) - px_to_pt(sy_raw)
+        else:
+            sy = _to_pt(sy_raw)
+
+        # stamp_y 为中线时下移半个高度
+        if sy_anchor == 'center':
+            sy = float(sy) - float(sh_pt) / 2.0
+        return StampOp(stamp, sx, sy, sw_pt, sh_pt)
+    except Exception:
+        return None
+
+
+def _compile_debug_grid(template_config):
+    debug_grid = template_config.get('debug_grid')
+    if not debug_grid:
+        return None
+    try:
+        return {
+            'step_px': float(debug_grid.get('step_px', 100)),
+            'alpha': float(debug_grid.get('alpha', 0.25)),
+            'line_width': float(debug_grid.get('line_width', 0.5)),
+            'label': bool(debug_grid.get('label', True)),
+            'label_font_size': float(debug_grid.get('label_font_size', 7)),
+        }
+    except Exception:
+        return None
+
+
+def _compile_debug_canvas_grid(template_config):
+    debug_canvas_grid = template_config.get('debug_canvas_grid')
+    if not debug_canvas_grid:
+        return None
+    try:
+        return {
+            'step': float(debug_canvas_grid.get('step', 50)) * mm,
+            'alpha': float(debug_canvas_grid.get('alpha', 0.15)),
+            'line_width': float(debug_canvas_grid.get('line_width', 0.3)),
+        }
+    except Exception:
+        return None
+
+
+def _compile_text_item(item, template_config, page_height, global_y_offset, registry):
+    coord_unit, y_origin, _to_pt = _coord_converter(template_config)
+
+    width = _to_pt(item.get('width', 0))
+    x = _to_pt(item.get('x', 0))
+
+    raw_y = float(item.get('y', 0) or 0)
+    if coord_unit == 'px' and y_origin == 'top':
+        y = float(page_height) - px_to_pt(raw_y)
+    else:
+        y = _to_pt(raw_y)
+
+    x_anchor = (item.get('x_anchor') or item.get('anchor') or 'left').lower()
+    if x_anchor == 'center':
+        x = x - (width / 2.0)
+    elif x_anchor == 'right':
+        x = x - width
+
+    y_offset_raw = float(item.get('y_offset', 0) or 0)
+    if coord_unit == 'px' and y_origin == 'top':
+        y = y + float(px_to_pt(y_offset_raw)) + global_y_offset
+    else:
+        y = y + _to_pt(y_offset_raw) + global_y_offset
+
+    debug_box = None
+    if template_config.get('debug_points') or item.get('debug_point'):
+        debug_box = (float(item.get('debug_box_height', 10)), float(item.get('debug_box_y_shift', 0)) * mm)
+
+    op = TextOp(
+        'text', x, y, width,
+        font=registry.resolve(item.get('font')),
+        field=str(item.get('field')).strip() if item.get('field') else None,
+        text=item.get('text', ''),
+        align=item.get('align', 'center'),
+        debug_box=debug_box
+    )
+    try:
+        if item.get('auto_size'):
+            op.kind = 'auto'
+            op.max_font_size = int(px_to_pt(item.get('max_font_size', 16)))
+            op.min_font_size = int(px_to_pt(item.get('min_font_size', 12)))
+            return op
+
+        op.font_size = float(px_to_pt(item.get('font_size', item.get('max_font_size', 16))))
+        if item.get('wrap'):
+            op.kind = 'wrap'
+            line_height = px_to_pt(item.get('line_height', None))
+            op.line_height = float(line_height) if line_height is not None else None
+            op.max_lines = int(item['max_lines']) if item.get('max_lines', None) is not None else None
+            op.direction = item.get('direction', 'up')
+        return op
+    except Exception:
+        if debug_box is None:
+            raise
+        # 字号等配置有误：调试模式下仍画出定位框，便于排查
+        op.kind = 'invalid'
+        return op
+
+
+def _compile_legacy_blocks(template_config, registry):
+    """旧版 block 模板：缺少 x/y/width 等必填项时抛出异常（与逐项绘制时一致）"""
+    ops = []
+    for block, field, default_max, default_min in _LEGACY_BLOCKS:
+        if block not in template_config:
+            continue
+        config = template_config[block]
+        ops.append(TextOp(
+            'auto',
+            config['x'] * mm,
+            config['y'] * mm,
+            config['width'] * mm,
+            font=registry.resolve(config.get('font')),
+            field=field,
+            text=config['text'] if field is None else '',
+            max_font_size=int(px_to_pt(config.get('max_font_size', default_max))),
+            min_font_size=int(px_to_pt(config.get('min_font_size', default_min)))
+        ))
+    return ops
+
+
+def compile_template(template_config, background=None, stamp=None, key=None):
+    """把模板配置编译为 RenderPlan；texts 中无法解析的单项被跳过（与原逐项 try/except 一致）"""
+    template_config = template_config or {}
+    registry = get_font_registry()
+
+    # 可选：按背景图原始尺寸设定页面大小，避免拉伸
+    page_size = A4
+    if background is not None and bool(template_config.get('use_background_size')):
+        page_size = (px_to_pt(background.width), px_to_pt(background.height))
+
+    signature = json.dumps({
+        'bg': list(background.key) if background else None,
+        'page_size': [round(float(v), 4) for v in page_size],
+        'stamp': {k: template_config.get(k) for k in _STAMP_KEYS}
+    }, sort_keys=True, default=str)
+    static_form_name = 'CertStatic' + hashlib.md5(signature.encode('utf-8')).hexdigest()[:16]
+
+    if template_config.get('texts'):
+        if str(template_config.get('coord_unit', 'mm') or 'mm').lower() == 'mm':
+            global_y_offset = float(template_config.get('global_y_offset', 0)) * mm
+        else:
+            global_y_offset = px_to_pt(float(template_config.get('global_y_offset', 0) or 0))
+
+        texts = []
+        for item in template_config.get('texts', []):
+            try:
+                texts.append(_compile_text_item(item, template_config, page_size[1], global_y_offset, registry))
+            except Exception:
+                continue
+    else:
+        texts = _compile_legacy_blocks(template_config, registry)
+
+    return RenderPlan(
+        page_size=page_size,
+        background=background,
+        stamp=_compile_stamp(template_config, stamp, page_size),
+        static_form_name=static_form_name,
+        debug_grid=_compile_debug_grid(template_config),
+        debug_canvas_grid=_compile_debug_canvas_grid(template_config),
+        background_color=template_config.get('background_color'),
+        text_color=template_config.get('text_color', black),
+        texts=texts,
+        config_key=key if key is not None else config_key(template_config)
+    )
+
+
+def config_key(template_config):
+    """RenderPlanCache 的配置部分键：数据库模板用 template_key，其它配置用内容哈希"""
+    template_key = getattr(template_config, 'template_key', None)
+    if template_key is not None:
+        return ('template',) + tuple(template_key)
+    payload = json.dumps(template_config or {}, ensure_ascii=False, sort_keys=True, default=str)
+    return ('config', hashlib.sha256(payload.encode('utf-8')).hexdigest())
+
+
+class RenderPlanCache:
+    """有界 LRU：缓存编译后的 RenderPlan，进程内共享"""
+
+    def __init__(self, max_entries=128):
+        self.max_entries = max(1, int(max_entries))
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, template_config):
+        template_config = template_config or {}
+        # 图片查找只是一次 stat + LRU 命中，用文件标识作为键的一部分以感知图片替换
+        background = _load_image(template_config.get('background_image'))
+        stamp = _load_image(template_config.get('stamp_image'))
+        key = (
+            config_key(template_config),
+            background.key if background else None,
+            stamp.key if stamp else None,
+        )
+
+        with self._lock:
+            plan = self._entries.get(key)
+            if plan is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return plan
+            self.misses += 1
+
+        plan = compile_template(template_config, background=background, stamp=stamp, key=key[0])
+        with self._lock:
+            self._entries[key] = plan
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return plan
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'max_entries': self.max_entries,
+                'hits': self.hits,
+                'misses': self.misses
+            }
+
+
+_RENDER_PLANS = None
+_RENDER_PLANS_LOCK = threading.Lock()
+
+
+def get_render_plans():
+    global _RENDER_PLANS
+    plans = _RENDER_PLANS
+    if plans is None:
+        with _RENDER_PLANS_LOCK:
+            if _RENDER_PLANS is None:
+                _RENDER_PLANS = RenderPlanCache()
+            plans = _RENDER_PLANS
+    return plans
@@ -1,8 +1,8 @@
-from flask import Blueprint, request, jsonify, send_file
+from flask import Blueprint, Response, request, jsonify, send_file, stream_with_context
 import io
 import json
-import zipfile
 from datetime import datetime
+from urllib.parse import quote
 
 from admin_auth import require_admin
 from user_auth import require_user
@@ -10,8 +10,8 @@ from user_auth import require_user
 certificate_bp = Blueprint('certificate', __name__)
 
 
-def _pick_template_config(CertificateTemplate, generator, *, category, award_level, fallback_award_level=None):
-    """Pick template config with fallbacks.
+def _pick_template(CertificateTemplate, *, category, award_level, fallback_award_level=None):
+    """Pick template with fallbacks (resolved from the in-memory index, see certificate_templates).
 
     Priority:
     1) exact match: category + award_level
@@ -19,29 +19,33 @@ def _pick_template_config(CertificateTemplate, generator, *, category, award_lev
     3) exact match: category + fallback_award_level (optional)
     4) any category + fallback_award_level (optional)
     """
-    template = CertificateTemplate.query.filter(
-        CertificateTemplate.category == category,
-        CertificateTemplate.award_level == award_level
-    ).first()
-
-    if not template:
-        template = CertificateTemplate.query.filter(
-            CertificateTemplate.award_level == award_level
-        ).first()
+    from certificate_templates import get_template_index
 
-    if (not template) and fallback_award_level:
-        template = CertificateTemplate.query.filter(
-            CertificateTemplate.category == category,
-            CertificateTemplate.award_level == fallback_award_level
-        ).first()
+    return get_template_index().resolve(
+        CertificateTemplate,
+        category=category,
+        award_level=award_level,
+        fallback_award_level=fallback_award_level
+    )
 
-    if (not template) and fallback_award_level:
-        template = CertificateTemplate.query.filter(
-            CertificateTemplate.award_level == fallback_award_level
-        ).first()
+
+def _pick_template_config(CertificateTemplate, generator, *, category, award_level, fallback_award_level=None):
+    """Pick template config with fallbacks (see _pick_template).
+
+    The returned config carries the template id + updated_at so the compiled render plan
+    can be reused across requests (see certificate_plan.TemplateConfig).
+    """
+    from certificate_plan import TemplateConfig
+
+    template = _pick_template(
+        CertificateTemplate,
+        category=category,
+        award_level=award_level,
+        fallback_award_level=fallback_award_level
+    )
 
     if template:
-        return template.get_config(), None
+        return TemplateConfig.from_template(template), None
 
     # 最后兜底：仍然找不到，返回明确错误（不再悄悄用默认模板导致“错版”）
     if fallback_award_level:
@@ -49,6 +53,17 @@ def _pick_template_config(CertificateTemplate, generator, *, category, award_lev
     return None, f"未找到证书模板: {category} - {award_level}"
 
 
+def _invalidate_template_caches():
+    """模板增删改后调用：本进程立即重建模板索引并清空版式合并结果与已编译的 RenderPlan（其它进程依赖 TTL 与模板键）"""
+    from certificate_layouts import get_layout_registry
+    from certificate_plan import get_render_plans
+    from certificate_templates import get_template_index
+
+    get_template_index().invalidate()
+    get_layout_registry().clear()
+    get_render_plans().clear()
+
+
 def _safe_filename_part(val: str) -> str:
     s = str(val or '').strip()
     if not s:
@@ -58,6 +73,86 @@ def _safe_filename_part(val: str) -> str:
     return s
 
 
+def _plan_application_certificates(CertificateTemplate, generator, application):
+    """解析一条获奖记录的选手/辅导员证书模板与文件名（供批量渲染使用）
+
+    选手模板缺失时抛出 ValueError；辅导员模板缺失记录在 coach_error 中（选手证书仍生成）。
+    """
+    match_no = _safe_filename_part(application.match_no)
+    participants = sorted(application.participants, key=lambda p: p.seq_no)
+    name_part = "、".join([p.participant_name for p in participants]) if participants else ''
+
+    # 学生证书
+    template_config, err = _pick_template_config(
+        CertificateTemplate,
+        generator,
+        category=application.category,
+        award_level=application.award_level,
+        fallback_award_level='一等奖'
+    )
+    if err:
+        raise ValueError(err)
+    player_filename = (
+        f"{match_no}_"
+        f"{_safe_filename_part(name_part)}_"
+        f"{_safe_filename_part(application.category)}_"
+        f"{_safe_filename_part(application.education_level)}_"
+        f"{_safe_filename_part(application.award_level)}.pdf"
+    )
+
+    # 辅导员证书
+    coach_award_level = f"{application.award_level}-辅导员"
+    coach_config, coach_err = _pick_template_config(
+        CertificateTemplate,
+        generator,
+        category=application.category,
+        award_level=coach_award_level,
+        fallback_award_level='一等奖-辅导员'
+    )
+    teacher_name = getattr(application, 'teacher_name', '') or ''
+    coach_filename = (
+        f"{match_no}_"
+        f"{_safe_filename_part(teacher_name)}_"
+        f"{_safe_filename_part(application.category)}_"
+        f"{_safe_filename_part(coach_award_level)}.pdf"
+    )
+
+    return {
+        'application_id': application.id,
+        'player_config': template_config,
+        'player_filename': player_filename,
+        'coach_config': coach_config,
+        'coach_filename': coach_filename,
+        'coach_error': coach_err
+    }
+
+
+def _send_certificate_pdf(generator, application, template_config, filename):
+    """渲染（或从磁盘缓存读取）证书并作为附件返回"""
+    from certificate_cache import get_certificate_cache
+
+    pdf_file, pdf_content = get_certificate_cache().get_or_render(generator, application, template_config)
+    return send_file(
+        pdf_file if pdf_file is not None else io.BytesIO(pdf_content),
+        mimetype='application/pdf',
+        as_attachment=True,
+        download_name=filename
+    )
+
+
+def _zip_stream_response(entries, filename):
+    """把 (filename, content) 序列边压缩边写入响应，内存占用只与单个文件有关"""
+    from zip_stream import iter_zip
+
+    # 与 send_file 一致：中文文件名放在 filename*，filename 给出 ASCII 兜底
+    disposition = f"attachment; filename=\"certificates.zip\"; filename*=UTF-8''{quote(filename)}"
+    return Response(
+        stream_with_context(iter_zip(entries)),
+        mimetype='application/zip',
+        headers={'Content-Disposition': disposition}
+    )
+
+
 def _assert_user_owns_application(application):
     payload = getattr(request, 'user_payload', {}) or {}
     openid = str(payload.get('openid', '') or '').strip()
@@ -82,7 +177,7 @@ def generate_certificate(application_id):
     """生成证书PDF"""
     try:
         from models import Application, CertificateTemplate
-        from certificate_generator import CertificateGenerator
+        from certificate_generator import get_certificate_generator
         
         # 获取申请记录
         application = Application.query.get(application_id)
@@ -98,7 +193,7 @@ def generate_certificate(application_id):
                 'message': '该记录暂无获奖信息，无法生成证书'
             }), 400
         
-        generator = CertificateGenerator()
+        generator = get_certificate_generator()
 
         # 选手证书：甲方未提供二/三等奖模板前，统一使用“一等奖”模板
         template_config, err = _pick_template_config(
@@ -117,67 +212,13 @@ def generate_certificate(application_id):
         # Ensure player certificate keeps the native PNG aspect ratio (horizontal) and uses
         # the confirmed pixel coordinates (top-origin) to avoid A4 stretching.
         try:
+            from certificate_layouts import PLAYER_BACKGROUND, apply_layout
             bg = str((template_config or {}).get('background_image', '') or '').strip()
-            if bg == 'assets/cert/player.png':
-                template_config = dict(template_config or {})
-                template_config.update({
-                    'use_background_size': True,
-                    'coord_unit': 'px',
-                    'y_origin': 'top',
-                    'global_y_offset': 0,
-                    'stamp_image': 'assets/cert/stamp.png',
-                    'stamp_center_x': True,
-                    'stamp_y': 750,
-                    'stamp_y_anchor': 'center',
-                    'texts': [
-                        {
-                            'field': 'participants_names',
-                            'font': '宋体',
-                            'font_size': 24,
-                            'align': 'center',
-                            'width': 1262,
-                            'x': 0,
-                            'x_anchor': 'left',
-                            'y': 400,
-                        },
-                        {
-                            'field': 'category',
-                            'font': '宋体',
-                            'font_size': 24,
-                            'align': 'center',
-                            'width': 180,
-                            'x': 680,
-                            'x_anchor': 'left',
-                            'y': 470,
-                        },
-                        {
-                            'field': 'education_level',
-                            'font': '宋体',
-                            'font_size': 24,
-                            'align': 'center',
-                            'width': 140,
-                            'x': 920,
-                            'x_anchor': 'left',
-                            'y': 470,
-                        },
-                        {
-                            'field': 'award_level',
-                            'font': '华文楷体',
-                            'font_size': 84,
-                            'align': 'center',
-                            'width': 1262,
-                            'x': 0,
-                            'x_anchor': 'left',
-                            'y': 590,
-                        },
-                    ]
-                })
+            if bg == PLAYER_BACKGROUND:
+                template_config = apply_layout('player-landscape', template_config)
         except Exception:
             pass
         
-        # 生成PDF
-        pdf_content = generator.generate_certificate(application, template_config)
-        
         # 创建文件响应
         participants = sorted(application.participants, key=lambda p: p.seq_no)
         name_part = "、".join([p.participant_name for p in participants]) if participants else ''
@@ -189,12 +230,8 @@ def generate_certificate(application_id):
             f"{_safe_filename_part(application.award_level)}.pdf"
         )
         
-        return send_file(
-            io.BytesIO(pdf_content),
-            mimetype='application/pdf',
-            as_attachment=True,
-            download_name=filename
-        )
+        # 生成PDF（相同输入直接返回缓存文件）
+        return _send_certificate_pdf(generator, application, template_config, filename)
         
     except Exception as e:
         return jsonify({
@@ -209,7 +246,7 @@ def generate_excellent_coach_certificate(coach_id):
     """生成优秀辅导员证书PDF（学生端查询后下载）"""
     try:
         from models import ExcellentCoach, CertificateTemplate
-        from certificate_generator import CertificateGenerator
+        from certificate_generator import get_certificate_generator
 
         coach = ExcellentCoach.query.get(coach_id)
         if not coach:
@@ -222,7 +259,7 @@ def generate_excellent_coach_certificate(coach_id):
         if not application:
             return jsonify({'success': False, 'message': '暂无获奖数据，无法生成证书'}), 404
 
-        generator = CertificateGenerator()
+        generator = get_certificate_generator()
         coach_award_level = f"{application.award_level}-辅导员"
 
         template_config, err = _pick_template_config(
@@ -238,65 +275,11 @@ def generate_excellent_coach_certificate(coach_id):
         # Excellent coach certificate uses the same template as player certificate.
         # Only difference: award text should be exactly '优秀辅导员'.
         try:
-            template_config = dict(template_config or {})
-            template_config.update({
-                'background_image': 'assets/cert/player.png',
-                'use_background_size': True,
-                'coord_unit': 'px',
-                'y_origin': 'top',
-                'global_y_offset': 0,
-                'stamp_image': 'assets/cert/stamp.png',
-                'stamp_center_x': True,
-                'stamp_y': 750,
-                'stamp_y_anchor': 'center',
-                'texts': [
-                    {
-                        'text': str(coach.teacher_name or '').strip(),
-                        'font': '宋体',
-                        'font_size': 24,
-                        'align': 'center',
-                        'width': 1262,
-                        'x': 0,
-                        'x_anchor': 'left',
-                        'y': 400,
-                    },
-                    {
-                        'field': 'category',
-                        'font': '宋体',
-                        'font_size': 24,
-                        'align': 'center',
-                        'width': 180,
-                        'x': 680,
-                        'x_anchor': 'left',
-                        'y': 470,
-                    },
-                    {
-                        'field': 'education_level',
-                        'font': '宋体',
-                        'font_size': 24,
-                        'align': 'center',
-                        'width': 140,
-                        'x': 920,
-                        'x_anchor': 'left',
-                        'y': 470,
-                    },
-                    {
-                        'text': '优秀辅导员',
-                        'font': '华文楷体',
-                        'font_size': 84,
-                        'align': 'center',
-                        'width': 1262,
-                        'x': 0,
-                        'x_anchor': 'left',
-                        'y': 590,
-                    },
-                ]
-            })
+            from certificate_layouts import apply_layout
+            template_config = apply_layout('excellent-coach', template_config)
         except Exception:
             pass
 
-        pdf_content = generator.generate_certificate(application, template_config)
-
         filename = (
             f"{_safe_filename_part(application.match_no)}_"
             f"{_safe_filename_part(coach.teacher_name)}_"
@@ -304,12 +287,7 @@ def generate_excellent_coach_certificate(coach_id):
             f"优秀辅导员.pdf"
         )
 
-        return send_file(
-            io.BytesIO(pdf_content),
-            mimetype='application/pdf',
-            as_attachment=True,
-            download_name=filename
-        )
+        return _send_certificate_pdf(generator, application, template_config, filename)
 
     except Exception as e:
         return jsonify({'success': False, 'message': f'生成辅导员证书失败: {str(e)}'}), 500
@@ -320,7 +298,7 @@ def generate_coach_certificate(application_id):
     """生成辅导员证书PDF（使用 award_level + '-辅导员' 模板）"""
     try:
         from models import Application, CertificateTemplate
-        from certificate_generator import CertificateGenerator
+        from certificate_generator import get_certificate_generator
 
         application = Application.query.get(application_id)
         if not application:
@@ -335,7 +313,7 @@ def generate_coach_certificate(application_id):
                 'message': '该记录暂无获奖信息，无法生成证书'
             }), 400
 
-        generator = CertificateGenerator()
+        generator = get_certificate_generator()
         coach_award_level = f"{application.award_level}-辅导员"
 
         # 辅导员证书：甲方未提供其他模板前，统一使用“一等奖-辅导员”模板
@@ -351,7 +329,6 @@ def generate_coach_certificate(application_id):
                 'success': False,
                 'message': err
             }), 404
-        pdf_content = generator.generate_certificate(application, template_config)
 
         teacher_name = getattr(application, 'teacher_name', '') or ''
         filename = (
@@ -360,12 +337,7 @@ def generate_coach_certificate(application_id):
             f"{_safe_filename_part(application.category)}_"
             f"{_safe_filename_part(coach_award_level)}.pdf"
         )
-        return send_file(
-            io.BytesIO(pdf_content),
-            mimetype='application/pdf',
-            as_attachment=True,
-            download_name=filename
-        )
+        return _send_certificate_pdf(generator, application, template_config, filename)
 
     except Exception as e:
         return jsonify({
@@ -376,10 +348,17 @@ def generate_coach_certificate(application_id):
 @certificate_bp.route('/api/certificate/batch-generate', methods=['POST'])
 @require_admin()
 def batch_generate_certificates():
-    """批量生成证书"""
+    """批量生成证书
+
+    可选参数：
+    - output_mode: zip（默认，每张证书一个 PDF）/ merged（整批合并为多页 PDF）
+    - pages_per_file: merged 模式下每个 PDF 的页数，0 表示不拆分
+    """
     try:
         from models import Application, CertificateTemplate
-        from certificate_generator import CertificateGenerator
+        from certificate_generator import get_certificate_generator
+        from certificate_batch import OUTPUT_MODE_MERGED, iter_batch_files, parse_output_options
+        from sqlalchemy.orm import selectinload
         
         data = request.get_json()
         application_ids = data.get('application_ids', [])
@@ -389,9 +368,17 @@ def batch_generate_certificates():
                 'success': False,
                 'message': '请提供要生成证书的申请ID列表'
             }), 400
+
+        try:
+            output_mode, pages_per_file = parse_output_options(data)
+        except ValueError as e:
+            return jsonify({
+                'success': False,
+                'message': str(e)
+            }), 400
         
-        # 获取所有申请记录
-        applications = Application.query.filter(
+        # 获取所有申请记录（participants 批量预加载）
+        applications = Application.query.options(selectinload(Application.participants)).filter(
             Application.id.in_(application_ids),
             Application.award_level.isnot(None)
         ).all()
@@ -402,74 +389,26 @@ def batch_generate_certificates():
                 'message': '未找到有效的申请记录'
             }), 404
         
-        generator = CertificateGenerator()
-        generated = []
+        generator = get_certificate_generator()
         errors = []
-        
+        page_index = []
+
+        planned = []
         for application in applications:
             try:
-                match_no = _safe_filename_part(application.match_no)
-                participants = sorted(application.participants, key=lambda p: p.seq_no)
-                name_part = "、".join([p.participant_name for p in participants]) if participants else ''
-
-                # 学生证书
-                template_config, err = _pick_template_config(
-                    CertificateTemplate,
-                    generator,
-                    category=application.category,
-                    award_level=application.award_level,
-                    fallback_award_level='一等奖'
-                )
-                if err:
-                    raise ValueError(err)
-                pdf_content = generator.generate_certificate(application, template_config)
-                player_filename = (
-                    f"{match_no}_"
-                    f"{_safe_filename_part(name_part)}_"
-                    f"{_safe_filename_part(application.category)}_"
-                    f"{_safe_filename_part(application.education_level)}_"
-                    f"{_safe_filename_part(application.award_level)}.pdf"
-                )
-                generated.append({
-                    'application_id': application.id,
-                    'kind': 'player',
-                    'filename': player_filename,
-                    'content': pdf_content
-                })
-
-                # 辅导员证书
-                coach_award_level = f"{application.award_level}-辅导员"
-                coach_config, coach_err = _pick_template_config(
-                    CertificateTemplate,
-                    generator,
-                    category=application.category,
-                    award_level=coach_award_level,
-                    fallback_award_level='一等奖-辅导员'
-                )
-                if coach_err:
-                    raise ValueError(coach_err)
-                coach_pdf = generator.generate_certificate(application, coach_config)
-                teacher_name = getattr(application, 'teacher_name', '') or ''
-                coach_filename = (
-                    f"{match_no}_"
-                    f"{_safe_filename_part(teacher_name)}_"
-                    f"{_safe_filename_part(application.category)}_"
-                    f"{_safe_filename_part(coach_award_level)}.pdf"
-                )
-                generated.append({
-                    'application_id': application.id,
-                    'kind': 'coach',
-                    'filename': coach_filename,
-                    'content': coach_pdf
-                })
-
+                plan = _plan_application_certificates(CertificateTemplate, generator, application)
             except Exception as e:
-                errors.append({
-                    'application_id': application.id,
-                    'error': str(e)
-                })
+                planned.append((application, None, str(e)))
+                continue
+            planned.append((application, plan, None))
 
-        if not generated:
+        # 渲染可分发到进程池（CERT_RENDER_WORKERS），结果按原顺序逐个写入 zip
+        files = iter_batch_files(generator, planned, output_mode, errors, page_index, pages_per_file=pages_per_file)
+
+        # 先渲染出第一份文件再开始响应：全部失败时仍可返回 JSON 错误
+        try:
+            first = next(files)
+        except StopIteration:
             return jsonify({
                 'success': False,
                 'message': f'批量生成失败：全部生成失败（失败 {len(errors)} 个）',
@@ -480,30 +419,30 @@ def batch_generate_certificates():
                 }
             }), 500
 
-        # 打包 zip（避免 bytes 进入 jsonify）
-        zip_buffer = io.BytesIO()
-        with zipfile.ZipFile(zip_buffer, 'w', compression=zipfile.ZIP_DEFLATED) as zf:
-            for item in generated:
-                zf.writestr(item['filename'], item['content'])
+        def _entries():
+            success_count = 1
+            yield first
+            for entry in files:
+                success_count += 1
+                yield entry
 
+            # manifest.json 最后写入，此时失败明细已完整
             manifest = {
                 'total_requested': len(application_ids),
                 'matched_with_award': len(applications),
-                'success_count': len(generated),
+                'output_mode': output_mode,
+                'success_count': success_count,
                 'error_count': len(errors),
                 'errors': errors
             }
-            zf.writestr('manifest.json', json.dumps(manifest, ensure_ascii=False, indent=2))
+            if output_mode == OUTPUT_MODE_MERGED:
+                manifest['page_count'] = sum(len(f['pages']) for f in page_index)
+                manifest['files'] = page_index
+            yield 'manifest.json', json.dumps(manifest, ensure_ascii=False, indent=2)
 
-        zip_buffer.seek(0)
         ts = datetime.now().strftime('%Y%m%d_%H%M%S')
         filename = f"证书批量生成_{ts}.zip"
-        return send_file(
-            zip_buffer,
-            mimetype='application/zip',
-            as_attachment=True,
-            download_name=filename
-        )
+        return _zip_stream_response(_entries(), filename)
         
     except Exception as e:
         return jsonify({
@@ -511,6 +450,132 @@ def batch_generate_certificates():
             'message': f'批量生成失败: {str(e)}'
         }), 500
 
+@certificate_bp.route('/api/certificate/jobs', methods=['POST'])
+@require_admin()
+def submit_certificate_job():
+    """提交后台批量生成任务（参数同 batch-generate），由 certificate_worker.py 处理
+
+    大批量时同步接口容易超过网关/小程序请求超时，改为返回任务ID后轮询进度。
+    """
+    try:
+        from app import db
+        from models import Application, CertificateJob
+        from certificate_batch import parse_output_options
+
+        data = request.get_json() or {}
+        application_ids = data.get('application_ids', [])
+
+        if not application_ids:
+            return jsonify({
+                'success': False,
+                'message': '请提供要生成证书的申请ID列表'
+            }), 400
+
+        try:
+            output_mode, pages_per_file = parse_output_options(data)
+        except ValueError as e:
+            return jsonify({
+                'success': False,
+                'message': str(e)
+            }), 400
+
+        rows = Application.query.with_entities(Application.id).filter(
+            Application.id.in_(application_ids),
+            Application.award_level.isnot(None)
+        ).order_by(Application.id).all()
+        matched_ids = [row.id for row in rows]
+
+        if not matched_ids:
+            return jsonify({
+                'success': False,
+                'message': '未找到有效的申请记录'
+            }), 404
+
+        job = CertificateJob(
+            status='pending',
+            output_mode=output_mode,
+            pages_per_file=pages_per_file,
+            application_ids=json.dumps(matched_ids),
+            total_requested=len(application_ids),
+            total_count=len(matched_ids)
+        )
+        db.session.add(job)
+        db.session.commit()
+
+        return jsonify({
+            'success': True,
+            'message': '任务已提交',
+            'data': {
+                'job_id': job.id,
+                'status_url': f'/api/certificate/jobs/{job.id}',
+                'download_url': f'/api/certificate/jobs/{job.id}/download',
+                'job': job.to_dict()
+            }
+        }), 202
+
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'message': f'提交任务失败: {str(e)}'
+        }), 500
+
+
+@certificate_bp.route('/api/certificate/jobs/<int:job_id>', methods=['GET'])
+@require_admin()
+def get_certificate_job(job_id):
+    """查询后台批量生成任务进度（done_count/total_count/errors）"""
+    try:
+        from models import CertificateJob
+
+        job = CertificateJob.query.get(job_id)
+        if not job:
+            return jsonify({'success': False, 'message': '任务不存在'}), 404
+
+        return jsonify({
+            'success': True,
+            'data': job.to_dict()
+        })
+
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'message': f'查询任务失败: {str(e)}'
+        }), 500
+
+
+@certificate_bp.route('/api/certificate/jobs/<int:job_id>/download', methods=['GET'])
+@require_admin()
+def download_certificate_job(job_id):
+    """下载后台批量生成任务的证书压缩包"""
+    try:
+        import os
+        from models import CertificateJob
+
+        job = CertificateJob.query.get(job_id)
+        if not job:
+            return jsonify({'success': False, 'message': '任务不存在'}), 404
+        if job.status != 'completed':
+            return jsonify({
+                'success': False,
+                'message': '任务尚未完成',
+                'data': job.to_dict()
+            }), 409
+        if not job.artifact_path or not os.path.exists(job.artifact_path):
+            return jsonify({'success': False, 'message': '压缩包不存在或已被清理，请重新提交任务'}), 404
+
+        ts = job.created_at.strftime('%Y%m%d_%H%M%S') if job.created_at else datetime.now().strftime('%Y%m%d_%H%M%S')
+        filename = f"证书批量生成_{ts}.zip"
+        return send_file(
+            job.artifact_path,
+            mimetype='application/zip',
+            as_attachment=True,
+            download_name=filename
+        )
+
+    except Exception as e:
+        return jsonify({'success': False, 'message': f'下载失败: {str(e)}'}), 500
+
+
 @certificate_bp.route('/api/certificate/templates', methods=['GET'])
 def get_certificate_templates():
     """获取证书模板列表"""
@@ -579,6 +644,7 @@ def create_certificate_template():
         
         db.session.add(template)
         db.session.commit()
+        _invalidate_template_caches()
         
         return jsonify({
             'success': True,
@@ -622,6 +688,7 @@ def update_certificate_template(template_id):
             template.set_config(data['config'])
         
         db.session.commit()
+        _invalidate_template_caches()
         
         return jsonify({
             'success': True,
@@ -652,6 +719,7 @@ def delete_certificate_template(template_id):
         
         db.session.delete(template)
         db.session.commit()
+        _invalidate_template_caches()
         
         return jsonify({
             'success': True,
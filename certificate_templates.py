@@ -0,0 +1,121 @@
+"""证书模板解析索引
+
+模板表只有几行，但批量生成时每条记录要解析选手、辅导员两个模板，每次最多 4 次查询。
+这里把整张表读入内存，按 (category, award_level) 与 award_level 建索引，
+解析不再访问数据库。
+
+失效：
+- 模板的创建/更新/删除接口提交后调用 invalidate()，本进程立即重建；
+- 其它 gunicorn worker / 后台任务进程依靠 TTL 兜底（CERT_TEMPLATE_INDEX_TTL 秒，默认 30），
+  设为 0 表示每次都查库（等同于原来的逐条查询）。
+"""
+import hashlib
+import json
+import os
+import threading
+import time
+
+
+class TemplateEntry:
+    """CertificateTemplate 的只读快照；配置 JSON 首次使用时解析"""
+
+    __slots__ = ('id', 'name', 'category', 'award_level', 'updated_at', 'config_digest', '_raw_config', '_config', '_lock')
+
+    def __init__(self, template):
+        self.id = template.id
+        self.name = template.name
+        self.category = template.category
+        self.award_level = template.award_level
+        self.updated_at = template.updated_at
+        self._raw_config = template.template_config
+        # 配置原文哈希，作为 TemplateConfig.template_key 的一部分（见 certificate_plan）
+        self.config_digest = hashlib.sha256((template.template_config or '').encode('utf-8')).hexdigest()
+        self._config = None
+        self._lock = threading.Lock()
+
+    def get_config(self):
+        """与 CertificateTemplate.get_config 相同；返回共享对象，调用方需自行复制后再修改"""
+        config = self._config
+        if config is None:
+            with self._lock:
+                if self._config is None:
+                    self._config = json.loads(self._raw_config)
+                config = self._config
+        return config
+
+
+class TemplateIndex:
+    """(category, award_level) -> 模板，按原查询的四级兜底顺序解析"""
+
+    def __init__(self, ttl_seconds=30):
+        self.ttl_seconds = float(ttl_seconds)
+        self._lock = threading.Lock()
+        self._by_key = None
+        self._by_award = None
+        self._loaded_at = 0.0
+        self.loads = 0
+
+    def _build(self, CertificateTemplate):
+        by_key = {}
+        by_award = {}
+        # 与 .first() 未指定排序时的结果一致：取主键最小的一行
+        for template in CertificateTemplate.query.order_by(CertificateTemplate.id).all():
+            entry = TemplateEntry(template)
+            by_key.setdefault((entry.category, entry.award_level), entry)
+            by_award.setdefault(entry.award_level, entry)
+        return by_key, by_award
+
+    def _indexes(self, CertificateTemplate):
+        with self._lock:
+            fresh = self._by_key is not None and (time.monotonic() - self._loaded_at) < self.ttl_seconds
+            if fresh:
+                return self._by_key, self._by_award
+
+        by_key, by_award = self._build(CertificateTemplate)
+        with self._lock:
+            self._by_key, self._by_award = by_key, by_award
+            self._loaded_at = time.monotonic()
+            self.loads += 1
+        return by_key, by_award
+
+    def resolve(self, CertificateTemplate, *, category, award_level, fallback_award_level=None):
+        """返回 TemplateEntry 或 None，优先级见 certificate_routes._pick_template"""
+        by_key, by_award = self._indexes(CertificateTemplate)
+
+        entry = by_key.get((category, award_level)) or by_award.get(award_level)
+        if (not entry) and fallback_award_level:
+            entry = by_key.get((category, fallback_award_level)) or by_award.get(fallback_award_level)
+        return entry
+
+    def invalidate(self):
+        with self._lock:
+            self._by_key = None
+            self._by_award = None
+
+    def stats(self):
+        with self._lock:
+            return {
+                'loaded': self._by_key is not None,
+                'templates': len(self._by_key or {}),
+                'ttl_seconds': self.ttl_seconds,
+                'loads': self.loads
+            }
+
+
+_TEMPLATE_INDEX = None
+_TEMPLATE_INDEX_LOCK = threading.Lock()
+
+
+def get_template_index():
+    global _TEMPLATE_INDEX
+    index = _TEMPLATE_INDEX
+    if index is None:
+        with _TEMPLATE_INDEX_LOCK:
+            if _TEMPLATE_INDEX is None:
+                try:
+                    ttl = float(str(os.environ.get('CERT_TEMPLATE_INDEX_TTL', '') or '30').strip() or 30)
+                except Exception:
+                    ttl = 30
+                _TEMPLATE_INDEX = TemplateIndex(ttl_seconds=ttl)
+            index = _TEMPLATE_INDEX
+    return index
@@ -0,0 +1,438 @@
+"""后台批量生成证书
+
+/api/certificate/jobs 只写入一条 CertificateJob（status=pending），由本进程轮询数据库领取并渲染，
+不依赖额外的消息队列：
+
+    python certificate_worker.py          # 常驻轮询
+    python certificate_worker.py --once   # 处理完当前队列后退出
+
+断点续跑：领取任务时先把解析好的模板方案写入 <CERT_JOB_DIR>/<job_id>/plan.json，
+之后每完成一个渲染单元（zip 模式为一条报名记录，merged 模式为分卷中最多 MERGED_UNIT_PAGES 页的一段）
+就把 PDF 落盘并在数据库中推进 checkpoint、刷新心跳。进程重启后，心跳超时的 running 任务会被重新领取，
+从 checkpoint 继续；全部完成后把同一分卷的各段合并（pypdf），打包为 certificates.zip。
+
+每次推进 checkpoint 与最终打包前都以 worker_id 为条件刷新心跳：任务已被其他 worker 接管时
+本进程放弃该任务，不再写入进度或产物。
+
+环境变量：
+- CERT_JOB_DIR：任务目录，默认 <cwd>/generated_jobs
+- CERT_JOB_POLL_SECONDS：空闲时轮询间隔（秒），默认 2
+- CERT_JOB_STALE_SECONDS：running 任务心跳超时（秒），超时后可被其他 worker 接管，默认 300
+"""
+import argparse
+import json
+import os
+import shutil
+import signal
+import socket
+import time
+import uuid
+import zipfile
+from datetime import datetime, timedelta
+
+
+# 每次从数据库加载的报名记录数（zip 模式）
+LOAD_BATCH_SIZE = 100
+# merged 模式每个渲染单元的最大页数：与 pages_per_file 无关，保证不拆分的大分卷也能断点续跑、按时刷新心跳
+MERGED_UNIT_PAGES = 50
+
+
+def _env_number(name, default):
+    try:
+        return float(str(os.environ.get(name, '') or default).strip() or default)
+    except Exception:
+        return default
+
+
+def job_folder(job_id):
+    root = str(os.environ.get('CERT_JOB_DIR', '') or '').strip() or os.path.join(os.getcwd(), 'generated_jobs')
+    return os.path.join(root, str(job_id))
+
+
+def _write_atomic(path, content):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(content)
+    os.replace(tmp_path, path)
+
+
+def _part_path(folder, unit, k=0):
+    return os.path.join(folder, 'parts', f"{unit:06d}-{k}.pdf")
+
+
+class _StopRequested(Exception):
+    pass
+
+
+class _ClaimLost(Exception):
+    """任务已被其他 worker 接管（本进程心跳超时）"""
+
+
+class CertificateJobRunner:
+    """处理单个 CertificateJob；所有进度都写回数据库，可随时中断后重新执行"""
+
+    def __init__(self, job, generator, should_stop=None, worker_id=None):
+        self.job = job
+        self.generator = generator
+        self.should_stop = should_stop or (lambda: False)
+        self.folder = job_folder(job.id)
+        # 领取任务时写入的 worker_id；检查点与打包前以此确认任务仍归本进程
+        self.worker_id = worker_id or job.worker_id
+
+    # -- 方案 ---------------------------------------------------------------
+
+    def _load_plan(self):
+        """首次执行时解析模板并固化到 plan.json，续跑时原样读取，保证断点前后单元划分一致"""
+        from app import db
+        from models import CertificateTemplate
+        from certificate_batch import OUTPUT_MODE_MERGED, merged_page_chunks
+        from certificate_routes import _plan_application_certificates
+
+        plan_path = os.path.join(self.folder, 'plan.json')
+        if os.path.exists(plan_path):
+            with open(plan_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+
+        ids = self.job.get_application_ids()
+        applications = self._load_applications(ids)
+        planned = []
+        errors = []
+        for app_id in ids:
+            application = applications.get(app_id)
+            if application is None or not application.award_level:
+                errors.append({'application_id': app_id, 'error': '报名记录不存在或未设置获奖等级'})
+                continue
+            try:
+                plan = _plan_application_certificates(CertificateTemplate, self.generator, application)
+            except Exception as e:
+                errors.append({'application_id': app_id, 'error': str(e)})
+                continue
+            planned.append(plan)
+
+        if self.job.output_mode == OUTPUT_MODE_MERGED:
+            # 辅导员模板缺失的记录在切分分卷时记入 errors
+            merged_page_chunks([(p['application_id'], p) for p in planned], errors, pages_per_file=self.job.pages_per_file)
+
+        # 先提交数据库再写 plan.json：两步之间中断时下次会重新解析并覆盖 errors，不会重复记录
+        self.job.total_count = len(ids)
+        self.job.set_errors(errors)
+        self.job.done_count = len(ids) - len(planned)
+        db.session.commit()
+
+        state = {'planned': planned, 'unit_pages': MERGED_UNIT_PAGES}
+        _write_atomic(plan_path, json.dumps(state, ensure_ascii=False).encode('utf-8'))
+        return state
+
+    def _units(self, state):
+        from certificate_batch import OUTPUT_MODE_MERGED, merged_page_chunks
+
+        planned = state['planned']
+        if self.job.output_mode == OUTPUT_MODE_MERGED:
+            # 页中的 application 位置放报名ID，渲染前再换成 ORM 对象；单元为 (分卷序号, 页段)。
+            # 旧版本写入的 plan.json 没有 unit_pages，仍按整个分卷一个单元，与已有 checkpoint 对应
+            files = merged_page_chunks([(p['application_id'], p) for p in planned], [], pages_per_file=self.job.pages_per_file)
+            unit_pages = state.get('unit_pages') or 0
+            units = []
+            for file_no, chunk in enumerate(files):
+                size = unit_pages or max(1, len(chunk))
+                for start in range(0, len(chunk), size):
+                    units.append((file_no, chunk[start:start + size]))
+            return units
+        return planned
+
+    # -- 执行 ---------------------------------------------------------------
+
+    def run(self):
+        from certificate_batch import OUTPUT_MODE_MERGED
+
+        state = self._load_plan()
+        units = self._units(state)
+        if self.job.output_mode == OUTPUT_MODE_MERGED:
+            self._run_merged(state, units)
+        else:
+            self._run_zip(units)
+        self._finish(state, units)
+
+    def _heartbeat(self):
+        """以 worker_id 为条件刷新心跳（调用方提交）；任务已被其他 worker 接管时回滚并抛出 _ClaimLost"""
+        from app import db
+        from models import CertificateJob
+
+        owned = CertificateJob.query.filter(
+            CertificateJob.id == self.job.id,
+            CertificateJob.worker_id == self.worker_id,
+            CertificateJob.status == 'running'
+        ).update({'heartbeat_at': datetime.utcnow()}, synchronize_session=False)
+        if owned != 1:
+            db.session.rollback()
+            raise _ClaimLost()
+
+    def _checkpoint(self, unit_count, done_count, success_delta, new_errors):
+        from app import db
+
+        self._heartbeat()
+        errors = self.job.get_errors()
+        errors.extend(new_errors)
+        self.job.set_errors(errors)
+        self.job.checkpoint = unit_count
+        self.job.done_count = done_count
+        self.job.success_count = (self.job.success_count or 0) + success_delta
+        db.session.commit()
+        if self.should_stop():
+            raise _StopRequested()
+
+    def _load_applications(self, ids):
+        from models import Application
+        from sqlalchemy.orm import selectinload
+        if not ids:
+            return {}
+        query = Application.query.options(selectinload(Application.participants)).filter(Application.id.in_(ids))
+        return {a.id: a for a in query.all()}
+
+    def _run_zip(self, units):
+        from certificate_batch import iter_render_applications
+
+        skipped = self.job.total_count - len(units)
+        start = self.job.checkpoint or 0
+        for batch_start in range(start, len(units), LOAD_BATCH_SIZE):
+            batch = units[batch_start:batch_start + LOAD_BATCH_SIZE]
+            applications = self._load_applications([p['application_id'] for p in batch])
+
+            entries = []
+            missing = {}
+            for offset, plan in enumerate(batch):
+                application = applications.get(plan['application_id'])
+                if application is None:
+                    missing[offset] = plan['application_id']
+                    continue
+                entries.append((application, plan))
+
+            results = iter_render_applications(self.generator, entries)
+            for offset, plan in enumerate(batch):
+                unit = batch_start + offset
+                if offset in missing:
+                    items, err = [], '报名记录不存在'
+                else:
+                    items, err = next(results)
+                for k, item in enumerate(items):
+                    # 0 = 选手证书，1 = 辅导员证书；打包时按 plan 中的文件名还原
+                    _write_atomic(_part_path(self.folder, unit, k), item['content'])
+                new_errors = [{'application_id': plan['application_id'], 'error': err}] if err else []
+                self._checkpoint(unit + 1, skipped + unit + 1, len(items), new_errors)
+
+    def _run_merged(self, state, units):
+        from certificate_batch import merged_chunk_errors
+
+        skipped = self.job.total_count - len(state['planned'])
+        start = self.job.checkpoint or 0
+        for unit in range(start, len(units)):
+            file_no, chunk = units[unit]
+            applications = self._load_applications(sorted(set(app_id for app_id, _, _ in chunk)))
+            new_errors = []
+            written = 0
+            try:
+                pages = []
+                for app_id, config, _ in chunk:
+                    if app_id not in applications:
+                        raise ValueError(f'报名记录 {app_id} 不存在')
+                    pages.append((applications[app_id], config))
+                _write_atomic(_part_path(self.folder, unit), self.generator.generate_certificates_document(pages))
+                written = 1
+            except Exception as e:
+                new_errors = merged_chunk_errors(chunk, f'第 {file_no + 1} 个分卷', e)
+
+            # 已完成的报名记录：不再出现在后续单元中的记录
+            remaining = set(app_id for _, later in units[unit + 1:] for app_id, _, _ in later)
+            finished = set(p['application_id'] for p in state['planned']) - remaining
+            self._checkpoint(unit + 1, skipped + len(finished), written, new_errors)
+
+    def _merged_files(self, units):
+        """按分卷归并已落盘的页段：[(页段文件路径列表, 各页 (application, config, meta))]；
+        失败的页段已记入 errors，不出现在分卷中，整卷都失败时跳过该分卷"""
+        files = {}
+        for unit, (file_no, chunk) in enumerate(units):
+            path = _part_path(self.folder, unit)
+            if not os.path.exists(path):
+                continue
+            paths, pages = files.setdefault(file_no, ([], []))
+            paths.append(path)
+            pages.extend(chunk)
+        return [files[file_no] for file_no in sorted(files)]
+
+    def _finish(self, state, units):
+        """把落盘的各单元 PDF 与 manifest.json 打包为 certificates.zip"""
+        from app import db
+        from certificate_batch import OUTPUT_MODE_MERGED, merged_file_entry
+
+        errors = self.job.get_errors()
+        artifact_path = os.path.join(self.folder, 'certificates.zip')
+        tmp_path = f"{artifact_path}.{uuid.uuid4().hex}.tmp"
+        generated_count = 0
+        page_index = []
+        try:
+            with zipfile.ZipFile(tmp_path, 'w', compression=zipfile.ZIP_DEFLATED) as zf:
+                if self.job.output_mode == OUTPUT_MODE_MERGED:
+                    for paths, pages in self._merged_files(units):
+                        filename = f"证书合集_{len(page_index) + 1:03d}.pdf"
+                        if len(paths) == 1:
+                            zf.write(paths[0], filename)
+                        else:
+                            zf.writestr(filename, _merge_pdfs(paths))
+                        generated_count += 1
+                        entry = merged_file_entry(pages, filename, None)
+                        page_index.append({'filename': filename, 'pages': entry['pages']})
+                        # 合并大分卷可能较慢：每个分卷后刷新一次心跳
+                        self._heartbeat()
+                        db.session.commit()
+                else:
+                    for unit, item in enumerate(units):
+                        for k, filename in enumerate([item['player_filename'], item.get('coach_filename')]):
+                            path = _part_path(self.folder, unit, k)
+                            if not filename or not os.path.exists(path):
+                                continue
+                            zf.write(path, filename)
+                            generated_count += 1
+
+                manifest = {
+                    'job_id': self.job.id,
+                    'total_requested': self.job.total_requested,
+                    'matched_with_award': self.job.total_count,
+                    'output_mode': self.job.output_mode,
+                    'success_count': generated_count,
+                    'error_count': len(errors),
+                    'errors': errors
+                }
+                if self.job.output_mode == OUTPUT_MODE_MERGED:
+                    manifest['page_count'] = sum(len(f['pages']) for f in page_index)
+                    manifest['files'] = page_index
+                zf.writestr('manifest.json', json.dumps(manifest, ensure_ascii=False, indent=2))
+
+            # 仍持有任务时才替换产物、写入结果
+            self._heartbeat()
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+        self.job.finished_at = datetime.utcnow()
+        self.job.success_count = generated_count
+        self.job.done_count = self.job.total_count
+        if generated_count:
+            os.replace(tmp_path, artifact_path)
+            self.job.status = 'completed'
+            self.job.artifact_path = artifact_path
+            self.job.message = f'生成完成，成功 {generated_count} 个，失败 {len(errors)} 个'
+        else:
+            os.remove(tmp_path)
+            self.job.status = 'failed'
+            self.job.message = f'全部生成失败（失败 {len(errors)} 个）'
+        db.session.commit()
+        shutil.rmtree(os.path.join(self.folder, 'parts'), ignore_errors=True)
+
+
+def _merge_pdfs(paths):
+    """按顺序拼接多个 PDF；各段重复嵌入的背景图/印章等相同对象只保留一份"""
+    import io
+    from pypdf import PdfWriter
+
+    writer = PdfWriter()
+    for path in paths:
+        writer.append(path)
+    # 每轮只能合并引用完全相同的对象：SMask -> 背景图 -> 背景 Form 逐层变得相同，需要多轮
+    for _ in range(3):
+        writer.compress_identical_objects(remove_duplicates=True, remove_unreferenced=True)
+    buffer = io.BytesIO()
+    writer.write(buffer)
+    return buffer.getvalue()
+
+
+# ---------------------------------------------------------------------------
+# 轮询
+# ---------------------------------------------------------------------------
+
+def claim_next_job(worker_id):
+    """领取一个 pending 任务或心跳超时的 running 任务；条件更新保证多个 worker 不会重复领取"""
+    from app import db
+    from models import CertificateJob
+
+    stale_before = datetime.utcnow() - timedelta(seconds=_env_number('CERT_JOB_STALE_SECONDS', 300))
+    claimable = db.or_(
+        CertificateJob.status == 'pending',
+        db.and_(
+            CertificateJob.status == 'running',
+            db.or_(CertificateJob.heartbeat_at.is_(None), CertificateJob.heartbeat_at < stale_before)
+        )
+    )
+    candidates = [row.id for row in CertificateJob.query.with_entities(CertificateJob.id).filter(claimable).order_by(CertificateJob.id).limit(10).all()]
+    for job_id in candidates:
+        now = datetime.utcnow()
+        claimed = CertificateJob.query.filter(CertificateJob.id == job_id, claimable).update({
+            'status': 'running',
+            'worker_id': worker_id,
+            'heartbeat_at': now,
+        }, synchronize_session=False)
+        db.session.commit()
+        if claimed == 1:
+            job = CertificateJob.query.get(job_id)
+            if job.started_at is None:
+                job.started_at = now
+                db.session.commit()
+            return job
+    return None
+
+
+def run_worker(once=False):
+    from app import app, db
+    from certificate_generator import get_certificate_generator
+
+    stop = {'requested': False}
+
+    def _request_stop(signum, frame):
+        stop['requested'] = True
+
+    signal.signal(signal.SIGTERM, _request_stop)
+    signal.signal(signal.SIGINT, _request_stop)
+
+    worker_id = f"{socket.gethostname()}:{os.getpid()}"
+    poll_seconds = _env_number('CERT_JOB_POLL_SECONDS', 2)
+    generator = get_certificate_generator()
+
+    with app.app_context():
+        while not stop['requested']:
+            job = claim_next_job(worker_id)
+            if job is None:
+                if once:
+                    break
+                time.sleep(poll_seconds)
+                continue
+
+            try:
+                CertificateJobRunner(job, generator, should_stop=lambda: stop['requested'], worker_id=worker_id).run()
+            except _StopRequested:
+                # 主动停止：放回队列，下次启动从 checkpoint 继续
+                job.status = 'pending'
+                job.worker_id = None
+                db.session.commit()
+            except _ClaimLost:
+                # 心跳超时后已被其他 worker 接管：由接管者继续，本进程不再改动该任务
+                db.session.rollback()
+            except Exception as e:
+                db.session.rollback()
+                job.status = 'failed'
+                job.message = f'任务执行失败: {str(e)}'
+                job.finished_at = datetime.utcnow()
+                db.session.commit()
+            finally:
+                db.session.remove()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='后台批量生成证书')
+    parser.add_argument('--once', action='store_true', help='处理完当前队列后退出')
+    args = parser.parse_args()
+    run_worker(once=args.once)
+
+
+if __name__ == '__main__':
+    main()
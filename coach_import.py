@@ -0,0 +1,183 @@
+"""优秀辅导员导入：整表校验 + 批量 upsert
+
+原实现逐行按电话哈希查询一次 ExcellentCoach、逐个加密并通过 ORM 写入，上万行的名单就是上万次查询。
+这里分阶段处理：
+
+1. validate：整表规范化、校验（空值、文件内电话重复），一次算出全部电话哈希，不访问数据库；
+2. lookup：电话哈希按批 IN 查询，取回已有记录（excellent_coaches.teacher_phone_hash 上有唯一索引）；
+3. encrypt：为新增的电话批量加密；已有记录电话哈希相同即明文相同，原密文能由当前主密钥验证时保留，
+   否则（OLD_ENCRYPTION_KEYS 加密或已损坏）用当前密钥重新加密——与原来逐行重写密文一样，重新导入即完成密钥轮换；
+4. write：姓名有变化或需要重新加密的已有记录按主键 executemany UPDATE，新增记录 executemany INSERT，同一事务提交。
+   MySQL 上 INSERT 带 ON DUPLICATE KEY UPDATE，并发导入先插入了同一电话时改为更新姓名；
+   其他数据库遇到唯一索引冲突时回滚，按最新数据重新查询后再写入。
+
+错误行的内容与顺序与逐行处理一致。
+"""
+import hashlib
+from datetime import datetime
+
+from import_utils import is_blank_text
+
+
+LOOKUP_BATCH_SIZE = 1000
+MAX_ATTEMPTS = 3
+
+NAME_COLUMNS = ['指导老师姓名', '指导老师', '老师姓名', '姓名', 'teacher_name']
+PHONE_COLUMNS = ['指导老师电话', '指导老师手机号', '老师电话', '电话', '手机号', 'teacher_phone']
+
+
+def _batches(values, size):
+    values = list(values)
+    for start in range(0, len(values), size):
+        yield values[start:start + size]
+
+
+def pick_column(df, candidates):
+    for c in candidates:
+        if c in df.columns:
+            return c
+    return None
+
+
+def phone_hash(phone):
+    return hashlib.sha256(phone.encode()).hexdigest()
+
+
+def validate_rows(df, name_col, phone_col):
+    """返回 ([(电话哈希, 姓名, 电话)], 错误行)；文件内同一电话只保留第一次出现的行"""
+    valid = []
+    errors = []
+    seen_phone_hash = set()
+    for index, row in df.iterrows():
+        try:
+            teacher_name = str(row.get(name_col, '') or '').strip()
+            teacher_phone = str(row.get(phone_col, '') or '').strip()
+
+            if is_blank_text(teacher_name) or is_blank_text(teacher_phone):
+                errors.append({
+                    '行号': index + 2,
+                    '指导老师姓名': teacher_name,
+                    '指导老师电话': teacher_phone,
+                    '错误原因': '姓名或电话为空'
+                })
+                continue
+
+            h = phone_hash(teacher_phone)
+            if h in seen_phone_hash:
+                errors.append({
+                    '行号': index + 2,
+                    '指导老师姓名': teacher_name,
+                    '指导老师电话': teacher_phone,
+                    '错误原因': '该电话在本次导入文件中重复'
+                })
+                continue
+            seen_phone_hash.add(h)
+
+            valid.append((h, teacher_name, teacher_phone))
+        except Exception as e:
+            errors.append({
+                '行号': index + 2,
+                '指导老师姓名': row.get(name_col, ''),
+                '指导老师电话': row.get(phone_col, ''),
+                '错误原因': f'处理异常: {str(e)}'
+            })
+    return valid, errors
+
+
+def lookup_coaches(phone_hashes):
+    """{电话哈希: (ID, 姓名, 电话密文)}；历史数据里同一哈希有多条时取 ID 最小的一条"""
+    from models import ExcellentCoach
+
+    found = {}
+    for batch in _batches(set(phone_hashes), LOOKUP_BATCH_SIZE):
+        rows = ExcellentCoach.query.with_entities(
+            ExcellentCoach.id, ExcellentCoach.teacher_name, ExcellentCoach.teacher_phone_hash,
+            ExcellentCoach.teacher_phone_encrypted
+        ).filter(ExcellentCoach.teacher_phone_hash.in_(batch)).order_by(ExcellentCoach.id.desc()).all()
+        found.update(
+            (row.teacher_phone_hash, (row.id, row.teacher_name, row.teacher_phone_encrypted)) for row in rows
+        )
+    return found
+
+
+def _insert_statement(dialect_name):
+    from models import ExcellentCoach
+
+    table = ExcellentCoach.__table__
+    if dialect_name == 'mysql':
+        from sqlalchemy.dialects.mysql import insert
+        stmt = insert(table)
+        return stmt.on_duplicate_key_update(
+            teacher_name=stmt.inserted.teacher_name,
+            updated_at=stmt.inserted.updated_at
+        )
+    return table.insert()
+
+
+def _write(valid, existing):
+    """按 lookup 结果写入（调用方提交）。返回 (新增数, 更新数)"""
+    from sqlalchemy import update
+    from app import db
+    from field_crypto import encrypt_many, stale_tokens
+    from models import ExcellentCoach
+
+    stale = stale_tokens(found[2] for found in existing.values())
+    updates = []
+    reencrypt = []
+    new_rows = []
+    for h, teacher_name, teacher_phone in valid:
+        found = existing.get(h)
+        if found is None:
+            new_rows.append((h, teacher_name, teacher_phone))
+        elif found[2] in stale or not found[2]:
+            reencrypt.append((found[0], teacher_name, teacher_phone))
+        elif found[1] != teacher_name:
+            updates.append({'id': found[0], 'teacher_name': teacher_name})
+
+    tokens = encrypt_many([phone for _, _, phone in new_rows] + [phone for _, _, phone in reencrypt])
+    updates.extend(
+        {'id': coach_id, 'teacher_name': teacher_name, 'teacher_phone_encrypted': tokens[teacher_phone]}
+        for coach_id, teacher_name, teacher_phone in reencrypt
+    )
+    if updates:
+        db.session.execute(update(ExcellentCoach), updates)
+
+    if new_rows:
+        now = datetime.utcnow()
+        db.session.execute(
+            _insert_statement(db.engine.dialect.name),
+            [{
+                'teacher_name': teacher_name,
+                'teacher_phone_encrypted': tokens[teacher_phone],
+                'teacher_phone_hash': h,
+                'created_at': now,
+                'updated_at': now
+            } for h, teacher_name, teacher_phone in new_rows]
+        )
+    return len(new_rows), len(updates)
+
+
+def upsert_coaches(valid, timer=None):
+    """valid: validate_rows 的结果（电话哈希互不相同）；写入并提交，返回 (新增数, 更新数)"""
+    from sqlalchemy.exc import IntegrityError
+    from app import db
+
+    valid = list(valid)
+    if not valid:
+        return 0, 0
+
+    for attempt in range(MAX_ATTEMPTS):
+        existing = lookup_coaches(h for h, _, _ in valid)
+        if timer:
+            timer.mark('lookup')
+        try:
+            counts = _write(valid, existing)
+            db.session.commit()
+            if timer:
+                timer.mark('write')
+            return counts
+        except IntegrityError:
+            # 并发导入在查询之后插入了同一电话：按最新数据重新查询
+            db.session.rollback()
+            if attempt == MAX_ATTEMPTS - 1:
+                raise
@@ -1,6 +1,14 @@
 #!/usr/bin/env sh
 set -e
 
+# 同一镜像两种角色，均以 exec 成为 PID 1，docker stop 的 SIGTERM 直接送达：
+# - 默认：迁移数据库后启动 gunicorn；
+# - worker：后台批量生成证书任务（/api/certificate/jobs），见 docker-compose.yml 的 certificate-worker 服务。
+#   收到 SIGTERM 后写完当前渲染单元的断点再退出；数据库迁移由 web 服务完成（worker 在 web 健康后才启动）
+if [ "${1:-web}" = "worker" ]; then
+  exec python /app/certificate_worker.py
+fi
+
 python /app/bootstrap_db.py
 
-exec gunicorn -w ${GUNICORN_WORKERS:-2} -b 0.0.0.0:5000 app:app
+exec gunicorn -c /app/gunicorn.conf.py app:app
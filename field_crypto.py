@@ -0,0 +1,210 @@
+"""敏感字段解密服务
+
+Application / ExcellentCoach 的手机号、邮箱以 Fernet 密文入库，每次读属性都要做一次
+HMAC 校验 + AES 解密，失败时还会依次尝试 OLD_ENCRYPTION_KEYS。列表、导出一次读取成千上万行，
+时间主要耗在这里。这里提供：
+
+- 进程内有界 LRU：密文 -> 明文（容量 DECRYPT_CACHE_SIZE，默认 20000）。Fernet 每次加密都带随机 IV，
+  密文本身就能唯一确定明文，不会在不同记录之间串值；所有密钥都解不开的密文也会记住，不再重复尝试旧密钥；
+- 请求内记忆：同一请求里（flask.g）重复读取同一字段不再加锁查 LRU；
+- 批量接口 prefetch(rows)：一次解密多行的全部敏感列，列表/导出在 to_dict 之前调用；
+- encrypt_many(values)：导入时批量加密，新密文直接记入缓存；stale_tokens(tokens) 找出需要换新密钥的密文。
+
+解密失败（任何异常：密钥不符、base64 损坏、非字符串数据等）时 decrypt_field 抛出 InvalidToken，
+与原来属性里 app.decrypt_data 抛异常一样由调用方（to_dict 等）兜底；prefetch 本身不会因个别坏密文失败。
+"""
+import os
+import threading
+from collections import OrderedDict
+
+from flask import g, has_request_context
+
+
+_FAILED = object()
+
+
+class DecryptionCache:
+    """有界 LRU：密文 -> 明文（解密失败记为 _FAILED）"""
+
+    def __init__(self, max_entries=20000):
+        self.max_entries = max(1, int(max_entries))
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get_many(self, tokens):
+        """返回 {密文: 明文或 _FAILED}，只包含命中的项"""
+        found = {}
+        with self._lock:
+            for token in tokens:
+                value = self._entries.get(token)
+                if value is None:
+                    self.misses += 1
+                    continue
+                self._entries.move_to_end(token)
+                self.hits += 1
+                found[token] = value
+        return found
+
+    def put_many(self, values):
+        with self._lock:
+            for token, value in values.items():
+                self._entries[token] = value
+                self._entries.move_to_end(token)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'max_entries': self.max_entries,
+                'hits': self.hits,
+                'misses': self.misses
+            }
+
+
+_DECRYPTION_CACHE = None
+_DECRYPTION_CACHE_LOCK = threading.Lock()
+
+
+def get_decryption_cache():
+    global _DECRYPTION_CACHE
+    cache = _DECRYPTION_CACHE
+    if cache is None:
+        with _DECRYPTION_CACHE_LOCK:
+            if _DECRYPTION_CACHE is None:
+                try:
+                    max_entries = int(str(os.environ.get('DECRYPT_CACHE_SIZE', '') or '20000').strip() or 20000)
+                except Exception:
+                    max_entries = 20000
+                _DECRYPTION_CACHE = DecryptionCache(max_entries=max_entries)
+            cache = _DECRYPTION_CACHE
+    return cache
+
+
+def _request_memo():
+    # 只在请求内记忆：脚本/后台任务可能长时间持有同一个 app context，不能无界增长
+    if not has_request_context():
+        return None
+    memo = getattr(g, '_decrypted_fields', None)
+    if memo is None:
+        memo = {}
+        g._decrypted_fields = memo
+    return memo
+
+
+def _decrypt_uncached(tokens):
+    from app import decrypt_data
+
+    values = {}
+    for token in tokens:
+        try:
+            values[token] = decrypt_data(token)
+        except Exception:
+            # 当前密钥与所有旧密钥都解不开（或密文已损坏）：记住，避免每次都把旧密钥试一遍；
+            # 不向外抛出，一条坏密文不影响同一批的其他行
+            values[token] = _FAILED
+    return values
+
+
+def decrypt_many(tokens):
+    """批量解密：返回 {密文: 明文或 _FAILED}；空值不会出现在结果中"""
+    pending = []
+    seen = set()
+    for token in tokens:
+        if token and token not in seen:
+            seen.add(token)
+            pending.append(token)
+    if not pending:
+        return {}
+
+    memo = _request_memo()
+    values = {}
+    if memo:
+        for token in pending:
+            if token in memo:
+                values[token] = memo[token]
+        pending = [t for t in pending if t not in values]
+
+    if pending:
+        cache = get_decryption_cache()
+        cached = cache.get_many(pending)
+        values.update(cached)
+        missing = [t for t in pending if t not in cached]
+        if missing:
+            decrypted = _decrypt_uncached(missing)
+            cache.put_many(decrypted)
+            values.update(decrypted)
+        if memo is not None:
+            memo.update((t, values[t]) for t in pending)
+    return values
+
+
+def decrypt_field(token):
+    """与 app.decrypt_data 等价，带缓存"""
+    if not token:
+        return None
+    memo = _request_memo()
+    if memo is not None and token in memo:
+        value = memo[token]
+    else:
+        value = decrypt_many([token])[token]
+    if value is _FAILED:
+        from cryptography.fernet import InvalidToken
+        raise InvalidToken
+    return value
+
+
+def encrypt_field(value):
+    """与 app.encrypt_data 等价；新密文直接记入缓存，写入后立刻读取不必再解密"""
+    from app import encrypt_data
+
+    token = encrypt_data(value)
+    if token:
+        get_decryption_cache().put_many({token: value})
+    return token
+
+
+def encrypt_many(values):
+    """批量加密：返回 {明文: 密文}（相同明文只加密一次）；新密文一次性记入缓存"""
+    from app import encrypt_data
+
+    tokens = {}
+    for value in values:
+        if value and value not in tokens:
+            tokens[value] = encrypt_data(value)
+    if tokens:
+        get_decryption_cache().put_many({token: value for value, token in tokens.items()})
+    return tokens
+
+
+def stale_tokens(tokens):
+    """返回不能由当前主密钥验证的密文集合（OLD_ENCRYPTION_KEYS 加密或已损坏），重新导入时据此换成新密钥加密。
+
+    只校验 HMAC 签名，不做解密"""
+    from app import cipher_suite
+
+    stale = set()
+    for token in set(tokens):
+        if not token:
+            continue
+        try:
+            cipher_suite.extract_timestamp(token.encode())
+        except Exception:
+            stale.add(token)
+    return stale
+
+
+def prefetch(rows):
+    """一次解密多行（Application / ExcellentCoach 等声明了 ENCRYPTED_FIELDS 的模型）的全部敏感列"""
+    tokens = []
+    for row in rows or []:
+        for field in getattr(row, 'ENCRYPTED_FIELDS', ()):
+            tokens.append(getattr(row, field, None))
+    return decrypt_many(tokens)
@@ -0,0 +1,68 @@
+"""gunicorn 配置（docker-entrypoint.sh：gunicorn -c gunicorn.conf.py app:app）
+
+- preload_app：master 先导入应用并执行 warmup.warm_up（字体、背景图、证书版式、拼音词典、
+  竞赛规则、模板索引），再 fork worker，只读资源经写时复制在 worker 间共享；
+- 预热完成后 gc.freeze()，避免 worker 的垃圾回收触碰共享对象导致页面被复制；
+- post_fork：丢弃从 master 继承的数据库连接池；
+- 就绪信号：/api/health/ready 在预热完成后返回 200。
+
+环境变量：GUNICORN_WORKERS（默认 2）、GUNICORN_THREADS（默认 1，>1 时使用 gthread）、
+GUNICORN_BIND（默认 0.0.0.0:5000）、GUNICORN_PRELOAD（默认 1，设为 0 时每个 worker 启动后各自预热）。
+"""
+import gc
+import os
+
+
+def _env_int(name, default):
+    try:
+        return int(str(os.environ.get(name, '') or default).strip() or default)
+    except Exception:
+        return default
+
+
+bind = os.environ.get('GUNICORN_BIND', '') or '0.0.0.0:5000'
+workers = max(1, _env_int('GUNICORN_WORKERS', 2))
+threads = max(1, _env_int('GUNICORN_THREADS', 1))
+# CertificateGenerator 无逐次渲染状态，可在 gthread worker 的多个线程间共享
+worker_class = 'gthread' if threads > 1 else 'sync'
+preload_app = str(os.environ.get('GUNICORN_PRELOAD', '1') or '1').strip() != '0'
+
+
+def _warm(log):
+    from app import app
+    from warmup import warm_up
+
+    report = warm_up(app)
+    for name, step in report['steps'].items():
+        if step['ok']:
+            log.info("warmup %s: %.3fs", name, step['seconds'])
+        else:
+            log.warning("warmup %s failed: %s", name, step.get('error'))
+    return app
+
+
+def when_ready(server):
+    if not preload_app:
+        return
+    from warmup import release_db_connections
+
+    app = _warm(server.log)
+    # master 不处理请求：关闭预热时建立的连接，worker 各自建立
+    release_db_connections(app, close=True)
+    gc.freeze()
+    server.log.info("warmup finished, forking workers")
+
+
+def post_fork(server, worker):
+    if not preload_app:
+        return
+    from app import app
+    from warmup import release_db_connections
+
+    release_db_connections(app, close=False)
+
+
+def post_worker_init(worker):
+    if preload_app:
+        return
+    _warm(worker.log)
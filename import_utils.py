@@ -0,0 +1,22 @@
+"""Excel 导入的单元格处理（admin_routes / award_import / coach_import 共用）"""
+
+
+def cell_to_str(value):
+    """单元格值 -> 去空白的字符串；空单元格（NaN/None）为 ''"""
+    import pandas as pd
+
+    try:
+        if pd.isna(value):
+            return ''
+    except Exception:
+        pass
+    return str(value).strip() if value is not None else ''
+
+
+def is_blank_text(s):
+    """空串或 pandas/前端常见的空值字面量（nan / none / null / undefined）"""
+    txt = str(s or '').strip()
+    if not txt:
+        return True
+    low = txt.lower()
+    return low in ['nan', 'none', 'null', 'undefined']
@@ -0,0 +1,292 @@
+"""参赛号导入：集合式匹配与分配
+
+匹配：ApplicationMatcher 先收集整个文件里的报名ID、手机号哈希、(选手姓名, 学校) 组合，
+用几次 IN 查询把候选报名一次取到内存字典里，逐行匹配时不再访问数据库。
+
+分配：applications.match_no 上有唯一索引（uq_applications_match_no），参赛号唯一性由数据库保证。
+导入时先把每行解析出的 (参赛号, 报名ID) 暂存，全部行处理完后：
+
+1. 一次 IN 查询取出这些参赛号当前的持有者及本批次报名当前的参赛号，在内存中按行顺序重放
+   逐行处理时的占用检测（前面的行改号后释放的旧号，后面的行可以使用；两条记录互换参赛号时两行都冲突）；
+2. 同一事务内先清空本批次涉及报名的旧参赛号，再按主键批量写入新参赛号；
+3. 提交时若唯一索引报冲突（另一个导入同时占用了参赛号），回滚后按最新数据重新检测冲突再提交。
+
+字符串比较与原来的 SQL 等值比较一致：内存中按 ColumnCollation 给出的键比较。MySQL 上键由数据库按列的
+排序规则计算（WEIGHT_STRING；PAD SPACE 规则先去掉末尾空格），大小写、末尾空格不同的值与原来一样视为相同；
+其他数据库按原值比较。
+"""
+import re
+import threading
+from datetime import datetime
+
+
+IN_BATCH_SIZE = 1000
+KEY_BATCH_SIZE = 500
+MAX_ATTEMPTS = 3
+
+_COLLATIONS = {}
+_COLLATIONS_LOCK = threading.Lock()
+
+
+def _batches(values, size=IN_BATCH_SIZE):
+    values = list(values)
+    for start in range(0, len(values), size):
+        yield values[start:start + size]
+
+
+class ColumnCollation:
+    """按列的排序规则比较字符串：row_key() 是查询时一并取出的键，keys() 为 Python 中的值计算同样的键，
+    两边的键相等当且仅当数据库中 column = value 成立"""
+
+    def __init__(self, column):
+        from app import db
+
+        self.column = column
+        self.charset, self.collation, self.pad_space = self._load(db.engine, column)
+
+    @staticmethod
+    def _load(engine, column):
+        """(字符集, 排序规则, 是否 PAD SPACE)；非 MySQL 或取不到时为 (None, None, False)，按原值比较"""
+        if engine.dialect.name != 'mysql':
+            return None, None, False
+        table = column.property.columns[0].table.name
+        name = column.property.columns[0].name
+        key = (str(engine.url), table, name)
+        with _COLLATIONS_LOCK:
+            if key in _COLLATIONS:
+                return _COLLATIONS[key]
+        from sqlalchemy import text
+
+        info = (None, None, False)
+        with engine.connect() as conn:
+            row = conn.execute(text(
+                'SELECT CHARACTER_SET_NAME, COLLATION_NAME FROM information_schema.COLUMNS '
+                'WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = :t AND COLUMN_NAME = :c'
+            ), {'t': table, 'c': name}).first()
+            if row and row[0] and row[1] and re.fullmatch(r'\w+', row[0]) and re.fullmatch(r'\w+', row[1]):
+                try:
+                    pad = conn.execute(text(
+                        'SELECT PAD_ATTRIBUTE FROM information_schema.COLLATIONS WHERE COLLATION_NAME = :c'
+                    ), {'c': row[1]}).scalar()
+                except Exception:
+                    # MySQL 5.7 没有 PAD_ATTRIBUTE：全部排序规则都是 PAD SPACE
+                    pad = 'PAD SPACE'
+                info = (row[0], row[1], str(pad or '').upper() == 'PAD SPACE')
+        with _COLLATIONS_LOCK:
+            _COLLATIONS[key] = info
+        return info
+
+    def row_key(self):
+        from sqlalchemy import func
+
+        if not self.collation:
+            return self.column
+        # PAD SPACE：末尾空格不参与比较，两边都先去掉（RTRIM 只去空格，与 rstrip(' ') 一致）
+        return func.weight_string(func.rtrim(self.column) if self.pad_space else self.column)
+
+    def keys(self, values):
+        """{值: 键}"""
+        values = sorted(set(values))
+        if not self.collation:
+            return {v: v for v in values}
+        from sqlalchemy import text
+        from app import db
+
+        found = {}
+        for batch in _batches(values, KEY_BATCH_SIZE):
+            parts = []
+            params = {}
+            for i, value in enumerate(batch):
+                parts.append(
+                    f'SELECT {i} AS k, WEIGHT_STRING(CONVERT(:v{i} USING {self.charset}) COLLATE {self.collation}) AS w'
+                )
+                params[f'v{i}'] = value.rstrip(' ') if self.pad_space else value
+            for row in db.session.execute(text(' UNION ALL '.join(parts)), params):
+                found[batch[row.k]] = row.w
+        return found
+
+
+def _newest(rows):
+    """同一键命中多条时取最新创建的一条（与原 order_by(created_at.desc()).first() 一致）"""
+    return max(rows, key=lambda r: (r.created_at or datetime.min, r.id))
+
+
+class ApplicationMatcher:
+    """按报名ID / 手机号哈希 / (选手姓名, 学校名称) 匹配报名；构造时批量取回全部候选。
+
+    返回的是只含 id、status、created_at 的轻量行，匹配后只需要这些字段"""
+
+    def __init__(self, ids=(), phone_hashes=(), name_school_pairs=()):
+        self._by_id = {}
+        self._by_phone_hash = {}
+        self._by_name_school = {}
+        self._name_keys = {}
+        self._school_keys = {}
+        self._load_ids(set(ids))
+        self._load_phone_hashes(set(phone_hashes))
+        self._load_name_school(set(name_school_pairs))
+
+    def _load_ids(self, ids):
+        from models import Application
+
+        for batch in _batches(ids):
+            rows = Application.query.with_entities(
+                Application.id, Application.status, Application.created_at
+            ).filter(Application.id.in_(batch)).all()
+            self._by_id.update((row.id, row) for row in rows)
+
+    def _load_phone_hashes(self, phone_hashes):
+        from models import Application
+
+        grouped = {}
+        for batch in _batches(phone_hashes):
+            rows = Application.query.with_entities(
+                Application.id, Application.status, Application.created_at, Application.contact_phone_hash
+            ).filter(Application.contact_phone_hash.in_(batch)).all()
+            for row in rows:
+                grouped.setdefault(row.contact_phone_hash, []).append(row)
+        self._by_phone_hash = {key: _newest(rows) for key, rows in grouped.items()}
+
+    def _load_name_school(self, pairs):
+        from models import Application, ApplicationParticipant
+
+        if not pairs:
+            return
+        names = sorted({name for name, _ in pairs})
+        name_collation = ColumnCollation(ApplicationParticipant.participant_name)
+        school_collation = ColumnCollation(Application.school_name)
+        self._name_keys = name_collation.keys(names)
+        self._school_keys = school_collation.keys(school for _, school in pairs)
+        wanted = {(self._name_keys[name], self._school_keys[school]) for name, school in pairs}
+
+        # IN 按列的排序规则比较，取回的候选与原等值查询一致；再按键分组
+        grouped = {}
+        for batch in _batches(names):
+            rows = ApplicationParticipant.query.join(Application).with_entities(
+                Application.id, Application.status, Application.created_at,
+                name_collation.row_key().label('name_key'), school_collation.row_key().label('school_key')
+            ).filter(ApplicationParticipant.participant_name.in_(batch)).all()
+            for row in rows:
+                key = (row.name_key, row.school_key)
+                if key in wanted:
+                    grouped.setdefault(key, []).append(row)
+        self._by_name_school = {key: _newest(rows) for key, rows in grouped.items()}
+
+    def by_id(self, application_id):
+        return self._by_id.get(application_id)
+
+    def by_phone_hash(self, phone_hash):
+        return self._by_phone_hash.get(phone_hash)
+
+    def by_name_school(self, participant_name, school_name):
+        key = (self._name_keys.get(participant_name), self._school_keys.get(school_name))
+        return self._by_name_school.get(key)
+
+
+def _current_holders(keys, collation):
+    """keys: {参赛号: 键}；返回 {键: 当前持有的报名ID}"""
+    from models import Application
+
+    holders = {}
+    for batch in _batches(keys):
+        rows = Application.query.with_entities(Application.id, collation.row_key().label('key')).filter(
+            Application.match_no.in_(batch)
+        ).all()
+        holders.update((row.key, row.id) for row in rows)
+    return holders
+
+
+def _current_numbers(application_ids, collation):
+    """{报名ID: 当前参赛号的键}（没有参赛号的报名不出现）"""
+    from models import Application
+
+    numbers = {}
+    for batch in _batches(set(application_ids)):
+        rows = Application.query.with_entities(Application.id, collation.row_key().label('key')).filter(
+            Application.id.in_(batch), Application.match_no.isnot(None)
+        ).all()
+        numbers.update((row.id, row.key) for row in rows)
+    return numbers
+
+
+def find_conflicts(assignments, holders, numbers, keys=None):
+    """按行顺序重放逐行处理时的占用检测，返回 (final, conflicts)。
+
+    :param assignments: [(参赛号, 报名ID)]，按文件行顺序
+    :param holders: {键: 当前持有的报名ID}
+    :param numbers: {报名ID: 当前参赛号的键}
+    :param keys: {参赛号: 键}，默认按原值比较
+    :return: ({报名ID: 最终写入的参赛号}, {参赛号: 占用者报名ID})
+
+    参赛号被其他报名持有即冲突；成功的行把该报名原来的参赛号释放给后面的行"""
+    keys = keys or {}
+    holders = dict(holders)
+    numbers = dict(numbers)
+    final = {}
+    conflicts = {}
+    for match_no, application_id in assignments:
+        key = keys.get(match_no, match_no)
+        holder = holders.get(key)
+        if holder is not None and holder != application_id:
+            conflicts[match_no] = holder
+            continue
+        previous = numbers.get(application_id)
+        if previous is not None and holders.get(previous) == application_id:
+            del holders[previous]
+        holders[key] = application_id
+        numbers[application_id] = key
+        final[application_id] = match_no
+    return final, conflicts
+
+
+def _apply(final):
+    """final: {报名ID: 参赛号}；清空旧号后按主键批量写入（调用方提交）"""
+    from sqlalchemy import update
+    from app import db
+    from models import Application
+
+    ids = list(final)
+    for batch in _batches(ids):
+        db.session.execute(
+            update(Application).where(Application.id.in_(batch), Application.match_no.isnot(None)).values(match_no=None),
+            execution_options={'synchronize_session': False}
+        )
+    db.session.execute(
+        update(Application),
+        [{'id': application_id, 'match_no': match_no} for application_id, match_no in final.items()]
+    )
+
+
+def assign_match_nos(assignments):
+    """按行顺序写入参赛号并提交。assignments: [(参赛号, 报名ID)]，参赛号互不相同。
+
+    返回 {参赛号: 占用者报名ID}（冲突未写入的参赛号；占用者未知时为 None）"""
+    from sqlalchemy.exc import IntegrityError
+    from app import db
+    from models import Application
+
+    assignments = list(assignments)
+    if not assignments:
+        return {}
+
+    collation = ColumnCollation(Application.match_no)
+    keys = collation.keys(m for m, _ in assignments)
+    conflicts = {}
+    for attempt in range(MAX_ATTEMPTS):
+        holders = _current_holders(keys, collation)
+        numbers = _current_numbers((a for _, a in assignments), collation)
+        final, conflicts = find_conflicts(assignments, holders, numbers, keys)
+        if not final:
+            return conflicts
+        try:
+            _apply(final)
+            db.session.commit()
+            return conflicts
+        except IntegrityError:
+            # 并发导入在检测之后占用了参赛号：按最新数据重新检测
+            db.session.rollback()
+
+    # 多次重试仍冲突：本批次剩余参赛号全部按冲突报告，不写入
+    for match_no, _ in assignments:
+        conflicts.setdefault(match_no, None)
+    return conflicts
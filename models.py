@@ -1,5 +1,22 @@
 from datetime import datetime
+from sqlalchemy import event
+from sqlalchemy.orm import validates
 from app import db
+from field_crypto import decrypt_field, encrypt_field
+
+
+def compute_school_initial(name):
+    """学校名称的拼音首字母（大写），如“北京一中” -> “BJYZ”；pypinyin 不可用时返回 None（留待回填）"""
+    s = str(name or '').strip()
+    if not s:
+        return ''
+    try:
+        from pypinyin import lazy_pinyin, Style
+        letters = lazy_pinyin(s, style=Style.FIRST_LETTER)
+    except Exception:
+        return None
+    return ''.join([str(x or '') for x in letters]).upper()[:100]
+
 
 class Application(db.Model):
     __tablename__ = 'applications'
@@ -15,10 +32,12 @@ class Application(db.Model):
     participant_count = db.Column(db.Integer, nullable=False)
     
     # 学校信息
-    school_name = db.Column(db.String(100), nullable=False)
+    school_name = db.Column(db.String(100), nullable=False, index=True)
     school_region = db.Column(db.String(100))  # 省/自治区/直辖市
     school_city = db.Column(db.String(100))  # 市
     school_district = db.Column(db.String(100))  # 区县
+    # 学校名称拼音首字母（写入 school_name 时自动计算，用于按首字母前缀筛选）
+    school_initial = db.Column(db.String(100), index=True)
 
     # 指导老师信息
     teacher_name = db.Column(db.String(50))
@@ -62,28 +81,62 @@ class Application(db.Model):
     
     # 关联的选手
     participants = db.relationship('ApplicationParticipant', backref='application', lazy=True, cascade='all, delete-orphan')
+
+    # 按热点查询设计的组合索引（已有库由 bootstrap_db 补建；python check_query_plans.py 校验执行计划）
+    __table_args__ = (
+        # 参赛号唯一（导入时由数据库保证，见 match_no_import）；同时服务按参赛号的查询
+        # （by-match-no、my-applications、import_awards）。NULL 不参与唯一性比较
+        db.Index('uq_applications_match_no', 'match_no', unique=True),
+        # 列表按状态过滤并按创建时间倒序（管理端列表/导出、get_applications）
+        db.Index('ix_applications_status_created', 'status', 'created_at'),
+        # 列表按大类/学段过滤并按创建时间倒序
+        db.Index('ix_applications_category_level_created', 'category', 'education_level', 'created_at'),
+        # 不带过滤条件的列表分页
+        db.Index('ix_applications_created_at', 'created_at'),
+        # 优秀辅导员查询：姓名 + 电话哈希 + 已获奖，取最新一条
+        db.Index('ix_applications_teacher_award', 'teacher_name', 'teacher_phone_hash', 'award_level', 'created_at'),
+    )
+
+    @validates('school_name')
+    def _sync_school_initial(self, key, value):
+        self.school_initial = compute_school_initial(value)
+        return value
+
+    @classmethod
+    def school_initial_prefix(cls, prefix):
+        """school_initial 以 prefix 开头的过滤条件。写成范围比较而不是 LIKE：
+        SQLite 默认大小写不敏感的 LIKE 用不上索引，范围比较在各数据库上都是索引查找"""
+        prefix = str(prefix or '').upper()
+        upper = prefix[:-1] + chr(ord(prefix[-1]) + 1)
+        return db.and_(cls.school_initial >= prefix, cls.school_initial < upper)
+
+    # 以 Fernet 密文存储的列（field_crypto.prefetch 按此批量解密）
+    ENCRYPTED_FIELDS = (
+        'contact_phone_encrypted',
+        'contact_email_encrypted',
+        'teacher_phone_encrypted',
+        'leader_phone_encrypted',
+        'participant_phone_encrypted',
+        'participant_email_encrypted',
+    )
     
     @property
     def contact_phone(self):
-        from app import decrypt_data
-        return decrypt_data(self.contact_phone_encrypted)
+        return decrypt_field(self.contact_phone_encrypted)
     
     @contact_phone.setter
     def contact_phone(self, value):
-        from app import encrypt_data
         import hashlib
-        self.contact_phone_encrypted = encrypt_data(value)
+        self.contact_phone_encrypted = encrypt_field(value)
         self.contact_phone_hash = hashlib.sha256(value.encode()).hexdigest()
     
     @property
     def contact_email(self):
-        from app import decrypt_data
-        return decrypt_data(self.contact_email_encrypted)
+        return decrypt_field(self.contact_email_encrypted)
     
     @contact_email.setter
     def contact_email(self, value):
-        from app import encrypt_data
-        self.contact_email_encrypted = encrypt_data(value)
+        self.contact_email_encrypted = encrypt_field(value)
     
     @property
     def contact_phone_masked(self):
@@ -97,14 +150,12 @@ class Application(db.Model):
 
     @property
     def teacher_phone(self):
-        from app import decrypt_data
-        return decrypt_data(self.teacher_phone_encrypted)
+        return decrypt_field(self.teacher_phone_encrypted)
 
     @teacher_phone.setter
     def teacher_phone(self, value):
-        from app import encrypt_data
         import hashlib
-        self.teacher_phone_encrypted = encrypt_data(value)
+        self.teacher_phone_encrypted = encrypt_field(value)
         try:
             v = str(value or '').strip()
             self.teacher_phone_hash = hashlib.sha256(v.encode()).hexdigest() if v else None
@@ -113,33 +164,27 @@ class Application(db.Model):
 
     @property
     def leader_phone(self):
-        from app import decrypt_data
-        return decrypt_data(self.leader_phone_encrypted)
+        return decrypt_field(self.leader_phone_encrypted)
 
     @leader_phone.setter
     def leader_phone(self, value):
-        from app import encrypt_data
-        self.leader_phone_encrypted = encrypt_data(value)
+        self.leader_phone_encrypted = encrypt_field(value)
 
     @property
     def participant_phone(self):
-        from app import decrypt_data
-        return decrypt_data(self.participant_phone_encrypted)
+        return decrypt_field(self.participant_phone_encrypted)
 
     @participant_phone.setter
     def participant_phone(self, value):
-        from app import encrypt_data
-        self.participant_phone_encrypted = encrypt_data(value)
+        self.participant_phone_encrypted = encrypt_field(value)
 
     @property
     def participant_email(self):
-        from app import decrypt_data
-        return decrypt_data(self.participant_email_encrypted)
+        return decrypt_field(self.participant_email_encrypted)
 
     @participant_email.setter
     def participant_email(self, value):
-        from app import encrypt_data
-        self.participant_email_encrypted = encrypt_data(value)
+        self.participant_email_encrypted = encrypt_field(value)
 
     @property
     def teacher_phone_masked(self):
@@ -226,8 +271,11 @@ class ApplicationParticipant(db.Model):
     seq_no = db.Column(db.Integer, nullable=False)  # 顺序号，用于区分选手
     participant_name = db.Column(db.String(50), nullable=False)
     
-    # 确保同一申请中的序号唯一
-    __table_args__ = (db.UniqueConstraint('application_id', 'seq_no'),)
+    # 确保同一申请中的序号唯一（同时作为 application_id 的索引）；按选手姓名匹配报名（导入参赛号）
+    __table_args__ = (
+        db.UniqueConstraint('application_id', 'seq_no'),
+        db.Index('ix_application_participants_name', 'participant_name', 'application_id'),
+    )
     
     def to_dict(self):
         return {
@@ -236,6 +284,31 @@ class ApplicationParticipant(db.Model):
             'participant_name': self.participant_name
         }
 
+class SchoolNameToken(db.Model):
+    """学校名称 2-gram 倒排表（按不重复的学校名称建立）：非 MySQL 数据库上 school_name 模糊搜索的索引，
+    先由 2-gram 找到候选学校名称，再按 applications.school_name 索引取报名（见 school_search）"""
+    __tablename__ = 'school_name_tokens'
+
+    token = db.Column(db.String(8), primary_key=True)
+    school_name = db.Column(db.String(100), primary_key=True, index=True)
+
+
+@event.listens_for(Application, 'after_insert')
+def _insert_school_tokens(mapper, connection, target):
+    from school_search import maintains_tokens, register_school_name
+    if maintains_tokens(connection.dialect.name):
+        register_school_name(connection, target.school_name)
+
+
+@event.listens_for(Application, 'after_update')
+def _update_school_tokens(mapper, connection, target):
+    from school_search import maintains_tokens, register_school_name
+    if not maintains_tokens(connection.dialect.name):
+        return
+    if db.inspect(target).attrs.school_name.history.has_changes():
+        register_school_name(connection, target.school_name)
+
+
 class CertificateTemplate(db.Model):
     __tablename__ = 'certificate_templates'
     
@@ -284,30 +357,98 @@ class ImportLog(db.Model):
         }
 
 
+class CertificateJob(db.Model):
+    """后台批量生成证书任务（由 certificate_worker.py 处理）"""
+    __tablename__ = 'certificate_jobs'
+
+    id = db.Column(db.Integer, primary_key=True)
+    status = db.Column(db.String(20), default='pending', index=True)  # pending, running, completed, failed
+    output_mode = db.Column(db.String(20), default='zip')
+    pages_per_file = db.Column(db.Integer, default=0)
+
+    # 提交时匹配到的已获奖报名ID（JSON 列表，按此顺序渲染）
+    application_ids = db.Column(db.Text, nullable=False)
+    total_requested = db.Column(db.Integer, default=0)
+
+    total_count = db.Column(db.Integer, default=0)
+    done_count = db.Column(db.Integer, default=0)
+    success_count = db.Column(db.Integer, default=0)
+    errors = db.Column(db.Text)  # JSON 列表
+
+    # 断点：已完成的渲染单元数（zip 模式为报名记录，merged 模式为分卷）
+    checkpoint = db.Column(db.Integer, default=0)
+    worker_id = db.Column(db.String(100))
+    heartbeat_at = db.Column(db.DateTime)
+
+    artifact_path = db.Column(db.String(500))
+    message = db.Column(db.Text)
+
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    started_at = db.Column(db.DateTime)
+    finished_at = db.Column(db.DateTime)
+
+    def get_application_ids(self):
+        import json
+        return json.loads(self.application_ids or '[]')
+
+    def get_errors(self):
+        import json
+        return json.loads(self.errors or '[]')
+
+    def set_errors(self, errors):
+        import json
+        self.errors = json.dumps(errors or [], ensure_ascii=False)
+
+    def to_dict(self):
+        errors = self.get_errors()
+        return {
+            'id': self.id,
+            'status': self.status,
+            'output_mode': self.output_mode,
+            'pages_per_file': self.pages_per_file,
+            'total_requested': self.total_requested,
+            'total_count': self.total_count,
+            'done_count': self.done_count,
+            'success_count': self.success_count,
+            'error_count': len(errors),
+            'errors': errors,
+            'download_available': self.status == 'completed' and bool(self.artifact_path),
+            'message': self.message,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'started_at': self.started_at.isoformat() if self.started_at else None,
+            'finished_at': self.finished_at.isoformat() if self.finished_at else None
+        }
+
+
 class ExcellentCoach(db.Model):
     __tablename__ = 'excellent_coaches'
 
     id = db.Column(db.Integer, primary_key=True)
     teacher_name = db.Column(db.String(50), nullable=False)
     teacher_phone_encrypted = db.Column(db.Text, nullable=False)
-    teacher_phone_hash = db.Column(db.String(64), nullable=False, index=True)
+    teacher_phone_hash = db.Column(db.String(64), nullable=False)
 
     remark = db.Column(db.String(200))
 
+    ENCRYPTED_FIELDS = ('teacher_phone_encrypted',)
+
+    __table_args__ = (
+        # 同一电话只有一条优秀辅导员记录；导入按电话哈希批量 upsert（见 coach_import）
+        db.Index('uq_excellent_coaches_phone_hash', 'teacher_phone_hash', unique=True),
+    )
+
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
     @property
     def teacher_phone(self):
-        from app import decrypt_data
-        return decrypt_data(self.teacher_phone_encrypted)
+        return decrypt_field(self.teacher_phone_encrypted)
 
     @teacher_phone.setter
     def teacher_phone(self, value):
-        from app import encrypt_data
         import hashlib
         v = str(value or '').strip()
-        self.teacher_phone_encrypted = encrypt_data(v)
+        self.teacher_phone_encrypted = encrypt_field(v)
         self.teacher_phone_hash = hashlib.sha256(v.encode()).hexdigest() if v else ''
 
     def to_dict(self, include_sensitive=False):
@@ -0,0 +1,15 @@
+"""导入接口的分阶段计时（award_import / coach_import 共用）"""
+import time
+
+
+class PhaseTimer:
+    """按顺序记录各阶段耗时（秒）"""
+
+    def __init__(self):
+        self.timings = {}
+        self._last = time.perf_counter()
+
+    def mark(self, phase):
+        now = time.perf_counter()
+        self.timings[phase] = round(self.timings.get(phase, 0) + now - self._last, 3)
+        self._last = now
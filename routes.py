@@ -9,6 +9,18 @@ from admin_auth import require_admin
 api_bp = Blueprint('api', __name__)
 
 
+@api_bp.route('/api/health/ready', methods=['GET'])
+def health_ready():
+    """就绪检查：进程预热完成后返回 200，否则 503（见 warmup.py / gunicorn.conf.py）"""
+    from warmup import state
+
+    data = state()
+    return jsonify({
+        'success': data['ready'],
+        'data': data
+    }), 200 if data['ready'] else 503
+
+
 @api_bp.route('/api/user/me', methods=['GET'])
 @require_user()
 def user_me():
@@ -186,6 +198,8 @@ def query_excellent_coach():
                 Application.teacher_name == teacher_name,
                 Application.award_level.isnot(None)
             ).order_by(Application.created_at.desc()).limit(50).all()
+            from field_crypto import prefetch
+            prefetch(candidates)
             for c in candidates:
                 try:
                     if str(getattr(c, 'teacher_phone', '') or '').strip() == teacher_phone:
@@ -555,13 +569,16 @@ def get_applications():
     try:
         from app import app, db
         from models import Application
+        from sqlalchemy.orm import selectinload
+        from field_crypto import prefetch
         
         with app.app_context():
             page = request.args.get('page', 1, type=int)
             per_page = request.args.get('per_page', 20, type=int)
             status = request.args.get('status')
             
-            query = Application.query
+            # participants 按页批量加载（selectin），避免 to_dict 每行一次查询
+            query = Application.query.options(selectinload(Application.participants))
             
             if status:
                 query = query.filter(Application.status == status)
@@ -569,6 +586,7 @@ def get_applications():
             applications = query.order_by(Application.created_at.desc()).paginate(
                 page=page, per_page=per_page, error_out=False
             )
+            prefetch(applications.items)
             
             return jsonify({
                 'success': True,
@@ -621,6 +639,8 @@ def get_applications_by_phone():
         from app import app
         import hashlib
         from models import Application
+        from sqlalchemy.orm import selectinload
+        from field_crypto import prefetch
 
         with app.app_context():
             phone = str(request.args.get('phone', '') or '').strip()
@@ -631,10 +651,11 @@ def get_applications_by_phone():
             openid = str(payload.get('openid', '') or '').strip()
 
             phone_hash = hashlib.sha256(phone.encode()).hexdigest()
-            applications = Application.query.filter(
+            applications = Application.query.options(selectinload(Application.participants)).filter(
                 Application.contact_phone_hash == phone_hash,
                 Application.openid == openid
             ).order_by(Application.created_at.desc()).all()
+            prefetch(applications)
 
             return jsonify({'success': True, 'data': [a.to_dict() for a in applications]})
     except Exception as e:
@@ -647,6 +668,8 @@ def get_my_applications():
     try:
         from app import app, db
         from models import Application
+        from sqlalchemy.orm import selectinload
+        from field_crypto import prefetch
         
         with app.app_context():
             match_no = request.args.get('match_no')
@@ -658,10 +681,11 @@ def get_my_applications():
 
             match_no = str(match_no).strip()
 
-            applications = Application.query.filter(
+            applications = Application.query.options(selectinload(Application.participants)).filter(
                 Application.match_no == match_no,
                 Application.award_level.isnot(None)
             ).order_by(Application.created_at.desc()).all()
+            prefetch(applications)
             
             return jsonify({
                 'success': True,
@@ -0,0 +1,107 @@
+"""学校名称模糊搜索
+
+管理端列表/导出按学校名称筛选原来是 school_name LIKE '%关键词%'，前导通配符用不上索引，
+每次都要全表扫描；中文学校名几乎总是按中间的片段搜索（“海淀”“实验”）。这里按 2-gram 建索引：
+
+- MySQL：applications.school_name 上的 FULLTEXT 索引（WITH PARSER ngram，ngram_token_size 默认为 2），
+  以短语方式 MATCH ... AGAINST('"关键词"' IN BOOLEAN MODE) 检索；
+- 其他数据库（SQLite 测试库等）：school_name_tokens 倒排表（2-gram -> 学校名称），按不重复的学校名称建立，
+  比按报名建立小得多（“学校”“中学”这类高频 2-gram 不会对应几万条记录）；先由 2-gram 找到候选学校名称，
+  再经 applications.school_name 索引取报名。由 models 中 Application 的 insert/update 事件维护。
+
+索引只用来缩小候选集，结果仍与原 LIKE 条件取交集，命中结果与原来完全一致。
+单字、含 LIKE 通配符的关键词，以及 MySQL 上含 ASCII/空白字符的关键词
+（ngram 解析器会丢弃含英文停用词的词元、跳过空白）仍走原 LIKE。
+索引与存量数据回填由 bootstrap_db 完成。
+"""
+import threading
+
+
+NGRAM_SIZE = 2
+FULLTEXT_INDEX_NAME = 'ft_applications_school_name'
+
+_FULLTEXT_STATE = {}
+_FULLTEXT_LOCK = threading.Lock()
+
+
+def _normalize(text):
+    return str(text or '').strip().lower()
+
+
+def school_name_ngrams(name):
+    """学校名称的 2-gram 集合（小写）；不足两个字符时返回空集合"""
+    s = _normalize(name)
+    return {s[i:i + NGRAM_SIZE] for i in range(len(s) - NGRAM_SIZE + 1)}
+
+
+def uses_fulltext(engine):
+    """MySQL 且已建好 ngram FULLTEXT 索引时返回 True（按引擎缓存，避免每次请求都查询元数据）"""
+    if engine.dialect.name != 'mysql':
+        return False
+    key = str(engine.url)
+    with _FULLTEXT_LOCK:
+        if key in _FULLTEXT_STATE:
+            return _FULLTEXT_STATE[key]
+    from sqlalchemy import inspect
+    try:
+        indexes = inspect(engine).get_indexes('applications')
+        found = any(i.get('name') == FULLTEXT_INDEX_NAME for i in indexes)
+    except Exception:
+        found = False
+    with _FULLTEXT_LOCK:
+        _FULLTEXT_STATE[key] = found
+    return found
+
+
+def maintains_tokens(dialect_name):
+    """倒排表只在非 MySQL 数据库上维护"""
+    return dialect_name != 'mysql'
+
+
+def school_name_filter(term):
+    """school_name 包含 term 的过滤条件（与原 LIKE '%term%' 结果一致）"""
+    from sqlalchemy import and_, func, select
+    from app import db
+    from models import Application, SchoolNameToken
+
+    term = str(term or '').strip()
+    like = Application.school_name.like(f"%{term}%")
+    if len(term) < NGRAM_SIZE or '%' in term or '_' in term:
+        return like
+
+    if uses_fulltext(db.engine):
+        if any(ord(ch) < 128 or ch.isspace() for ch in term):
+            return like
+        from sqlalchemy.dialects.mysql import match
+        return and_(match(Application.school_name, against=f'"{term}"').in_boolean_mode(), like)
+
+    if db.engine.dialect.name == 'mysql':
+        return like
+
+    grams = sorted(school_name_ngrams(term))
+    candidates = select(SchoolNameToken.school_name).where(
+        SchoolNameToken.token.in_(grams)
+    ).group_by(SchoolNameToken.school_name).having(func.count() == len(grams))
+    return and_(Application.school_name.in_(candidates), like)
+
+
+def register_school_name(connection, school_name):
+    """为新出现的学校名称写入 2-gram（已登记过的名称直接返回）；已删除报名的学校名称不清理，
+    只会多出一个没有报名的候选名称，不影响结果"""
+    from sqlalchemy import select
+    from models import SchoolNameToken
+
+    name = str(school_name or '')
+    grams = sorted(school_name_ngrams(name))
+    if not grams:
+        return
+    table = SchoolNameToken.__table__
+    exists = connection.execute(
+        select(table.c.token).where(table.c.token == grams[0], table.c.school_name == name).limit(1)
+    ).first()
+    if exists:
+        return
+    connection.execute(
+        table.insert().prefix_with('OR IGNORE', dialect='sqlite'),
+        [{'token': g, 'school_name': name} for g in grams]
+    )
@@ -0,0 +1,106 @@
+"""CertificateGenerator 并发压力测试
+
+用一个共享的 CertificateGenerator 实例，在线程池中并发渲染各类模板 × 各类报名记录
+（含合并多页 PDF），逐字节对比串行渲染的结果。任何差异或异常都会以非零退出码结束。
+
+    python stress_certificate_generator.py
+    python stress_certificate_generator.py --threads 16 --rounds 20
+
+reportlab 的 invariant 模式会固定 PDF 中的创建时间与文档 ID，使相同输入得到相同字节。
+"""
+from __future__ import annotations
+
+import argparse
+import hashlib
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from reportlab import rl_config
+from reportlab.lib.pagesizes import A4
+
+from benchmark_certificate_render import APPLICATIONS, template_shapes
+from certificate_generator import CertificateGenerator
+
+
+def _digest(content: bytes) -> str:
+    return hashlib.sha256(content).hexdigest()
+
+
+def stress_shapes(gen: CertificateGenerator) -> dict:
+    """基准测试的模板 + 按背景图尺寸绘制调试网格的模板（网格范围取决于当前页面尺寸）"""
+    shapes = template_shapes(gen)
+    debug_overlay = dict(shapes["background_size"])
+    debug_overlay.update({
+        "debug_grid": {"step_px": 50},
+        "debug_canvas_grid": {"step": 10},
+    })
+    shapes["debug_overlay"] = debug_overlay
+    return shapes
+
+
+def build_tasks(shapes: dict) -> list[tuple[str, object]]:
+    """(任务名, 渲染参数)：每个 模板×记录 的单张证书 + 一份包含全部组合的合并文档"""
+    tasks = []
+    for shape_name in shapes:
+        for app_name in APPLICATIONS:
+            tasks.append((f"single/{shape_name}/{app_name}", ("single", shape_name, app_name)))
+    tasks.append(("merged/all", ("merged", None, None)))
+    return tasks
+
+
+def render(gen: CertificateGenerator, shapes: dict, spec: tuple) -> bytes:
+    kind, shape_name, app_name = spec
+    if kind == "single":
+        return gen.generate_certificate(APPLICATIONS[app_name], shapes[shape_name])
+    pages = [(application, config) for config in shapes.values() for application in APPLICATIONS.values()]
+    return gen.generate_certificates_document(pages)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="CertificateGenerator 并发压力测试")
+    parser.add_argument("--threads", type=int, default=8, help="线程数")
+    parser.add_argument("--rounds", type=int, default=5, help="每个任务重复的次数")
+    args = parser.parse_args()
+
+    rl_config.invariant = 1
+
+    gen = CertificateGenerator()
+    shapes = stress_shapes(gen)
+    tasks = build_tasks(shapes)
+
+    t0 = time.perf_counter()
+    expected = {name: _digest(render(gen, shapes, spec)) for name, spec in tasks}
+    serial_s = time.perf_counter() - t0
+
+    # 打乱顺序，让不同页面尺寸/模板的渲染交错进行
+    work = [task for _ in range(args.rounds) for task in tasks]
+    work = work[::2] + work[1::2]
+
+    def _run(task):
+        name, spec = task
+        try:
+            return name, _digest(render(gen, shapes, spec)), None
+        except Exception as e:
+            return name, None, repr(e)
+
+    t0 = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.threads) as pool:
+        results = list(pool.map(_run, work))
+    concurrent_s = time.perf_counter() - t0
+
+    failures = [(name, err or "输出与串行渲染不一致") for name, digest, err in results if err or digest != expected[name]]
+    print(
+        f"renders={len(results)} threads={args.threads} "
+        f"serial_one_pass={serial_s:.2f}s concurrent={concurrent_s:.2f}s mismatches={len(failures)}"
+    )
+    for name, reason in failures[:20]:
+        print(f"  {name}: {reason}")
+    if (gen.page_width, gen.page_height) != A4:
+        print("  生成器的默认页面尺寸被渲染修改")
+        return 1
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,144 @@
+"""证书文字度量
+
+reportlab 对所有字体的宽度计算都是 0.001 * 字号 * Σ字形宽度（1/1000 em），且不做字距调整。
+因此：
+- 每个字体维护一张字形宽度表，新字符串的宽度只是查表求和；
+- 按 (text, font) 缓存字形宽度之和，任意字号的宽度都由它直接算出（结果与 stringWidth 完全一致），
+  同一学校名/获奖等级在批量中反复出现时，对齐与折行几乎不再有计算开销；
+- 放得下的最大字号也可直接求出，不需要为每个候选字号创建 Canvas。
+"""
+import math
+import threading
+from collections import OrderedDict
+
+from reportlab.pdfbase import pdfmetrics
+from reportlab.pdfbase.cidfonts import UnicodeCIDFont
+from reportlab.pdfbase.ttfonts import TTFont
+
+
+def _is_type1(font_name):
+    try:
+        font = pdfmetrics.getFont(font_name)
+    except Exception:
+        return False
+    return not isinstance(font, (TTFont, UnicodeCIDFont))
+
+
+class TextMetrics:
+    """字形宽度表 + 按 (text, font) 缓存宽度的有界 LRU，进程内共享"""
+
+    def __init__(self, max_entries=16384):
+        self.max_entries = max(1, int(max_entries))
+        self._text_units = OrderedDict()
+        self._glyph_tables = {}
+        self._type1_fonts = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def glyph_advances(self, font_name):
+        """font_name 的字形宽度表 {字符: 宽度(1/1000 em)}，按需填充"""
+        table = self._glyph_tables.get(font_name)
+        if table is None:
+            with self._lock:
+                table = self._glyph_tables.setdefault(font_name, {})
+                if font_name not in self._type1_fonts:
+                    self._type1_fonts[font_name] = _is_type1(font_name)
+        return table
+
+    def _measure_units(self, text, font_name):
+        table = self.glyph_advances(font_name)
+        total = 0
+        for ch in text:
+            advance = table.get(ch)
+            if advance is None:
+                # 字号取 1000 时 stringWidth 恰好返回字形宽度本身
+                advance = pdfmetrics.stringWidth(ch, font_name, 1000.0)
+                table[ch] = advance
+            total += advance
+        return total
+
+    def text_units(self, text, font_name):
+        """text 的字形宽度之和（1/1000 em）"""
+        key = (text, font_name)
+        with self._lock:
+            units = self._text_units.get(key)
+            if units is not None:
+                self._text_units.move_to_end(key)
+                self.hits += 1
+                return units
+            self.misses += 1
+
+        units = self._measure_units(text, font_name)
+        with self._lock:
+            self._text_units[key] = units
+            while len(self._text_units) > self.max_entries:
+                self._text_units.popitem(last=False)
+        return units
+
+    def unit_width(self, text, font_name):
+        """text 在 1pt 字号下的宽度"""
+        return 0.001 * self.text_units(text, font_name)
+
+    def string_width(self, text, font_name, font_size):
+        """等价于 pdfmetrics.stringWidth(text, font_name, font_size)"""
+        units = self.text_units(text, font_name)
+        if self._type1_fonts.get(font_name):
+            # 与 reportlab 的乘法顺序保持一致，结果逐位相同
+            return units * 0.001 * float(font_size)
+        return 0.001 * float(font_size) * units
+
+    def fit_font_size(self, text, max_width, max_font_size=24, min_font_size=8, font_name=None):
+        """在 [min_font_size, max_font_size] 内取能放进 max_width 的最大整数字号；
+        最小字号仍放不下时返回最小字号（与原逐个字号试探的结果一致）"""
+        max_font_size = int(max_font_size)
+        min_font_size = int(min_font_size)
+        if not text:
+            return max_font_size
+        if max_font_size < min_font_size:
+            return min_font_size
+
+        unit = self.unit_width(text, font_name)
+        if unit <= 0:
+            return max_font_size
+
+        size = min(max_font_size, int(math.floor(float(max_width) / unit)))
+        # 浮点误差兜底：按 stringWidth 的算法复核，保证结果与逐个字号试探一致
+        while size < max_font_size and self.string_width(text, font_name, size + 1) <= max_width:
+            size += 1
+        while size >= min_font_size and self.string_width(text, font_name, size) > max_width:
+            size -= 1
+        if size < min_font_size:
+            return min_font_size
+        return size
+
+    def clear(self):
+        with self._lock:
+            self._text_units.clear()
+            self._glyph_tables.clear()
+            self._type1_fonts.clear()
+
+    def stats(self):
+        with self._lock:
+            return {
+                'entries': len(self._text_units),
+                'glyph_tables': {font: len(table) for font, table in self._glyph_tables.items()},
+                'max_entries': self.max_entries,
+                'hits': self.hits,
+                'misses': self.misses
+            }
+
+
+_TEXT_METRICS = None
+_TEXT_METRICS_LOCK = threading.Lock()
+
+
+def get_text_metrics():
+    global _TEXT_METRICS
+    metrics = _TEXT_METRICS
+    if metrics is None:
+        with _TEXT_METRICS_LOCK:
+            if _TEXT_METRICS is None:
+                _TEXT_METRICS = TextMetrics()
+            metrics = _TEXT_METRICS
+    return metrics
@@ -0,0 +1,132 @@
+"""进程预热
+
+gunicorn 以 preload_app 方式启动时，master 在 fork worker 之前调用 warm_up(app)：
+字体注册、背景图/印章解码、证书版式编译、拼音词典、竞赛规则等只读资源在 master 中加载一次，
+worker 通过 fork 的写时复制直接共享，第一张证书不再需要冷启动。
+预热结束后 /api/health/ready 返回 200（见 routes.health_ready 与 gunicorn.conf.py）。
+
+每一步失败只记录错误，不阻止服务启动；未预热的资源仍会在首次使用时按需加载。
+"""
+import threading
+import time
+
+
+_STATE = {
+    'ready': False,
+    'started_at': None,
+    'finished_at': None,
+    'steps': {}
+}
+_STATE_LOCK = threading.Lock()
+
+
+def _warm_config():
+    from config import COMPETITION_RULES, AWARD_LEVELS
+    return {'categories': len(COMPETITION_RULES), 'award_levels': len(AWARD_LEVELS)}
+
+
+def _warm_fonts():
+    from certificate_generator import get_certificate_generator
+    generator = get_certificate_generator()
+    return generator.font_registry.report()
+
+
+def _warm_images():
+    from certificate_assets import get_image_cache
+    from certificate_batch import WARM_ASSETS
+    cache = get_image_cache()
+    loaded = [path for path in WARM_ASSETS if cache.get(path) is not None]
+    return {'images': loaded}
+
+
+def _warm_layouts():
+    from certificate_layouts import get_layout_registry
+    registry = get_layout_registry()
+    registry.warm()
+    return {'layouts': registry.names()}
+
+
+# 证书上固定出现的字符：奖项、组别、数字与常用标点
+_WARM_GLYPHS = '一二三等奖优秀辅导员小学初中高职组、（）()-0123456789'
+
+
+def _warm_text_metrics():
+    from certificate_generator import get_certificate_generator
+    from text_metrics import get_text_metrics
+    generator = get_certificate_generator()
+    metrics = get_text_metrics()
+    for font in sorted(generator.registered_fonts):
+        metrics.text_units(_WARM_GLYPHS, font)
+    return metrics.stats()
+
+
+def _warm_pinyin():
+    from pypinyin import lazy_pinyin, Style
+    lazy_pinyin('预热', style=Style.FIRST_LETTER)
+    return {}
+
+
+def _warm_templates(app):
+    from certificate_templates import get_template_index
+    from models import CertificateTemplate
+    with app.app_context():
+        index = get_template_index()
+        index.resolve(CertificateTemplate, category=None, award_level=None)
+        return index.stats()
+
+
+def warm_up(app):
+    """按顺序执行各预热步骤，返回 state()；重复调用只执行一次"""
+    with _STATE_LOCK:
+        if _STATE['started_at'] is not None:
+            return state()
+        _STATE['started_at'] = time.time()
+
+    steps = [
+        ('config', _warm_config),
+        ('fonts', _warm_fonts),
+        ('images', _warm_images),
+        ('layouts', _warm_layouts),
+        ('text_metrics', _warm_text_metrics),
+        ('pinyin', _warm_pinyin),
+        ('templates', lambda: _warm_templates(app)),
+    ]
+    for name, step in steps:
+        t0 = time.perf_counter()
+        try:
+            detail = step()
+            result = {'ok': True, 'detail': detail}
+        except Exception as e:
+            result = {'ok': False, 'error': str(e)}
+        result['seconds'] = round(time.perf_counter() - t0, 3)
+        with _STATE_LOCK:
+            _STATE['steps'][name] = result
+
+    with _STATE_LOCK:
+        _STATE['ready'] = True
+        _STATE['finished_at'] = time.time()
+    return state()
+
+
+def is_ready():
+    with _STATE_LOCK:
+        return bool(_STATE['ready'])
+
+
+def state():
+    with _STATE_LOCK:
+        return {
+            'ready': _STATE['ready'],
+            'started_at': _STATE['started_at'],
+            'finished_at': _STATE['finished_at'],
+            'steps': {name: dict(result) for name, result in _STATE['steps'].items()}
+        }
+
+
+def release_db_connections(app, close=True):
+    """丢弃连接池中的连接：master 预热后调用 close=True；worker fork 后调用 close=False，
+    只扔掉继承来的连接而不关闭父进程的 socket，worker 首次查询时重新建立连接"""
+    from app import db
+    with app.app_context():
+        for engine in db.engines.values():
+            engine.dispose(close=close)
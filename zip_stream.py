@@ -0,0 +1,38 @@
+"""边生成边输出的 zip 打包
+
+zipfile 写入不可 seek 的输出时会改用 data descriptor 记录大小/CRC，
+因此每写完一个条目就可以把已压缩的字节交给响应，内存占用只与单个条目有关。
+"""
+import zipfile
+
+
+class _ChunkSink:
+    """只实现 write/flush 的输出对象，zipfile 会按不可 seek 的流处理"""
+
+    def __init__(self):
+        self._chunks = []
+
+    def write(self, data):
+        if data:
+            self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        chunks, self._chunks = self._chunks, []
+        return chunks
+
+
+def iter_zip(entries, compression=zipfile.ZIP_DEFLATED):
+    """把 (filename, content) 序列逐个压缩，按块产出 zip 字节流
+
+    entries 可以是惰性生成器：前一个条目的字节产出后才会取下一个条目。
+    """
+    sink = _ChunkSink()
+    with zipfile.ZipFile(sink, 'w', compression=compression) as zf:
+        for filename, content in entries:
+            zf.writestr(filename, content)
+            yield from sink.drain()
+    yield from sink.drain()